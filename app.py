@@ -1,66 +1,360 @@
 ﻿import os
+import io
+import gzip
 import re
 import json
 import time
 import shutil
 import sys
+import sqlite3
+import hmac
+import array
+import bisect
+import struct
+import optparse
+import collections
+import queue
+import socket
+import uuid
+import tempfile
+import mimetypes
+import unicodedata
 import traceback
 import threading
+import atexit
+import contextlib
+import inspect
+from urllib.parse import quote, urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 import requests as http_requests  # renamed to avoid conflict with flask.request
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context
 from flask_cors import CORS
-from werkzeug.utils import secure_filename
+from werkzeug.utils import secure_filename, safe_join
 import subprocess
 
 # youtube-transcript-api – works from servers without Node.js or bot detection
-from youtube_transcript_api import YouTubeTranscriptApi
+from youtube_transcript_api import YouTubeTranscriptApi, Transcript, TranscriptsDisabled
 
 app = Flask(__name__)
 # Enable CORS so a separate frontend (e.g. Vercel) can call this API.
 # In production you can restrict origins via the CORS_ORIGINS env var.
-CORS(app, resources={r"/*": {"origins": os.environ.get("CORS_ORIGINS", "*")}})
+CORS(app, resources={r"/*": {"origins": os.environ.get("CORS_ORIGINS", "*")}}, expose_headers=['X-Job-Id'])
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max file size (for cookie files)
 app.config['UPLOAD_FOLDER'] = 'temp'
 app.config['OUTPUT_FOLDER'] = 'output'
 app.config['DOWNLOADS_FOLDER'] = 'downloads'
 app.config['COOKIES_FOLDER'] = 'cookies'
+app.config['CACHE_FOLDER'] = os.environ.get('CACHE_FOLDER', 'cache')
 
 # Ensure directories exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
 os.makedirs(app.config['DOWNLOADS_FOLDER'], exist_ok=True)
 os.makedirs(app.config['COOKIES_FOLDER'], exist_ok=True)
+os.makedirs(app.config['CACHE_FOLDER'], exist_ok=True)
 
-# Progress tracking for SSE
-progress_store = {}
-progress_lock = threading.Lock()
+# Concurrent transcript fetching: how many videos are fetched at once by default,
+# the hard upper bound a request may ask for, and the pause each worker takes
+# after a fetch (keeps the overall request rate to YouTube bounded).
+app.config['TRANSCRIPT_WORKERS'] = int(os.environ.get('TRANSCRIPT_WORKERS', 4))
+app.config['MAX_TRANSCRIPT_WORKERS'] = int(os.environ.get('MAX_TRANSCRIPT_WORKERS', 8))
+app.config['TRANSCRIPT_REQUEST_DELAY'] = float(os.environ.get('TRANSCRIPT_REQUEST_DELAY', 0.5))
 
+# Shared HTTP client for all YouTube requests (playlist pages, titles, the
+# transcript API): keep-alive connections per host up to the pool size,
+# retries with backoff on connection errors and 5xx responses, and a default
+# (connect, read) timeout for calls that do not pass their own.
+app.config['HTTP_POOL_SIZE'] = int(os.environ.get('HTTP_POOL_SIZE', 16))
+app.config['HTTP_RETRIES'] = int(os.environ.get('HTTP_RETRIES', 2))
+app.config['HTTP_CONNECT_TIMEOUT'] = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 5))
+app.config['HTTP_READ_TIMEOUT'] = float(os.environ.get('HTTP_READ_TIMEOUT', 20))
 
-def extract_spoken_words_only(vtt_file):
-    """Extract and clean spoken words from VTT subtitle file (legacy fallback)."""
-    try:
-        with open(vtt_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except Exception as e:
-        return f"[Error reading file: {str(e)}]"
-    
-    text = re.sub(r'<c[^>]*>|</c>', '', content)
-    text = re.sub(r'WEBVTT\s*', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'^\d+\s*$', '', text, flags=re.MULTILINE)
-    text = re.sub(r'\d{1,2}:\d{2}:\d{2}[\.,]\d{3}\s*-->\s*\d{1,2}:\d{2}:\d{2}[\.,]\d{3}.*?\n', '', text, flags=re.MULTILINE)
-    text = re.sub(r'\d{1,2}:\d{2}[\.,]\d{3}\s*-->\s*\d{1,2}:\d{2}[\.,]\d{3}.*?\n', '', text, flags=re.MULTILINE)
-    text = re.sub(r'\[(?:Music|Applause|Silence|Sound|Laughter|Crowd).*?\]', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'^[A-Z][a-z]+(?:\s+\d+)?:\s*', '', text, flags=re.MULTILINE)
-    text = re.sub(r'^>>\s*', '', text, flags=re.MULTILINE)
-    text = re.sub(r'&[a-z]+;', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'<[^>]+>', '', text)
-    text = re.sub(r'^\s+|\s+$', '', text, flags=re.MULTILINE)
-    text = re.sub(r'\n{3,}', '\n\n', text)
-    text = re.sub(r' +', ' ', text)
-    lines = [line.strip() for line in text.split('\n') if line.strip()]
-    text = ' '.join(lines)
-    text = text.strip()
-    return text if len(text) > 50 else "[No clear speech detected]"
+# Combined transcript files are written per job; older ones are pruned when a new job starts
+app.config['OUTPUT_RETENTION'] = int(os.environ.get('OUTPUT_RETENTION', 24 * 3600))
+
+# Every /download-video request downloads into its own directory under
+# DOWNLOADS_FOLDER; directories older than this are removed as new ones are made
+app.config['DOWNLOAD_RETENTION'] = int(os.environ.get('DOWNLOAD_RETENTION', 24 * 3600))
+
+# Video downloads in throughput mode (the default; a request may send
+# throughput=false) fetch DASH/HLS formats DOWNLOAD_FRAGMENTS fragments at a
+# time. All downloads running on this host share DOWNLOAD_CONNECTIONS
+# connections and DOWNLOAD_BANDWIDTH bytes/s (0 = unlimited) between them.
+app.config['DOWNLOAD_THROUGHPUT'] = os.environ.get('DOWNLOAD_THROUGHPUT', 'true') == 'true'
+app.config['DOWNLOAD_FRAGMENTS'] = int(os.environ.get('DOWNLOAD_FRAGMENTS', 4))
+app.config['DOWNLOAD_CONNECTIONS'] = int(os.environ.get('DOWNLOAD_CONNECTIONS', 16))
+app.config['DOWNLOAD_BANDWIDTH'] = int(os.environ.get('DOWNLOAD_BANDWIDTH', 0))
+app.config['DOWNLOAD_LEASES_DB'] = os.path.join(app.config['CACHE_FOLDER'], 'downloads.sqlite3')
+
+# Files can be handed to a front proxy instead of being streamed by gunicorn:
+# FILE_OFFLOAD=x-accel-redirect (nginx: an `internal` location at
+# FILE_OFFLOAD_PREFIX aliased to the app directory, so that
+# <prefix>downloads/<dir>/<file> is the file) or x-sendfile (Apache
+# mod_xsendfile, lighttpd; the header carries the absolute path).
+app.config['FILE_OFFLOAD'] = os.environ.get('FILE_OFFLOAD', '').lower()
+app.config['FILE_OFFLOAD_PREFIX'] = os.environ.get('FILE_OFFLOAD_PREFIX', '/protected/')
+app.config['USE_X_SENDFILE'] = app.config['FILE_OFFLOAD'] == 'x-sendfile'
+
+# Export formats written by every extraction unless the request asks for
+# others ('txt' is always written; 'ndjson' and 'json' on request). Each is
+# also stored compressed with EXPORT_COMPRESSION ('gzip', 'zstd'; zstd needs
+# the zstandard package) so /download can send the copy the client accepts.
+app.config['EXPORT_FORMATS'] = [name for name in os.environ.get('EXPORT_FORMATS', 'txt').split(',') if name]
+app.config['EXPORT_COMPRESSION'] = [name for name in os.environ.get('EXPORT_COMPRESSION', 'gzip,zstd').split(',') if name]
+
+# Upper bound on videos enumerated per playlist (requests may ask for fewer)
+app.config['PLAYLIST_MAX_VIDEOS'] = int(os.environ.get('PLAYLIST_MAX_VIDEOS', 1000))
+
+# Most playlist/video URLs accepted by one /extract/batch request
+app.config['BATCH_MAX_INPUTS'] = int(os.environ.get('BATCH_MAX_INPUTS', 50))
+
+# Persistent transcript cache (SQLite in WAL mode, shared by all gunicorn workers).
+# Entries older than the TTL are ignored and purged; beyond the size budget the
+# least recently used entries are evicted.
+app.config['TRANSCRIPT_CACHE_DB'] = os.path.join(app.config['CACHE_FOLDER'], 'transcripts.sqlite3')
+app.config['TRANSCRIPT_CACHE_TTL'] = int(os.environ.get('TRANSCRIPT_CACHE_TTL', 7 * 24 * 3600))
+app.config['TRANSCRIPT_CACHE_MAX_BYTES'] = int(os.environ.get('TRANSCRIPT_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+
+# Caption languages wanted, in order of preference (a request may pass its own
+# `languages`); the first one is also the translation target when a video has
+# no track in any of them. Each video's track listing (languages, manual vs.
+# generated, translatable) is cached for TRACK_CACHE_TTL; its signed track URLs
+# are reused until they expire.
+app.config['TRANSCRIPT_LANGUAGES'] = [code for code in os.environ.get('TRANSCRIPT_LANGUAGES', 'en,en-US,en-GB').split(',') if code]
+app.config['TRACK_CACHE_TTL'] = int(os.environ.get('TRACK_CACHE_TTL', 7 * 24 * 3600))
+
+# Full-text search: every extracted transcript is indexed (SQLite FTS5) as it
+# is fetched, in segments of about SEARCH_SEGMENT_SECONDS so hits come with a
+# timestamp. SEARCH_INDEX=false stops indexing; /search keeps working.
+app.config['SEARCH_DB'] = os.path.join(app.config['CACHE_FOLDER'], 'search.sqlite3')
+app.config['SEARCH_INDEX'] = os.environ.get('SEARCH_INDEX', 'true') == 'true'
+app.config['SEARCH_SEGMENT_SECONDS'] = int(os.environ.get('SEARCH_SEGMENT_SECONDS', 20))
+
+# Playlist sync manifests and the stored transcripts they are rebuilt from
+app.config['SYNC_DB'] = os.path.join(app.config['CACHE_FOLDER'], 'sync.sqlite3')
+
+# /metrics (Prometheus text format). Each process adds what it observed to
+# METRICS_DB every METRICS_FLUSH_INTERVAL seconds, so the totals cover all
+# gunicorn and job worker processes whichever one is scraped.
+app.config['METRICS_DB'] = os.path.join(app.config['CACHE_FOLDER'], 'metrics.sqlite3')
+app.config['METRICS_FLUSH_INTERVAL'] = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+
+# Capability probes (JS runtime, browser cookies) are cached in SQLite and
+# re-probed in the background once older than CAPABILITY_TTL seconds.
+# ADMIN_TOKEN enables the /admin endpoints (disabled when unset).
+app.config['CAPABILITIES_DB'] = os.path.join(app.config['CACHE_FOLDER'], 'capabilities.sqlite3')
+app.config['CAPABILITY_TTL'] = int(os.environ.get('CAPABILITY_TTL', 6 * 3600))
+app.config['ADMIN_TOKEN'] = os.environ.get('ADMIN_TOKEN', '')
+
+# yt-dlp runs in-process on pooled YoutubeDL instances ('subprocess' runs the
+# CLI for every attempt instead): up to YTDLP_POOL_SIZE idle instances per
+# option set, YTDLP_POOL_CONFIGS option sets, each reused for at most
+# YTDLP_INSTANCE_MAX_AGE seconds.
+app.config['YTDLP_BACKEND'] = os.environ.get('YTDLP_BACKEND', 'inprocess')
+app.config['YTDLP_POOL_SIZE'] = int(os.environ.get('YTDLP_POOL_SIZE', 2))
+app.config['YTDLP_POOL_CONFIGS'] = int(os.environ.get('YTDLP_POOL_CONFIGS', 16))
+app.config['YTDLP_INSTANCE_MAX_AGE'] = int(os.environ.get('YTDLP_INSTANCE_MAX_AGE', 1800))
+
+# yt-dlp strategy stats (see order_strategies): counts halve every
+# STRATEGY_HALF_LIFE seconds; STRATEGY_SKIP_AFTER failures in a row park a
+# strategy for STRATEGY_SKIP_SECONDS.
+app.config['STRATEGY_STATS_DB'] = os.path.join(app.config['CACHE_FOLDER'], 'strategies.sqlite3')
+app.config['STRATEGY_HALF_LIFE'] = float(os.environ.get('STRATEGY_HALF_LIFE', 6 * 3600))
+app.config['STRATEGY_SKIP_AFTER'] = int(os.environ.get('STRATEGY_SKIP_AFTER', 3))
+app.config['STRATEGY_SKIP_SECONDS'] = float(os.environ.get('STRATEGY_SKIP_SECONDS', 900))
+
+# Background job queue (SQLite, shared by the web and worker processes).
+# JOB_WORKERS worker processes are started by one web process per host the
+# first time a job is submitted (0 = run `python app.py worker` yourself).
+# Finished jobs are forgotten after JOB_TTL; a running job whose worker has
+# not reported for JOB_STALE_AFTER seconds is retried up to JOB_MAX_ATTEMPTS.
+app.config['JOBS_DB'] = os.path.join(app.config['CACHE_FOLDER'], 'jobs.sqlite3')
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))
+app.config['JOB_TTL'] = int(os.environ.get('JOB_TTL', 24 * 3600))
+app.config['JOB_STALE_AFTER'] = int(os.environ.get('JOB_STALE_AFTER', 120))
+app.config['JOB_MAX_ATTEMPTS'] = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+app.config['JOB_POLL_INTERVAL'] = float(os.environ.get('JOB_POLL_INTERVAL', 0.5))
+# Recent events kept per job so a reconnecting SSE client can replay what it missed
+app.config['JOB_EVENT_BUFFER'] = int(os.environ.get('JOB_EVENT_BUFFER', 500))
+
+
+# ─── Caption cleaning engine ───
+#
+# Precompiled patterns for cleaning youtube-transcript-api snippets. Each
+# step is skipped unless a cheap substring check says it can match.
+
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+_BRACKETED_RE = re.compile(r'\[.*?\]')
+_CAPTIONS_PREFIX_RE = re.compile(r'captions?\s*\w*\s*', re.IGNORECASE)
+_SPACE_RUN_RE = re.compile(r' {2,}')
+
+
+def clean_snippet_text(text):
+    """Clean one transcript snippet: drop [bracketed] cues, HTML tags and a 'captions en' prefix."""
+    if '[' in text:
+        text = _BRACKETED_RE.sub('', text)
+    if '<' in text:
+        text = _HTML_TAG_RE.sub('', text)
+    if text[:7].lower() == 'caption':
+        text = text[_CAPTIONS_PREFIX_RE.match(text).end():]
+    return text.strip()
+
+
+def join_snippet_texts(texts):
+    """Clean snippet texts and join them with single spaces, dropping consecutive duplicates."""
+    joined = []
+    last = None
+    for text in texts:
+        text = clean_snippet_text(text)
+        if text and text != last:
+            last = text
+            joined.append(_SPACE_RUN_RE.sub(' ', text) if '  ' in text else text)
+    return ' '.join(joined)
+
+
+# ─── Timed transcripts ───
+
+class TimedTranscript:
+    """Cleaned transcript snippets with their timing, stored column-wise.
+    
+    Instead of one object per snippet it keeps three unsigned int columns –
+    start and duration in milliseconds, and each snippet's end offset in one
+    UTF-8 text buffer – so a long lecture costs a few bytes per snippet plus
+    its text. to_bytes() is the cached form; from_bytes() reads it back
+    without copying, and a cue's text is only decoded when it is used.
+    """
+    
+    MAGIC = b'TT1\0'
+    HEADER = struct.Struct('=4sI')  # magic, snippet count; the cache is host-local, so native order
+    
+    def __init__(self, starts, durations, ends, text):
+        self.starts = starts        # ms, ascending
+        self.durations = durations  # ms
+        self.ends = ends            # byte offset in `text` where each snippet's text ends
+        self.text = text            # UTF-8 bytes of all snippet texts, back to back
+    
+    @classmethod
+    def from_snippets(cls, snippets):
+        """Build from youtube-transcript-api snippets, cleaned like join_snippet_texts().
+        
+        A snippet repeating the previous one's text extends it instead of
+        adding a cue.
+        """
+        starts, durations, ends = array.array('I'), array.array('I'), array.array('I')
+        text = bytearray()
+        last = None
+        for snippet in snippets:
+            cleaned = clean_snippet_text(snippet.text)
+            if not cleaned:
+                continue
+            start = max(0, round(snippet.start * 1000))
+            duration = max(0, round(snippet.duration * 1000))
+            if cleaned == last:
+                durations[-1] = max(durations[-1], start + duration - starts[-1])
+                continue
+            last = cleaned
+            if '  ' in cleaned:
+                cleaned = _SPACE_RUN_RE.sub(' ', cleaned)
+            starts.append(start)
+            durations.append(duration)
+            text += cleaned.encode('utf-8')
+            ends.append(len(text))
+        return cls(starts, durations, ends, bytes(text))
+    
+    def to_bytes(self):
+        return b''.join((self.HEADER.pack(self.MAGIC, len(self.starts)), self.starts.tobytes(),
+                         self.durations.tobytes(), self.ends.tobytes(), self.text))
+    
+    @classmethod
+    def from_bytes(cls, data):
+        view = memoryview(data)
+        magic, count = cls.HEADER.unpack_from(view)
+        if magic != cls.MAGIC:
+            raise ValueError('Not a timed transcript')
+        size = array.array('I').itemsize * count
+        offset = cls.HEADER.size
+        columns = []
+        for _ in range(3):
+            columns.append(view[offset:offset + size].cast('I'))
+            offset += size
+        return cls(*columns, view[offset:])
+    
+    def __len__(self):
+        return len(self.starts)
+    
+    def window(self, start=None, end=None):
+        """Indices (a range) of the cues shown between `start` and `end` seconds (either may be None)."""
+        first, last = 0, len(self.starts)
+        if start is not None:
+            start_ms = start * 1000
+            first = bisect.bisect_left(self.starts, start_ms)
+            # The cue before may still be on screen at `start`
+            if first > 0 and self.starts[first - 1] + self.durations[first - 1] > start_ms:
+                first -= 1
+        if end is not None:
+            last = max(first, bisect.bisect_left(self.starts, end * 1000))
+        return range(first, last)
+    
+    def cue_text(self, index):
+        begin = self.ends[index - 1] if index else 0
+        return bytes(self.text[begin:self.ends[index]]).decode('utf-8')
+    
+    def cues(self, indices):
+        """(start ms, end ms, text) for each index; ends are clipped to the next cue's start.
+        
+        YouTube's auto-generated tracks overlap consecutive snippets, which
+        players would otherwise stack on screen.
+        """
+        for index in indices:
+            start = self.starts[index]
+            end = start + self.durations[index]
+            if index + 1 < len(self.starts) and start < self.starts[index + 1] < end:
+                end = self.starts[index + 1]
+            yield start, end, self.cue_text(index)
+    
+    def plain_text(self, indices):
+        return ' '.join(self.cue_text(index) for index in indices)
+
+
+def _cue_timestamp(ms, separator):
+    hours, ms = divmod(ms, 3600000)
+    minutes, ms = divmod(ms, 60000)
+    seconds, ms = divmod(ms, 1000)
+    return f'{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{ms:03d}'
+
+
+def export_srt(timed, indices):
+    """SubRip cues for `indices`, numbered from 1, as text chunks."""
+    for number, (start, end, text) in enumerate(timed.cues(indices), 1):
+        yield f"{number}\n{_cue_timestamp(start, ',')} --> {_cue_timestamp(end, ',')}\n{text}\n\n"
+
+
+def export_vtt(timed, indices):
+    """WebVTT document for `indices`, as text chunks."""
+    yield 'WEBVTT\n\n'
+    for start, end, text in timed.cues(indices):
+        # '-->' may not appear in a cue payload
+        yield f"{_cue_timestamp(start, '.')} --> {_cue_timestamp(end, '.')}\n{text.replace('-->', '->')}\n\n"
+
+
+def export_timed_json(timed, indices, metadata):
+    """{**metadata, "cues": [{"start", "end", "text"}]} with times in seconds, as text chunks."""
+    yield json.dumps(metadata, ensure_ascii=False)[:-1] + ', "cues": ['
+    for number, (start, end, text) in enumerate(timed.cues(indices)):
+        cue = json.dumps({'start': start / 1000, 'end': end / 1000, 'text': text}, ensure_ascii=False)
+        yield (',\n' if number else '\n') + cue
+    yield '\n]}\n'
+
+
+# Export format -> (writer, mimetype, file extension)
+TIMED_EXPORTS = {
+    'srt': (export_srt, 'application/x-subrip', 'srt'),
+    'vtt': (export_vtt, 'text/vtt', 'vtt'),
+    'json': (export_timed_json, 'application/json', 'json'),
+    'txt': (None, 'text/plain', 'txt'),
+}
 
 
 # ─── New helpers: no yt-dlp needed for transcripts ───
@@ -92,135 +386,892 @@ def is_single_video_url(url):
     return has_video and not has_playlist
 
 
-def get_transcript_direct(video_id):
-    """Get transcript using youtube-transcript-api v1.2+ (no yt-dlp, no Node.js, no bot detection)."""
+# ─── Shared HTTP session ───
+
+class YouTubeSession(http_requests.Session):
+    """requests.Session that applies HTTP_*_TIMEOUT to calls made without a timeout."""
+    
+    def request(self, method, url, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = (app.config['HTTP_CONNECT_TIMEOUT'], app.config['HTTP_READ_TIMEOUT'])
+        return super().request(method, url, **kwargs)
+
+
+_http_session = None
+_http_session_pid = None
+_http_session_lock = threading.Lock()
+
+
+def http_session():
+    """The process-wide pooled session for YouTube traffic (created on first use, and again after a fork).
+    
+    Requests from all threads share its connection pools, so concurrent
+    transcript and playlist fetches reuse warm keep-alive connections
+    instead of paying a TCP and TLS handshake each.
+    """
+    global _http_session, _http_session_pid
+    if _http_session is None or _http_session_pid != os.getpid():
+        with _http_session_lock:
+            if _http_session is None or _http_session_pid != os.getpid():
+                retries = Retry(
+                    total=app.config['HTTP_RETRIES'],
+                    backoff_factor=0.5,
+                    status_forcelist=(500, 502, 503, 504),
+                    # Innertube browse POSTs are reads too
+                    allowed_methods=frozenset(('GET', 'HEAD', 'POST')),
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(pool_connections=8, pool_maxsize=app.config['HTTP_POOL_SIZE'],
+                                      max_retries=retries)
+                session = YouTubeSession()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _http_session, _http_session_pid = session, os.getpid()
+    return _http_session
+
+
+# ─── Metrics ───
+#
+# Stage latencies (histograms) and transcript outcomes (counters) are summed
+# in memory and added to the shared METRICS_DB in one transaction per flush,
+# rather than written per observation. Gauges are read from the job queue
+# when /metrics is scraped.
+
+METRICS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metric_samples (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (name, labels)
+);
+"""
+
+# Histogram buckets in seconds: cache hits take milliseconds, yt-dlp attempts minutes
+METRIC_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Family name -> (type, help); counters' samples are <name>_total
+METRICS = {
+    'ytsubs_stage_seconds': ('histogram', 'Time spent in each pipeline stage'),
+    'ytsubs_ytdlp_attempt_seconds': ('histogram', 'yt-dlp attempts by scope, strategy and outcome'),
+    'ytsubs_transcripts': ('counter', 'Transcript lookups by outcome'),
+    'ytsubs_jobs': ('gauge', 'Jobs by kind and status (finished ones are kept for JOB_TTL)'),
+    'ytsubs_job_events_buffered': ('gauge', 'Progress events buffered for replay to job event streams'),
+    'ytsubs_job_records_buffered': ('gauge', 'Transcript records kept for job record streams'),
+}
+
+_metrics_pending = {}  # (sample name, labels) -> amount not yet added to METRICS_DB
+_metrics_pid = None
+_metrics_lock = threading.Lock()
+
+
+def _metrics_db():
+    return get_db(app.config['METRICS_DB'], METRICS_SCHEMA)
+
+
+def _metric_labels(labels):
+    """Render {key: value} as Prometheus label pairs (without the braces)."""
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{key}="{escape(value)}"' for key, value in labels.items())
+
+
+def _metrics_flusher():
+    while True:
+        time.sleep(app.config['METRICS_FLUSH_INTERVAL'])
+        metrics_flush()
+
+
+def _metric_add(samples):
+    """Add {(sample name, labels): amount} to this process's pending totals."""
+    global _metrics_pid
+    with _metrics_lock:
+        if _metrics_pid != os.getpid():
+            # First observation in this process (or after a fork): start its flusher
+            _metrics_pending.clear()
+            _metrics_pid = os.getpid()
+            threading.Thread(target=_metrics_flusher, name='metrics-flusher', daemon=True).start()
+        for key, amount in samples.items():
+            _metrics_pending[key] = _metrics_pending.get(key, 0) + amount
+
+
+def metric_inc(name, amount=1, **labels):
+    """Increase counter `name` (a METRICS family) by `amount`."""
+    _metric_add({(name + '_total', _metric_labels(labels)): amount})
+
+
+def metric_observe(name, seconds, **labels):
+    """Record one observation in histogram `name` (a METRICS family)."""
+    base = _metric_labels(labels)
+    prefix = base + ',' if base else ''
+    samples = {(name + '_bucket', f'{prefix}le="{bound:g}"'): 1 for bound in METRIC_BUCKETS if seconds <= bound}
+    samples[(name + '_sum', base)] = seconds
+    samples[(name + '_count', base)] = 1
+    _metric_add(samples)
+
+
+@contextlib.contextmanager
+def metric_stage(stage):
+    """Time the enclosed block as pipeline stage `stage` (whether or not it raises)."""
+    started = time.perf_counter()
     try:
-        ytt_api = YouTubeTranscriptApi()
-        transcript_list = ytt_api.list(video_id)
-        
-        transcript = None
-        
-        # 1. Try English transcript (manual or auto-generated)
+        yield
+    finally:
+        metric_observe('ytsubs_stage_seconds', time.perf_counter() - started, stage=stage)
+
+
+def metrics_flush():
+    """Add this process's pending observations to METRICS_DB."""
+    with _metrics_lock:
+        if _metrics_pid != os.getpid() or not _metrics_pending:
+            return
+        pending = dict(_metrics_pending)
+        _metrics_pending.clear()
+    try:
+        db = _metrics_db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.executemany("""INSERT INTO metric_samples VALUES (?, ?, ?)
+                              ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value""",
+                           [(name, labels, amount) for (name, labels), amount in pending.items()])
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+    except sqlite3.Error as e:
+        # Keep them for the next flush
+        with _metrics_lock:
+            for key, amount in pending.items():
+                _metrics_pending[key] = _metrics_pending.get(key, 0) + amount
+        print(f"  Metrics flush failed: {e}", file=sys.stderr)
+
+
+atexit.register(metrics_flush)
+
+
+def _metric_number(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_metrics(samples):
+    """Prometheus text exposition of {sample name: {labels: value}} for the METRICS families."""
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind != 'histogram':
+            sample = name + '_total' if kind == 'counter' else name
+            for labels, value in sorted(samples.get(sample, {}).items()):
+                lines.append(f'{sample}{{{labels}}} {_metric_number(value)}' if labels
+                             else f'{sample} {_metric_number(value)}')
+            continue
+        buckets = samples.get(name + '_bucket', {})
+        sums = samples.get(name + '_sum', {})
+        for labels, count in sorted(samples.get(name + '_count', {}).items()):
+            prefix = labels + ',' if labels else ''
+            # Stored buckets hold observations at or below their bound, so they are cumulative already
+            for bound in METRIC_BUCKETS:
+                le = f'{prefix}le="{bound:g}"'
+                lines.append(f'{name}_bucket{{{le}}} {_metric_number(buckets.get(le, 0))}')
+            lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {_metric_number(count)}')
+            braces = f'{{{labels}}}' if labels else ''
+            lines.append(f'{name}_sum{braces} {_metric_number(sums.get(labels, 0))}')
+            lines.append(f'{name}_count{braces} {_metric_number(count)}')
+    return '\n'.join(lines) + '\n'
+
+
+# ─── Persistent transcript cache ───
+
+_db_local = threading.local()
+_db_schemas_ready = set()
+_db_schema_lock = threading.Lock()
+
+TRANSCRIPT_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    video_id TEXT NOT NULL,
+    language TEXT NOT NULL,
+    translated INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (video_id, language, translated)
+);
+CREATE INDEX IF NOT EXISTS transcripts_accessed_at ON transcripts (accessed_at);
+CREATE TABLE IF NOT EXISTS transcript_timings (
+    video_id TEXT NOT NULL,
+    language TEXT NOT NULL,
+    translated INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (video_id, language, translated)
+);
+CREATE TABLE IF NOT EXISTS transcript_tracks (
+    video_id TEXT PRIMARY KEY,
+    listing TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    urls_expire_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS video_titles (
+    video_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+"""
+
+
+def get_db(path, schema):
+    """Return this thread's SQLite connection for `path`, creating `schema` once per process.
+
+    Connections run in autocommit mode with WAL journaling so several
+    gunicorn workers (and their threads) can read and write the same file.
+    """
+    conns = getattr(_db_local, 'conns', None)
+    if conns is None:
+        conns = _db_local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conns[path] = conn
+    if path not in _db_schemas_ready:
+        with _db_schema_lock:
+            if path not in _db_schemas_ready:
+                conn.executescript(schema)
+                _db_schemas_ready.add(path)
+    return conn
+
+
+def _transcript_cache_db():
+    return get_db(app.config['TRANSCRIPT_CACHE_DB'], TRANSCRIPT_CACHE_SCHEMA)
+
+
+def transcript_cache_get(video_id, language, translated=False):
+    """Return the cached text of one track (an original, or a translation into `language`), or None on a miss."""
+    try:
+        db = _transcript_cache_db()
+        row = db.execute(
+            """SELECT rowid, text FROM transcripts
+               WHERE video_id = ? AND language = ? AND translated = ? AND created_at > ?""",
+            (video_id, language, int(translated), time.time() - app.config['TRANSCRIPT_CACHE_TTL']),
+        ).fetchone()
+        if row is None:
+            return None
+        db.execute('UPDATE transcripts SET accessed_at = ? WHERE rowid = ?', (time.time(), row[0]))
+        return row[1]
+    except sqlite3.Error as e:
+        print(f"  Transcript cache read failed: {e}", file=sys.stderr)
+        return None
+
+
+def transcript_timing_get(video_id, language, translated=False):
+    """Return the cached TimedTranscript of one track, or None on a miss (also for entries cached without timing)."""
+    try:
+        db = _transcript_cache_db()
+        row = db.execute(
+            """SELECT t.rowid, timing.data FROM transcripts t
+               JOIN transcript_timings timing USING (video_id, language, translated)
+               WHERE t.video_id = ? AND t.language = ? AND t.translated = ? AND t.created_at > ?""",
+            (video_id, language, int(translated), time.time() - app.config['TRANSCRIPT_CACHE_TTL']),
+        ).fetchone()
+        if row is None:
+            return None
+        db.execute('UPDATE transcripts SET accessed_at = ? WHERE rowid = ?', (time.time(), row[0]))
+        return TimedTranscript.from_bytes(row[1])
+    except (sqlite3.Error, ValueError) as e:
+        print(f"  Transcript timing cache read failed: {e}", file=sys.stderr)
+        return None
+
+
+def transcript_cache_put(video_id, language, translated, text, timed=None):
+    """Store a cleaned transcript (and its timing) and evict expired / least recently used entries.
+    
+    The timing blob counts towards the entry's size and goes with it.
+    """
+    now = time.time()
+    timing = timed.to_bytes() if timed is not None else None
+    try:
+        db = _transcript_cache_db()
+        db.execute(
+            'INSERT OR REPLACE INTO transcripts VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (video_id, language, int(translated), text, len(text.encode('utf-8')) + len(timing or b''), now, now),
+        )
+        if timing is not None:
+            db.execute('INSERT OR REPLACE INTO transcript_timings VALUES (?, ?, ?, ?)',
+                       (video_id, language, int(translated), timing))
+        db.execute('DELETE FROM transcripts WHERE created_at <= ?',
+                   (now - app.config['TRANSCRIPT_CACHE_TTL'],))
+        # Keep the most recently used entries whose running total fits the budget
+        db.execute(
+            """DELETE FROM transcripts WHERE rowid IN (
+                   SELECT rowid FROM (
+                       SELECT rowid, SUM(size) OVER (ORDER BY accessed_at DESC, rowid DESC) AS running
+                       FROM transcripts)
+                   WHERE running > ?)""",
+            (app.config['TRANSCRIPT_CACHE_MAX_BYTES'],),
+        )
+        db.execute("""DELETE FROM transcript_timings WHERE NOT EXISTS (
+                          SELECT 1 FROM transcripts t WHERE t.video_id = transcript_timings.video_id
+                          AND t.language = transcript_timings.language AND t.translated = transcript_timings.translated)""")
+    except sqlite3.Error as e:
+        print(f"  Transcript cache write failed: {e}", file=sys.stderr)
+
+
+# oEmbed answers with a few hundred bytes of JSON instead of the full watch page
+YOUTUBE_OEMBED_URL = 'https://www.youtube.com/oembed'
+
+# Title lookups run beside transcript fetches (see _fetch_transcript_task)
+_title_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='title')
+
+
+def resolve_video_title(video_id):
+    """Title of a video from the cache or YouTube's oEmbed endpoint; None if it cannot be resolved.
+    
+    Titles are cached alongside transcripts (same TTL), so repeat requests
+    for a video make no title request at all.
+    """
+    cutoff = time.time() - app.config['TRANSCRIPT_CACHE_TTL']
+    try:
+        row = _transcript_cache_db().execute('SELECT title FROM video_titles WHERE video_id = ? AND fetched_at > ?',
+                                             (video_id, cutoff)).fetchone()
+        if row:
+            return row[0]
+    except sqlite3.Error as e:
+        print(f"  Title cache read failed: {e}", file=sys.stderr)
+    
+    try:
+        resp = http_session().get(
+            YOUTUBE_OEMBED_URL,
+            params={'url': f'https://www.youtube.com/watch?v={video_id}', 'format': 'json'},
+            headers=YOUTUBE_BROWSE_HEADERS,
+            timeout=(3, 5),
+        )
+        resp.raise_for_status()
+        title = (resp.json().get('title') or '').strip()
+    except Exception as e:
+        # 401/404 for private or removed videos; the transcript fetch reports those
+        print(f"  Could not resolve title of {video_id}: {str(e)[:150]}", file=sys.stderr)
+        return None
+    if not title:
+        return None
+    
+    try:
+        db = _transcript_cache_db()
+        db.execute('INSERT OR REPLACE INTO video_titles VALUES (?, ?, ?)', (video_id, title, time.time()))
+        db.execute('DELETE FROM video_titles WHERE fetched_at <= ?', (cutoff,))
+    except sqlite3.Error as e:
+        print(f"  Title cache write failed: {e}", file=sys.stderr)
+    return title
+
+
+# Outcome label of each get_transcripts_direct() error, by message prefix
+TRANSCRIPT_OUTCOMES = (
+    ('Subtitles are disabled', 'disabled'),
+    ('No transcript available', 'no_transcript'),
+    ('Video is unavailable', 'unavailable'),
+    ('Rate limited', 'rate_limited'),
+    ('Transcript too short', 'too_short'),
+)
+
+
+def _transcript_error_message(e):
+    """Short user-facing reason for a failed track listing or fetch."""
+    error_str = str(e).lower()
+    if 'disabled' in error_str:
+        return "Subtitles are disabled for this video"
+    elif 'no transcript' in error_str or 'not translatable' in error_str:
+        return "No transcript available for this video"
+    elif 'no longer available' in error_str or 'video unavailable' in error_str:
+        return "Video is unavailable or no longer exists"
+    elif 'too many requests' in error_str or '429' in error_str:
+        return "Rate limited by YouTube - please wait"
+    else:
+        return f"Could not fetch transcript: {str(e)[:150]}"
+
+
+def _check_transcript_internals():
+    """Whether a Transcript can be rebuilt from a cached track URL, which it keeps as `_url`.
+    
+    Both are youtube-transcript-api internals. Without them tracks are
+    fetched through the public list() / find_*_transcript() / translate()
+    calls instead, which list the video's tracks again for every fetch.
+    """
+    expected = ['http_client', 'video_id', 'url', 'language', 'language_code', 'is_generated',
+                'translation_languages']
+    try:
+        if list(inspect.signature(Transcript.__init__).parameters)[1:] != expected:
+            return False
+        return Transcript(None, '', 'https://example.invalid/', '', '', False, [])._url == 'https://example.invalid/'
+    except Exception:
+        return False
+
+
+TRANSCRIPT_URLS = _check_transcript_internals()
+if not TRANSCRIPT_URLS:
+    print("youtube-transcript-api internals changed; fetching tracks via its public API", file=sys.stderr)
+
+
+def _track_listing(transcript_list):
+    """Cacheable form of a TranscriptList: manual tracks first, then generated ones, like iterating it."""
+    tracks, translation_languages, translation_names = [], [], {}
+    for t in transcript_list:
+        tracks.append({
+            'language_code': t.language_code,
+            'language': t.language,
+            'generated': t.is_generated,
+            'translatable': t.is_translatable,
+            'url': t._url if TRANSCRIPT_URLS else None,
+        })
+        if t.is_translatable and not translation_languages:
+            translation_languages = [lang.language_code for lang in t.translation_languages]
+            translation_names = {lang.language_code: lang.language for lang in t.translation_languages}
+    return {'tracks': tracks, 'translation_languages': translation_languages,
+            'translation_names': translation_names}
+
+
+def _track_urls_expiry(listing, now):
+    """When the listing's signed track URLs stop working (their `expire` parameter), less a margin."""
+    expiry = now + app.config['TRACK_CACHE_TTL']
+    for track in listing['tracks']:
+        if not track['url']:
+            continue
         try:
-            transcript = transcript_list.find_transcript(['en', 'en-US', 'en-GB'])
-        except Exception:
+            expiry = min(expiry, int(parse_qs(urlparse(track['url']).query)['expire'][0]) - 300)
+        except (KeyError, ValueError):
             pass
-        
-        # 2. Try any available transcript and translate to English
-        if not transcript:
-            try:
-                for t in transcript_list:
-                    if t.is_translatable:
-                        transcript = t.translate('en')
-                        break
-            except Exception:
-                pass
-        
-        # 3. Last resort: just use whatever is available
-        if not transcript:
-            try:
-                for t in transcript_list:
-                    transcript = t
-                    break
-            except Exception:
-                pass
-        
-        if not transcript:
-            return None, "No transcript available"
-        
-        # Fetch the actual transcript data
-        fetched = transcript.fetch()
-        
-        # Clean and combine text – v1.2+ uses .snippets with .text attribute
-        texts = []
-        for snippet in fetched.snippets:
-            text = snippet.text if hasattr(snippet, 'text') else str(snippet)
-            text = re.sub(r'\[.*?\]', '', text)  # Remove [Music], [Applause] etc.
-            text = re.sub(r'<[^>]+>', '', text)   # Remove HTML tags
-            text = re.sub(r'^captions?\s*\w*\s*', '', text, flags=re.IGNORECASE)  # Remove "captions en" prefix
-            text = text.strip()
-            if text and text not in texts[-1:]:    # Avoid consecutive duplicates
-                texts.append(text)
-        
-        combined = ' '.join(texts)
-        combined = re.sub(r' +', ' ', combined).strip()
-        
-        if len(combined) < 50:
-            return None, "Transcript too short or empty"
-        
-        return combined, None
-        
+    return expiry
+
+
+def get_track_listing(video_id, need_urls=False):
+    """A video's caption tracks as (listing, error), from the track cache when possible.
+    
+    With `need_urls` a cached listing is only used while its track URLs are
+    still valid, since they are what fetching a track needs. A video with
+    captions disabled is cached too (as an error) so it is not listed again.
+    """
+    now = time.time()
+    try:
+        row = _transcript_cache_db().execute(
+            'SELECT listing, urls_expire_at FROM transcript_tracks WHERE video_id = ? AND fetched_at > ?',
+            (video_id, now - app.config['TRACK_CACHE_TTL'])).fetchone()
+        if row and (not need_urls or row[1] > now):
+            listing = json.loads(row[0])
+            return (None, listing['error']) if listing.get('error') else (listing, None)
+    except sqlite3.Error as e:
+        print(f"  Track cache read failed: {e}", file=sys.stderr)
+    
+    try:
+        with metric_stage('transcript_list'):
+            listing = _track_listing(YouTubeTranscriptApi(http_client=http_session()).list(video_id))
+        error = None
+    except TranscriptsDisabled as e:
+        listing, error = {'tracks': [], 'error': _transcript_error_message(e)}, _transcript_error_message(e)
     except Exception as e:
-        error_str = str(e).lower()
-        if 'disabled' in error_str:
-            return None, "Subtitles are disabled for this video"
-        elif 'no transcript' in error_str or 'not translatable' in error_str:
-            return None, "No transcript available for this video"
-        elif 'no longer available' in error_str or 'video unavailable' in error_str:
-            return None, "Video is unavailable or no longer exists"
-        elif 'too many requests' in error_str or '429' in error_str:
-            return None, "Rate limited by YouTube - please wait"
+        return None, _transcript_error_message(e)
+    try:
+        db = _transcript_cache_db()
+        db.execute('INSERT OR REPLACE INTO transcript_tracks VALUES (?, ?, ?, ?)',
+                   (video_id, json.dumps(listing), now, _track_urls_expiry(listing, now)))
+        db.execute('DELETE FROM transcript_tracks WHERE fetched_at <= ?', (now - app.config['TRACK_CACHE_TTL'],))
+    except sqlite3.Error as e:
+        print(f"  Track cache write failed: {e}", file=sys.stderr)
+    return (None, error) if error else (listing, None)
+
+
+def select_tracks(listing, languages, all_languages=False):
+    """Pick the tracks to fetch as [(track, translation target or None)].
+    
+    For each language in order of preference an original track (manual
+    before generated) wins; failing that, a translatable track is translated
+    into the first preferred language YouTube offers; failing that, the
+    first track of any language is used. With `all_languages` every
+    preferred language that is available either way is picked.
+    """
+    tracks = listing['tracks']
+    originals = {}
+    for track in tracks:
+        originals.setdefault(track['language_code'], track)
+    translatable = next((track for track in tracks if track['translatable']), None)
+    targets = set(listing['translation_languages']) if translatable else set()
+    
+    picks = []
+    for code in languages:
+        if code in originals:
+            picks.append((originals[code], None))
+        elif all_languages and code in targets:
+            picks.append((translatable, code))
+        if picks and not all_languages:
+            return picks
+    if not picks:
+        code = next((code for code in languages if code in targets), None)
+        if code:
+            picks.append((translatable, code))
+        elif tracks:
+            picks.append((tracks[0], None))
+    return picks
+
+
+def _public_transcript(video_id, track, target=None):
+    """A listed track (translated into `target` if given) through the public API, listing the video again."""
+    transcript_list = YouTubeTranscriptApi(http_client=http_session()).list(video_id)
+    if track['generated']:
+        transcript = transcript_list.find_generated_transcript([track['language_code']])
+    else:
+        transcript = transcript_list.find_manually_created_transcript([track['language_code']])
+    return transcript.translate(target) if target else transcript
+
+
+def _fetch_track(video_id, track, target=None, target_name=None):
+    """Download and clean one track (translated into `target` if given); returns (text, TimedTranscript).
+    
+    Mirrors Transcript.translate(): a translation is named after its target
+    language and counts as generated.
+    """
+    if not (TRANSCRIPT_URLS and track['url']):
+        transcript = _public_transcript(video_id, track, target)
+    elif target:
+        transcript = Transcript(http_session(), video_id, f"{track['url']}&tlang={target}",
+                                target_name or target, target, True, [])
+    else:
+        transcript = Transcript(http_session(), video_id, track['url'], track['language'],
+                                track['language_code'], track['generated'], [])
+    with metric_stage('transcript_fetch'):
+        fetched = transcript.fetch()
+    # Cleaned like join_snippet_texts(), keeping each snippet's timing
+    with metric_stage('cleaning'):
+        timed = TimedTranscript.from_snippets(fetched.snippets)
+        text = timed.plain_text(range(len(timed)))
+    return text, timed
+
+
+def get_transcripts_direct(video_id, languages=None, all_languages=False, timed=False):
+    """Get transcripts using youtube-transcript-api v1.2+ (no yt-dlp, no Node.js, no bot detection).
+    
+    Returns ({language code: text}, error): the preferred track (see
+    select_tracks), or with `all_languages` one entry per available
+    preferred language, all from a single track listing. The listing and
+    every fetched track (translations separately from originals) are
+    cached, so a repeat request makes no YouTube request at all. With
+    `timed` the values are TimedTranscripts instead of text.
+    """
+    texts, error = _get_transcripts_direct(video_id, languages, all_languages, timed)
+    outcome = next((label for prefix, label in TRANSCRIPT_OUTCOMES if error.startswith(prefix)),
+                   'error') if error else 'ok'
+    metric_inc('ytsubs_transcripts', outcome=outcome)
+    return texts, error
+
+
+def _get_transcripts_direct(video_id, languages, all_languages, timed):
+    cache_get = transcript_timing_get if timed else transcript_cache_get
+    languages = languages or app.config['TRANSCRIPT_LANGUAGES']
+    listing, error = get_track_listing(video_id)
+    if error:
+        return None, error
+    fresh_urls = False
+    while True:
+        picks = select_tracks(listing, languages, all_languages)
+        if not picks:
+            return None, "No transcript available"
+        texts, error = {}, None
+        for track, target in picks:
+            code = target or track['language_code']
+            text = cache_get(video_id, code, target is not None)
+            if text is None:
+                if not fresh_urls:
+                    # Only now are track URLs needed; refresh the listing if they have expired
+                    listing, error = get_track_listing(video_id, need_urls=True)
+                    if error:
+                        return None, error
+                    fresh_urls = True
+                    break
+                try:
+                    text, timing = _fetch_track(video_id, track, target,
+                                                listing.get('translation_names', {}).get(target))
+                except Exception as e:
+                    # Skip this language; the video fails only if none of its picks could be fetched
+                    print(f"  {video_id} [{code}]: {str(e)[:150]}", file=sys.stderr)
+                    error = error or _transcript_error_message(e)
+                    continue
+                if len(text) < 50:
+                    continue
+                transcript_cache_put(video_id, code, target is not None, text, timing)
+                if timed:
+                    text = timing
+            texts[code] = text
         else:
-            return None, f"Could not fetch transcript: {str(e)[:150]}"
+            if not texts:
+                return None, error or "Transcript too short or empty"
+            return texts, None
+
+
+YOUTUBE_BROWSE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                  '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+
+def resolve_max_videos(value=None):
+    """Clamp a requested playlist size limit to 1..PLAYLIST_MAX_VIDEOS (default: the configured cap)."""
+    limit = app.config['PLAYLIST_MAX_VIDEOS']
+    if value is not None:
+        try:
+            limit = min(int(value), limit)
+        except (TypeError, ValueError):
+            pass
+    return max(1, limit)
+
+
+def _continuation_token(renderer):
+    """Pull the browse continuation token out of a continuationItemRenderer."""
+    endpoint = renderer.get('continuationEndpoint') or {}
+    commands = endpoint.get('commandExecutorCommand', {}).get('commands', []) + [endpoint]
+    for command in commands:
+        token = command.get('continuationCommand', {}).get('token')
+        if token:
+            return token
+    return None
 
 
-def get_playlist_videos_api(playlist_id):
-    """Fetch playlist videos by parsing YouTube's playlist page (no yt-dlp needed)."""
+def _parse_playlist_items(items):
+    """Turn playlist renderer items into (videos, continuation_token)."""
+    videos = []
+    token = None
+    for item in items:
+        vr = item.get('playlistVideoRenderer')
+        if vr:
+            vid_id = vr.get('videoId', '')
+            title_runs = vr.get('title', {}).get('runs', [])
+            title = title_runs[0].get('text', 'Unknown') if title_runs else 'Unknown'
+            if vid_id:
+                videos.append({
+                    'id': vid_id,
+                    'title': title,
+                    'url': f'https://www.youtube.com/watch?v={vid_id}'
+                })
+        elif 'continuationItemRenderer' in item:
+            token = _continuation_token(item['continuationItemRenderer'])
+    return videos, token
+
+
+def _innertube_config(html):
+    """Read the API key and client context needed for browse continuation requests."""
+    def field(name):
+        match = re.search(r'"%s"\s*:\s*"([^"]+)"' % name, html)
+        return match.group(1) if match else None
+    
+    api_key = field('INNERTUBE_API_KEY')
+    if not api_key:
+        return None
+    client = {
+        'clientName': 'WEB',
+        'clientVersion': field('INNERTUBE_CLIENT_VERSION') or '2.20240101.00.00',
+        'hl': 'en',
+        'gl': 'US',
+    }
+    visitor_data = field('VISITOR_DATA')
+    if visitor_data:
+        client['visitorData'] = visitor_data
+    return {'api_key': api_key, 'context': {'client': client}}
+
+
+def fetch_playlist_continuation(innertube, token):
+    """Fetch the next page of a playlist. Returns (videos, next_token, error)."""
     try:
-        url = f"https://www.youtube.com/playlist?list={playlist_id}"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
-                          '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept-Language': 'en-US,en;q=0.9',
-        }
-        
-        resp = http_requests.get(url, headers=headers, timeout=15)
-        resp.raise_for_status()
-        html = resp.text
-        
-        # Extract ytInitialData JSON from the page
-        match = re.search(r'var\s+ytInitialData\s*=\s*(\{.*?\});\s*</script>', html, re.DOTALL)
-        if not match:
-            match = re.search(r'window\["ytInitialData"\]\s*=\s*(\{.*?\});\s*</script>', html, re.DOTALL)
-        
+        with metric_stage('playlist_page'):
+            resp = http_session().post(
+                'https://www.youtube.com/youtubei/v1/browse',
+                params={'key': innertube['api_key'], 'prettyPrint': 'false'},
+                json={'context': innertube['context'], 'continuation': token},
+                headers=YOUTUBE_BROWSE_HEADERS,
+                timeout=15,
+            )
+            resp.raise_for_status()
+            data = resp.json()
+    except (http_requests.exceptions.RequestException, ValueError) as e:
+        return [], None, f"Failed to fetch next playlist page: {str(e)[:150]}"
+    
+    items = []
+    for action in data.get('onResponseReceivedActions', []) + data.get('onResponseReceivedEndpoints', []):
+        items.extend(action.get('appendContinuationItemsAction', {}).get('continuationItems', []))
+    videos, next_token = _parse_playlist_items(items)
+    return videos, next_token, None
+
+
+class PlaylistListing:
+    """Playlist videos enumerated lazily, one continuation page at a time.
+    
+    Iterating yields video dicts as each page arrives, so consumers can start
+    work before the whole playlist is known. Enumeration stops after
+    `max_videos`; `truncated` then tells whether videos were left out.
+    `error` is set if a later page failed (videos already yielded stand).
+    """
+    
+    def __init__(self, videos, continuation=None, innertube=None, max_videos=None):
+        self._first_page = videos
+        self._continuation = continuation if innertube else None
+        self._innertube = innertube
+        self.max_videos = max_videos
+        self.count = 0
+        self.pages = 0
+        self.truncated = False
+        self.complete = False
+        self.error = None
+    
+    def __iter__(self):
+        videos, token = self._first_page, self._continuation
+        while True:
+            self.pages += 1
+            for video in videos:
+                if self.max_videos and self.count >= self.max_videos:
+                    self.truncated = True
+                    return
+                self.count += 1
+                yield video
+            if not token:
+                self.complete = True
+                return
+            if self.max_videos and self.count >= self.max_videos:
+                self.truncated = True
+                return
+            videos, token, error = fetch_playlist_continuation(self._innertube, token)
+            if error:
+                self.error = error
+                print(f"  Playlist enumeration stopped after {self.count} videos: {error}", file=sys.stderr)
+                return
+
+
+# ─── Fast ytInitialData extraction ───
+
+# Fixed assignment markers tried first (plain str.find), then a tolerant regex
+YT_INITIAL_DATA_MARKERS = ('var ytInitialData = ', 'window["ytInitialData"] = ')
+_YT_INITIAL_DATA_RE = re.compile(r'''(?:var\s+ytInitialData|window\[["']ytInitialData["']\])\s*=\s*''')
+# JSON strings (skipped whole, so braces inside them don't count) or braces
+_JSON_BRACE_TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*"|[{}]')
+_json_decoder = json.JSONDecoder()
+
+
+def _matching_brace_end(html, start):
+    """Scan from the '{' at `start` to just past its matching '}' (string-aware); -1 if unbalanced."""
+    depth = 0
+    for token in _JSON_BRACE_TOKEN_RE.finditer(html, start):
+        char = token.group()
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return token.end()
+    return -1
+
+
+def find_yt_initial_data(html):
+    """Return the (start, end) slice of the ytInitialData object literal, or None.
+    
+    The start is found by a fixed marker. A <script> body cannot contain
+    "</script", so the object ends at the last '}' before the next one – two
+    C-level string searches. The brace scan is only needed for fragments
+    that lack the closing tag.
+    """
+    start = -1
+    for marker in YT_INITIAL_DATA_MARKERS:
+        pos = html.find(marker)
+        if pos != -1:
+            start = pos + len(marker)
+            break
+    if start == -1:
+        match = _YT_INITIAL_DATA_RE.search(html)
         if not match:
-            return None, "Could not parse playlist page"
-        
-        try:
-            data = json.loads(match.group(1))
-        except json.JSONDecodeError:
-            return None, "Could not parse playlist data"
+            return None
+        start = match.end()
+    if html[start:start + 1] != '{':
+        return None
+    
+    script_end = html.find('</script', start)
+    if script_end != -1:
+        end = html.rfind('}', start, script_end) + 1
+    else:
+        end = _matching_brace_end(html, start)
+    return (start, end) if end > start else None
+
+
+def _decode_value(html, key, start, end):
+    """Decode the JSON value of the first `"key":` in html[start:end], or None."""
+    pos = html.find(f'"{key}"', start, end)
+    if pos == -1:
+        return None
+    pos += len(key) + 2
+    while pos < end and html[pos] in ' \t\r\n:':
+        pos += 1
+    try:
+        return _json_decoder.raw_decode(html, pos)[0]
+    except json.JSONDecodeError:
+        return None
+
+
+def _renderer_positions(html, key, start, end):
+    """Offsets of each `{"<key>":` object opening inside html[start:end]."""
+    needle = f'"{key}"'
+    positions = []
+    pos = html.find(needle, start, end)
+    while pos != -1:
+        brace = html.rfind('{', start, pos)
+        if brace != -1 and not html[brace + 1:pos].strip():
+            positions.append(brace)
+        pos = html.find(needle, pos + len(needle), end)
+    return positions
+
+
+def parse_playlist_page(html):
+    """Pull playlist videos out of a playlist page. Returns (videos, continuation_token, error).
+    
+    Only the videoId and title of each playlistVideoRenderer (and the
+    continuation item after them) are decoded; the rest of ytInitialData,
+    including the bulk of each renderer, is never parsed.
+    """
+    bounds = find_yt_initial_data(html)
+    if not bounds:
+        return None, None, "Could not parse playlist page"
+    start, end = bounds
+    
+    positions = _renderer_positions(html, 'playlistVideoRenderer', start, end)
+    items = []
+    for i, pos in enumerate(positions):
+        span_end = positions[i + 1] if i + 1 < len(positions) else end
+        items.append({'playlistVideoRenderer': {
+            'videoId': _decode_value(html, 'videoId', pos, span_end) or '',
+            'title': _decode_value(html, 'title', pos, span_end) or {},
+        }})
+    
+    tail = positions[-1] if positions else start
+    continuation = _decode_value(html, 'continuationItemRenderer', tail, end)
+    if isinstance(continuation, dict):
+        items.append({'continuationItemRenderer': continuation})
+    
+    videos, token = _parse_playlist_items(items)
+    return videos, token, None
+
+
+def get_playlist_videos_api(playlist_id, max_videos=None):
+    """Fetch a playlist's first page (no yt-dlp needed) and return (PlaylistListing, error).
+    
+    Further pages are requested via browse continuation tokens while the
+    listing is iterated.
+    """
+    try:
+        url = f"https://www.youtube.com/playlist?list={playlist_id}"
         
-        videos = []
-        try:
-            tabs = data['contents']['twoColumnBrowseResultsRenderer']['tabs']
-            for tab in tabs:
-                tab_content = tab.get('tabRenderer', {}).get('content', {})
-                section_list = tab_content.get('sectionListRenderer', {}).get('contents', [])
-                for section in section_list:
-                    item_section = section.get('itemSectionRenderer', {}).get('contents', [])
-                    for item in item_section:
-                        playlist_renderer = item.get('playlistVideoListRenderer', {})
-                        video_contents = playlist_renderer.get('contents', [])
-                        for vc in video_contents:
-                            vr = vc.get('playlistVideoRenderer', {})
-                            if vr:
-                                vid_id = vr.get('videoId', '')
-                                title_runs = vr.get('title', {}).get('runs', [])
-                                title = title_runs[0].get('text', 'Unknown') if title_runs else 'Unknown'
-                                if vid_id:
-                                    videos.append({
-                                        'id': vid_id,
-                                        'title': title,
-                                        'url': f'https://www.youtube.com/watch?v={vid_id}'
-                                    })
-        except (KeyError, IndexError, TypeError) as e:
-            print(f"  Error navigating playlist JSON: {e}", file=sys.stderr)
+        with metric_stage('playlist_page'):
+            resp = http_session().get(url, headers=YOUTUBE_BROWSE_HEADERS, timeout=15)
+            resp.raise_for_status()
+            html = resp.text
         
-        videos = videos[:50]
+        with metric_stage('initial_data_parse'):
+            videos, continuation, error = parse_playlist_page(html)
+        if error:
+            return None, error
         
         if videos:
-            return videos, None
+            return PlaylistListing(videos, continuation, _innertube_config(html), max_videos), None
         
         return None, "No videos found in playlist (playlist may be private or empty)"
         
@@ -230,8 +1281,8 @@ def get_playlist_videos_api(playlist_id):
         return None, f"Error parsing playlist: {str(e)[:150]}"
 
 
-def get_playlist_videos(playlist_url):
-    """Get playlist videos – uses web scraping (no yt-dlp needed for transcripts)."""
+def open_playlist(playlist_url, max_videos=None):
+    """Resolve a playlist or single-video URL to (PlaylistListing, error) without reading every page."""
     # Extract playlist ID
     playlist_id = extract_playlist_id(playlist_url)
     
@@ -239,48 +1290,640 @@ def get_playlist_videos(playlist_url):
     if is_single_video_url(playlist_url):
         video_id = extract_video_id(playlist_url)
         if video_id:
-            # Try to get the actual video title from the page
-            title = f'Video {video_id}'
-            try:
-                resp = http_requests.get(
-                    f'https://www.youtube.com/watch?v={video_id}',
-                    headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'},
-                    timeout=8
-                )
-                match = re.search(r'<title>(.*?)</title>', resp.text)
-                if match:
-                    raw = match.group(1).replace(' - YouTube', '').strip()
-                    if raw and raw.lower() != 'youtube':
-                        title = raw
-            except Exception:
-                pass
-            return [{
+            # The title (None here) is resolved while the transcript is fetched
+            return PlaylistListing([{
                 'id': video_id,
-                'title': title,
+                'title': None,
                 'url': f'https://www.youtube.com/watch?v={video_id}'
-            }], None
+            }], max_videos=max_videos), None
         else:
             return None, "Could not extract video ID from URL"
     
     # For playlists: Use web scraping (no yt-dlp needed)
     if playlist_id:
         print(f"  Fetching playlist {playlist_id} via web scraping...", file=sys.stderr)
-        videos, error = get_playlist_videos_api(playlist_id)
-        if videos:
-            print(f"  Found {len(videos)} videos via web scraping", file=sys.stderr)
-            return videos, None
+        listing, error = get_playlist_videos_api(playlist_id, max_videos)
+        if listing:
+            return listing, None
         return None, f"Could not fetch playlist: {error}"
     
-    # If no playlist ID and not a single video, it's an invalid URL
-    return None, "Invalid YouTube URL. Please provide a playlist URL or single video URL."
+    # If no playlist ID and not a single video, it's an invalid URL
+    return None, "Invalid YouTube URL. Please provide a playlist URL or single video URL."
+
+
+# ─── Concurrent transcript fetching ───
+
+def resolve_concurrency(value=None):
+    """Clamp a requested worker count to 1..MAX_TRANSCRIPT_WORKERS (default: TRANSCRIPT_WORKERS)."""
+    workers = app.config['TRANSCRIPT_WORKERS']
+    if value is not None:
+        try:
+            workers = int(value)
+        except (TypeError, ValueError):
+            pass
+    return max(1, min(workers, app.config['MAX_TRANSCRIPT_WORKERS']))
+
+
+def _fetch_transcript_task(video, languages=None, all_languages=False):
+    """Worker body: fetch one transcript, then pause so each worker stays polite.
+    
+    A video listed without a title (single-video URLs) gets it resolved on
+    the title pool at the same time, and filled in before the result is
+    handed back. With `all_languages` the transcript is a {language: text} dict.
+    Each transcript is added to the search index here, with its timing.
+    """
+    title = _title_pool.submit(resolve_video_title, video['id']) if video.get('title') is None else None
+    try:
+        transcripts, error = get_transcripts_direct(video['id'], languages, all_languages, timed=True)
+    except Exception as e:
+        transcripts, error = None, f"Could not fetch transcript: {str(e)[:150]}"
+    if title is not None:
+        video['title'] = title.result() or f"Video {video['id']}"
+    if transcripts:
+        texts = {}
+        for language, timed in transcripts.items():
+            if app.config['SEARCH_INDEX']:
+                search_index_transcript(video, language, timed)
+            texts[language] = timed.plain_text(range(len(timed)))
+        result = (texts if all_languages else next(iter(texts.values())), None)
+    else:
+        result = (None, error)
+    delay = app.config['TRANSCRIPT_REQUEST_DELAY']
+    if delay > 0:
+        time.sleep(delay)
+    return result
+
+
+def iter_transcripts_concurrently(videos, workers, languages=None, all_languages=False):
+    """Fetch transcripts on a bounded pool, yielding each one as soon as it finishes.
+
+    Yields (index, video, transcript_text, error) in completion order, where
+    index is the 0-based position in `videos` so callers can restore playlist
+    order. `videos` may be any iterable; at most `workers` fetches are in
+    flight at a time, so it is consumed lazily. `languages` / `all_languages`
+    are passed on to get_transcripts_direct().
+    """
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='transcript')
+    pending = {}
+    try:
+        for index, video in enumerate(videos):
+            pending[pool.submit(_fetch_transcript_task, video, languages, all_languages)] = (index, video)
+            if len(pending) < workers:
+                continue
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index_done, video_done = pending.pop(future)
+                yield (index_done, video_done) + future.result()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index_done, video_done = pending.pop(future)
+                yield (index_done, video_done) + future.result()
+    finally:
+        # Client went away or we finished: drop anything not yet started
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# ─── yt-dlp execution backends ───
+#
+# Every yt-dlp attempt goes through run_ytdlp(), which takes the same argv
+# the CLI would get. The in-process backend parses it with the yt_dlp API
+# and runs it on a warm YoutubeDL instance from a pool keyed by the option
+# set (minus URL and output template), so repeated attempts skip interpreter
+# startup, extractor imports, cookie loading and player JS downloads. The
+# subprocess backend (YTDLP_BACKEND=subprocess, or when the in-process
+# backend cannot be set up for a command line) runs the CLI as before.
+# WarmYoutubeDL resets a few YoutubeDL internals between runs. yt-dlp is
+# pinned in requirements.txt, and they are checked at startup: a release
+# without them turns the in-process backend off instead of breaking runs.
+
+try:
+    import yt_dlp
+except ImportError:  # CLI-only install: everything goes through the subprocess backend
+    yt_dlp = None
+
+
+def _check_ytdlp_internals():
+    """Whether YoutubeDL still has the private state WarmYoutubeDL.run() resets between runs."""
+    try:
+        ydl = yt_dlp.YoutubeDL({'quiet': True})
+    except Exception:
+        return False
+    try:
+        return (all(hasattr(ydl._out_files, stream) for stream in ('out', 'error', 'screen', 'console'))
+                and isinstance(ydl._download_retcode, int) and isinstance(ydl._num_downloads, int)
+                and callable(ydl._parse_outtmpl))
+    except AttributeError:
+        return False
+    finally:
+        ydl.close()
+
+
+YTDLP_INPROCESS = yt_dlp is not None and _check_ytdlp_internals()
+if yt_dlp is not None and not YTDLP_INPROCESS:
+    print(f"yt-dlp {yt_dlp.version.__version__} lacks the YoutubeDL internals the in-process backend resets; "
+          "running every attempt as a subprocess", file=sys.stderr)
+
+
+def ytdlp_inprocess():
+    """Whether yt-dlp attempts run on the in-process backend."""
+    return YTDLP_INPROCESS and app.config['YTDLP_BACKEND'] == 'inprocess'
+
+
+class YtdlpResult:
+    """Outcome of one yt-dlp run, whichever backend ran it.
+    
+    returncode, stdout and stderr mirror the CLI. `files` lists the final
+    paths yt-dlp wrote: the in-process backend gets them from its post hooks,
+    the subprocess backend from `--print after_move:filepath` lines when
+    run_ytdlp() is called with report_files=True. Only the in-process backend
+    fills `info` (the extracted info dict of the last URL).
+    """
+    
+    def __init__(self, returncode, stdout='', stderr='', info=None, files=None, backend='subprocess'):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.info = info
+        self.files = files or []
+        self.backend = backend
+
+
+class YtdlpSetupError(Exception):
+    """The in-process backend could not start a run (nothing was downloaded yet)."""
+
+
+class WarmYoutubeDL:
+    """A YoutubeDL instance kept between runs, with its output captured per run."""
+    
+    def __init__(self, params):
+        self.ydl = yt_dlp.YoutubeDL(params)
+        self.created_at = time.time()
+        self.files = []
+        self.on_progress = None
+        self.cancelled = False
+        self.broken = False
+        self.ydl.add_post_hook(self.files.append)
+        self.ydl.add_progress_hook(lambda progress: self._progress('download', progress))
+        self.ydl.add_postprocessor_hook(lambda progress: self._progress('postprocess', progress))
+    
+    def _progress(self, kind, progress):
+        if self.on_progress is not None:
+            try:
+                self.on_progress(kind, _ytdlp_progress_fields(progress, progress.get('info_dict') or {}))
+            except DownloadCancelled:
+                # yt-dlp reports exceptions from hooks as download errors; remember it was a cancel
+                self.cancelled = True
+                raise
+    
+    def run(self, parsed, on_progress=None):
+        ydl = self.ydl
+        out, err = io.StringIO(), io.StringIO()
+        ydl._out_files.out = out
+        ydl._out_files.error = err
+        ydl._out_files.screen = err if ydl.params.get('quiet') else out
+        ydl._out_files.console = None
+        # Per-run state: output template, exit code and download counter
+        ydl.params['outtmpl'] = dict(parsed.ydl_opts.get('outtmpl') or {})
+        ydl._parse_outtmpl()
+        ydl._download_retcode = 0
+        ydl._num_downloads = 0
+        self.files.clear()
+        self.on_progress = on_progress
+        self.cancelled = False
+        
+        info = None
+        try:
+            for url in parsed.urls:
+                info = ydl.extract_info(url, force_generic_extractor=ydl.params.get('force_generic_extractor', False))
+                if info is not None and ydl.params.get('dump_single_json'):
+                    ydl.to_stdout(json.dumps(ydl.sanitize_info(info)))
+            returncode = ydl._download_retcode
+        except yt_dlp.utils.DownloadError:
+            returncode = 1
+        except Exception as e:
+            # Failed mid-run, possibly after writing part of a file: a failed attempt, not one to
+            # repeat as a subprocess; the instance is not reused
+            err.write(f'ERROR: {type(e).__name__}: {e}\n')
+            returncode = 1
+            self.broken = True
+        finally:
+            self.on_progress = None
+        if self.cancelled:
+            raise DownloadCancelled()
+        
+        files = list(self.files)
+        for subtitle in ((info or {}).get('requested_subtitles') or {}).values():
+            if subtitle.get('filepath') and subtitle['filepath'] not in files:
+                files.append(subtitle['filepath'])
+        return YtdlpResult(returncode, out.getvalue(), err.getvalue(), info, files, backend='inprocess')
+    
+    def close(self):
+        try:
+            self.ydl.close()
+        except Exception as e:
+            print(f"  Closing YoutubeDL failed: {e}", file=sys.stderr)
+
+
+class YoutubeDLPool:
+    """Idle WarmYoutubeDL instances per option set; each instance serves one run at a time."""
+    
+    def __init__(self):
+        self._idle = collections.OrderedDict()  # key -> [WarmYoutubeDL], least recently used first
+        self._lock = threading.Lock()
+    
+    def acquire(self, key, params):
+        expired = []
+        warm = None
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle and warm is None:
+                candidate = idle.pop()
+                if time.time() - candidate.created_at > app.config['YTDLP_INSTANCE_MAX_AGE']:
+                    expired.append(candidate)  # refresh cookies and caches now and then
+                else:
+                    warm = candidate
+        for old in expired:
+            old.close()
+        return warm or WarmYoutubeDL(params)
+    
+    def release(self, key, warm):
+        surplus = []
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            self._idle.move_to_end(key)
+            if len(idle) < app.config['YTDLP_POOL_SIZE']:
+                idle.append(warm)
+            else:
+                surplus.append(warm)
+            while len(self._idle) > app.config['YTDLP_POOL_CONFIGS']:
+                surplus.extend(self._idle.popitem(last=False)[1])
+        for old in surplus:
+            old.close()
+
+
+ytdlp_pool = YoutubeDLPool()
+
+
+def _ytdlp_pool_key(args, urls):
+    """Option set of a command line: the arguments minus URLs and the output template."""
+    key = []
+    skip = False
+    for arg in args:
+        if skip:
+            skip = False
+        elif arg in ('-o', '--output'):
+            skip = True
+        elif arg not in urls:
+            key.append(arg)
+    return tuple(key)
+
+
+class DownloadCancelled(Exception):
+    """Raised from an on_progress callback to abort a yt-dlp run."""
+
+
+def _ytdlp_progress_fields(progress, info):
+    """A yt-dlp progress hook dict without its info dict, plus the playlist position."""
+    fields = {key: value for key, value in progress.items() if key != 'info_dict'}
+    fields['playlist_index'] = info.get('playlist_index')
+    fields['n_entries'] = info.get('n_entries')
+    return fields
+
+
+def _run_ytdlp_inprocess(argv, timeout, on_progress=None):
+    try:
+        parsed = yt_dlp.parse_options(argv[1:])
+    except (optparse.OptParseError, SystemExit) as e:  # rejected arguments: the CLI exits with 2
+        return YtdlpResult(2, stderr=f'yt-dlp: error: {e}', backend='inprocess')
+    except Exception as e:
+        raise YtdlpSetupError(f'could not parse the options: {e}') from e
+    key = _ytdlp_pool_key(argv[1:], parsed.urls)
+    try:
+        warm = ytdlp_pool.acquire(key, parsed.ydl_opts)
+    except Exception as e:
+        raise YtdlpSetupError(f'could not create YoutubeDL: {e}') from e
+    outcome = {}
+    abandoned = threading.Event()
+    
+    def run():
+        try:
+            outcome['result'] = warm.run(parsed, on_progress)
+        except BaseException as e:
+            outcome['error'] = e
+        finally:
+            # Only clean, finished runs go back to the pool
+            if abandoned.is_set() or 'error' in outcome or warm.broken:
+                warm.close()
+            else:
+                ytdlp_pool.release(key, warm)
+    
+    # A thread lets the caller give up after `timeout` like the subprocess backend
+    thread = threading.Thread(target=run, name='yt-dlp', daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        abandoned.set()
+        raise subprocess.TimeoutExpired(argv, timeout)
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['result']
+
+
+# Prefixes of the lines `--print after_move:...` and `--progress-template` add to the CLI's stdout
+YTDLP_FILE_MARKER = 'yt-dlp-file:'
+YTDLP_PROGRESS_MARKER = 'yt-dlp-progress:'
+
+
+def _parse_ytdlp_progress_line(line):
+    """(kind, fields) from a --progress-template line, or None if it cannot be read."""
+    try:
+        kind, playlist_index, n_entries, progress = line[len(YTDLP_PROGRESS_MARKER):].split(' ', 3)
+        # Fields yt-dlp does not know are printed as 'NA'
+        info = {'playlist_index': None if playlist_index == 'NA' else json.loads(playlist_index),
+                'n_entries': None if n_entries == 'NA' else json.loads(n_entries)}
+        return kind, _ytdlp_progress_fields(json.loads(progress), info)
+    except ValueError:
+        return None
+
+
+def _run_ytdlp_subprocess(argv, timeout, report_files=False, on_progress=None):
+    options = []
+    if report_files:
+        # --print implies --quiet; --no-quiet keeps the usual log output
+        options += ['--print', f'after_move:{YTDLP_FILE_MARKER}%(filepath)s', '--no-quiet']
+    if on_progress is not None:
+        for kind in ('download', 'postprocess'):
+            options += ['--progress-template',
+                        f'{kind}:{YTDLP_PROGRESS_MARKER}{kind} %(info.playlist_index)j %(info.n_entries)j %(progress)j']
+        options.append('--newline')
+    argv = argv[:1] + options + argv[1:]
+    proc = subprocess.Popen(
+        argv,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        shell=False,
+        creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0,
+    )
+    # stdout is read line by line as it is written; stderr is collected on the side
+    stderr = []
+    stderr_reader = threading.Thread(target=lambda: stderr.append(proc.stderr.read()), daemon=True)
+    stderr_reader.start()
+    timed_out = threading.Event()
+    timer = threading.Timer(timeout, lambda: (timed_out.set(), proc.kill()))
+    timer.start()
+    stdout, files = [], []
+    try:
+        for line in proc.stdout:
+            if line.startswith(YTDLP_FILE_MARKER):
+                files.append(line[len(YTDLP_FILE_MARKER):].rstrip('\r\n'))
+            elif line.startswith(YTDLP_PROGRESS_MARKER) and on_progress is not None:
+                parsed = _parse_ytdlp_progress_line(line)
+                if parsed:
+                    on_progress(*parsed)
+            else:
+                stdout.append(line)
+        proc.wait()
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        raise
+    finally:
+        timer.cancel()
+        stderr_reader.join()
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(argv, timeout, output=''.join(stdout), stderr=''.join(stderr))
+    return YtdlpResult(proc.returncode, ''.join(stdout), ''.join(stderr), files=files)
+
+
+def run_ytdlp(argv, timeout, report_files=False, on_progress=None):
+    """Run a yt-dlp command line (argv[0] is 'yt-dlp') and return a YtdlpResult.
+    
+    With report_files=True the result lists the files the run wrote, so
+    callers never have to scan a directory for them. on_progress(kind, fields)
+    is called with each yt-dlp progress update ('download' or 'postprocess'
+    hook dicts, plus playlist_index/n_entries) and may raise DownloadCancelled
+    to stop the run.
+    Raises subprocess.TimeoutExpired if it does not finish within `timeout`
+    seconds, whichever backend runs it. A timed-out subprocess is killed,
+    but a timed-out in-process attempt cannot be stopped: its thread keeps
+    running in the background until yt-dlp returns, and its instance is
+    then discarded.
+    Only a command line the in-process backend cannot set up is run again as
+    a subprocess; an error during the run is returned as a failed result.
+    """
+    if ytdlp_inprocess():
+        try:
+            return _run_ytdlp_inprocess(argv, timeout, on_progress)
+        except YtdlpSetupError as e:
+            print(f"  In-process yt-dlp unavailable ({e}); running it as a subprocess", file=sys.stderr)
+    return _run_ytdlp_subprocess(argv, timeout, report_files, on_progress)
+
+
+def make_scratch_dir(folder, prefix=''):
+    """Create a fresh directory under `folder` for one download's files."""
+    os.makedirs(folder, exist_ok=True)
+    return tempfile.mkdtemp(prefix=prefix, dir=folder)
+
+
+def list_scratch_files(scratch_dir):
+    """Files in a scratch directory, skipping yt-dlp's partial downloads."""
+    try:
+        return [entry.path for entry in os.scandir(scratch_dir)
+                if entry.is_file() and not entry.name.endswith(('.part', '.ytdl'))]
+    except OSError:
+        return []
+
+
+def clear_scratch_dir(scratch_dir):
+    """Empty a scratch directory so the next attempt does not pick up an earlier one's files."""
+    try:
+        entries = list(os.scandir(scratch_dir))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            shutil.rmtree(entry.path, ignore_errors=True)
+        else:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def prune_downloads():
+    """Remove download directories older than DOWNLOAD_RETENTION."""
+    cutoff = time.time() - app.config['DOWNLOAD_RETENTION']
+    folder = app.config['DOWNLOADS_FOLDER']
+    try:
+        for entry in os.scandir(folder):
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+    except OSError as e:
+        print(f"Could not prune {folder}: {e}", file=sys.stderr)
+
+
+# ─── Adaptive strategy ordering ───
+#
+# Every yt-dlp strategy attempt is recorded per scope ('subtitle',
+# 'download') with exponentially decayed success/failure counts and attempt
+# time, in SQLite so all workers learn together and it survives restarts.
+# Strategies are then tried cheapest-expected-cost first, and a strategy
+# that keeps failing is left out until STRATEGY_SKIP_SECONDS have passed.
+# Outcomes that say something about the video rather than the strategy
+# (no subtitles, private, sign-in required) are not recorded.
+
+STRATEGY_STATS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS strategy_stats (
+    scope TEXT NOT NULL,
+    name TEXT NOT NULL,
+    successes REAL NOT NULL,
+    failures REAL NOT NULL,
+    attempt_seconds REAL NOT NULL,
+    consecutive_failures INTEGER NOT NULL,
+    last_error TEXT,
+    last_failure_at REAL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (scope, name)
+);
+"""
+
+
+def _strategy_db():
+    return get_db(app.config['STRATEGY_STATS_DB'], STRATEGY_STATS_SCHEMA)
+
+
+def _strategy_decay(updated_at, now):
+    return 0.5 ** (max(0.0, now - updated_at) / app.config['STRATEGY_HALF_LIFE'])
+
+
+def strategy_record(scope, name, ok, seconds, error=None):
+    """Record one attempt of strategy `name`: success or failure and how long it took."""
+    metric_observe('ytsubs_ytdlp_attempt_seconds', seconds, scope=scope, strategy=name,
+                   outcome='ok' if ok else 'error')
+    now = time.time()
+    try:
+        db = _strategy_db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute("""SELECT successes, failures, attempt_seconds, consecutive_failures, last_error,
+                                       last_failure_at, updated_at
+                                FROM strategy_stats WHERE scope = ? AND name = ?""", (scope, name)).fetchone()
+            if row is None:
+                successes = failures = 0.0
+                attempt_seconds, consecutive, last_error, last_failure_at = seconds, 0, None, None
+            else:
+                decay = _strategy_decay(row[6], now)
+                successes, failures = row[0] * decay, row[1] * decay
+                # Moving average of attempt time, successful or not
+                attempt_seconds = 0.7 * row[2] + 0.3 * seconds
+                consecutive, last_error, last_failure_at = row[3], row[4], row[5]
+            if ok:
+                successes += 1
+                consecutive = 0
+            else:
+                failures += 1
+                consecutive += 1
+                last_error, last_failure_at = (error or 'failed')[:300], now
+            db.execute('INSERT OR REPLACE INTO strategy_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                       (scope, name, successes, failures, attempt_seconds, consecutive, last_error,
+                        last_failure_at, now))
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+    except sqlite3.Error as e:
+        print(f"  Strategy stats write failed: {e}", file=sys.stderr)
+
+
+def strategy_stats(scope):
+    """Current (decayed) stats per strategy name in `scope`."""
+    now = time.time()
+    try:
+        rows = _strategy_db().execute(
+            """SELECT name, successes, failures, attempt_seconds, consecutive_failures, last_error,
+                      last_failure_at, updated_at FROM strategy_stats WHERE scope = ?""", (scope,)).fetchall()
+    except sqlite3.Error as e:
+        print(f"  Strategy stats read failed: {e}", file=sys.stderr)
+        return {}
+    stats = {}
+    for name, successes, failures, attempt_seconds, consecutive, last_error, last_failure_at, updated_at in rows:
+        decay = _strategy_decay(updated_at, now)
+        successes, failures = successes * decay, failures * decay
+        stats[name] = {
+            'successes': round(successes, 3),
+            'failures': round(failures, 3),
+            # Laplace-smoothed, so a strategy with little recent data stays near 0.5
+            'success_rate': (successes + 1) / (successes + failures + 2),
+            'attempt_seconds': attempt_seconds,
+            'consecutive_failures': consecutive,
+            'last_error': last_error,
+            'last_failure_at': last_failure_at,
+            'skipped': (consecutive >= app.config['STRATEGY_SKIP_AFTER'] and last_failure_at is not None
+                        and now - last_failure_at < app.config['STRATEGY_SKIP_SECONDS']),
+        }
+    return stats
+
+
+def order_strategies(scope, strategies, group=None):
+    """Return `strategies` (dicts with a 'name') in the order to try them, minus currently failing ones.
+    
+    Sorted by expected time spent per success (attempt time / success rate),
+    which minimises the time to the first success; strategies without data
+    keep their original relative order. `group(strategy)` may pin coarse
+    tiers (e.g. no cookies before cookies) that are only reordered within.
+    If every strategy is failing they are all kept, so something is tried.
+    """
+    stats = strategy_stats(scope)
+    known = [entry['attempt_seconds'] for entry in stats.values()]
+    default_seconds = sum(known) / len(known) if known else 1.0
+    
+    def cost(strategy):
+        entry = stats.get(strategy['name'])
+        if entry is None:
+            return default_seconds / 0.5
+        return entry['attempt_seconds'] / entry['success_rate']
+    
+    ordered = [strategy for _, strategy in sorted(
+        enumerate(strategies), key=lambda item: (group(item[1]) if group else 0, cost(item[1]), item[0]))]
+    active = [strategy for strategy in ordered if not stats.get(strategy['name'], {}).get('skipped')]
+    if len(active) < len(ordered):
+        skipped = [strategy['name'] for strategy in ordered if strategy not in active]
+        print(f"  Skipping failing strategies for {scope}: {', '.join(skipped)}", file=sys.stderr)
+    return active or ordered
+
+
+@app.route('/admin/strategies')
+def list_strategy_stats():
+    """Strategy stats per scope, in the order they would be tried now."""
+    denied = require_admin()
+    if denied:
+        return denied
+    try:
+        scopes = [row[0] for row in _strategy_db().execute('SELECT DISTINCT scope FROM strategy_stats')]
+        report = {}
+        for scope in scopes:
+            stats = strategy_stats(scope)
+            order = [strategy['name'] for strategy in order_strategies(scope, [{'name': name} for name in stats])]
+            # Tried order first, then the strategies currently skipped
+            names = order + [name for name in stats if name not in order]
+            report[scope] = [dict(stats[name], name=name,
+                                  expected_seconds_per_success=stats[name]['attempt_seconds'] / stats[name]['success_rate'])
+                             for name in names]
+        return jsonify(report)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 
 def download_subtitle(video_id, video_url):
-    """Download subtitle for a single video using multiple strategies."""
-    temp_dir = app.config['UPLOAD_FOLDER']
-    # Ensure temp directory exists
-    os.makedirs(temp_dir, exist_ok=True)
-    output_template = os.path.join(temp_dir, f'{video_id}.%(ext)s')
+    """Download subtitle for a single video using multiple strategies.
+    
+    The file is written to a scratch directory of its own under the temp
+    folder; callers remove os.path.dirname() of the returned path when done.
+    """
+    scratch_dir = make_scratch_dir(app.config['UPLOAD_FOLDER'], prefix=f'{video_id}_')
+    output_template = os.path.join(scratch_dir, f'{video_id}.%(ext)s')
     
     # Get JavaScript runtime if available
     js_runtime = get_js_runtime()
@@ -405,6 +2048,7 @@ def download_subtitle(video_id, video_url):
     except:
         pass  # Continue without browser cookies
     
+    strategies = order_strategies('subtitle', strategies)
     last_error = None
     
     for idx, strategy in enumerate(strategies):
@@ -412,44 +2056,28 @@ def download_subtitle(video_id, video_url):
         if idx > 0:
             time.sleep(0.5)
         
+        started = time.time()
+        
+        def record(ok, error=None, name=strategy['name'], started=started):
+            strategy_record('subtitle', name, ok, time.time() - started, error)
+        
         try:
             print(f"  Trying {strategy['name']} for {video_id}...", file=sys.stderr)
-            result = subprocess.run(
-                strategy['cmd'],
-                capture_output=True,
-                text=True,
-                timeout=45,
-                shell=False,
-                creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0,
-            )
-
-            # Check for VTT file with multiple patterns
-            # Wait a tiny bit for file system to sync
-            time.sleep(0.1)
+            clear_scratch_dir(scratch_dir)
+            result = run_ytdlp(strategy['cmd'], timeout=45, report_files=True)
             
-            if os.path.exists(temp_dir):
-                # Pattern 1: video_id.vtt
-                # Pattern 2: video_id.en.vtt  
-                # Pattern 3: Any file starting with video_id and ending with .vtt
-                # Pattern 4: Files with video_id in the name (yt-dlp sometimes adds extra chars)
-                vtt_files = []
-                for file in os.listdir(temp_dir):
-                    if file.endswith('.vtt'):
-                        # Check if video_id is in the filename (before the .vtt extension)
-                        file_base = file[:-4]  # Remove .vtt
-                        if video_id in file_base or file.startswith(video_id):
-                            vtt_file = os.path.join(temp_dir, file)
-                            if os.path.exists(vtt_file):
-                                file_size = os.path.getsize(vtt_file)
-                                if file_size > 50:  # At least 50 bytes
-                                    vtt_files.append((vtt_file, file_size, file))
-                
-                if vtt_files:
-                    # Use the largest file (most complete)
-                    vtt_files.sort(key=lambda x: x[1], reverse=True)
-                    best_file, file_size, file_name = vtt_files[0]
-                    print(f"  ✓ Found subtitle: {file_name} ({file_size} bytes)", file=sys.stderr)
-                    return best_file, None
+            # Subtitle-only runs never reach the after_move stage, so when
+            # yt-dlp did not list the file, the scratch directory holds only
+            # what this call wrote – trusted only if the call succeeded
+            files = result.files or (list_scratch_files(scratch_dir) if result.returncode == 0 else [])
+            written = [path for path in files
+                       if path.endswith('.vtt') and os.path.exists(path) and os.path.getsize(path) > 50]
+            if written:
+                # Use the largest file (most complete)
+                best_file = max(written, key=os.path.getsize)
+                print(f"  ✓ Found subtitle: {os.path.basename(best_file)} ({os.path.getsize(best_file)} bytes)", file=sys.stderr)
+                record(True)
+                return best_file, None
 
             # Get full error output for debugging
             error_output = (result.stderr or '') + (result.stdout or '')
@@ -486,6 +2114,7 @@ def download_subtitle(video_id, video_url):
                 elif 'rate limit' in error_lower or '429' in error_output or 'too many requests' in error_lower:
                     last_error = "Rate limited by YouTube, please wait"
                     print(f"  ✗ {strategy['name']}: Rate limited", file=sys.stderr)
+                    record(False, last_error)
                     time.sleep(2)  # Wait a bit before next strategy
                     continue
                 else:
@@ -498,6 +2127,7 @@ def download_subtitle(video_id, video_url):
                     else:
                         error_msg = error_output[:200] if error_output else "Unknown error"
                     print(f"  ✗ {strategy['name']} failed: {error_msg}", file=sys.stderr)
+                    record(False, error_msg)
                     if not last_error or ('no subtitles' not in last_error.lower() and 'unavailable' not in last_error.lower()):
                         last_error = error_msg
                     continue
@@ -510,22 +2140,26 @@ def download_subtitle(video_id, video_url):
                 else:
                     # Command succeeded but no file - might be a timing issue, try next strategy
                     print(f"  ⚠ {strategy['name']} succeeded but no VTT file found", file=sys.stderr)
+                    record(False, 'No subtitle file created')
                     if not last_error:
                         last_error = "Command succeeded but no subtitle file created"
                     continue
                     
         except subprocess.TimeoutExpired:
             print(f"  ✗ {strategy['name']} timed out", file=sys.stderr)
+            record(False, 'Timeout')
             if not last_error:
                 last_error = f"{strategy['name']}: Timeout"
             continue
         except Exception as e:
             print(f"  ✗ {strategy['name']} exception: {str(e)}", file=sys.stderr)
+            record(False, str(e))
             if not last_error:
                 last_error = f"{strategy['name']}: {str(e)}"
             continue
     
     # All strategies failed
+    shutil.rmtree(scratch_dir, ignore_errors=True)
     return None, last_error or "All subtitle download strategies failed. Video may not have subtitles available."
 
 
@@ -540,214 +2174,1566 @@ def health():
     return jsonify({'status': 'ok', 'message': 'Server is running'})
 
 
-def update_progress(job_id, current, total, status, video_title=None):
-    """Update progress for a job."""
-    with progress_lock:
-        progress_store[job_id] = {
-            'current': current,
-            'total': total,
-            'percentage': int((current / total * 100)) if total > 0 else 0,
-            'status': status,
-            'video_title': video_title or '',
-            'timestamp': time.time()
-        }
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics, totalled over every process that shares METRICS_DB."""
+    metrics_flush()
+    samples = collections.defaultdict(dict)
+    try:
+        for name, labels, value in _metrics_db().execute('SELECT name, labels, value FROM metric_samples'):
+            samples[name][labels] = value
+        db = _jobs_db()
+        for kind, status, count in db.execute('SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status'):
+            samples['ytsubs_jobs'][_metric_labels({'kind': kind, 'status': status})] = count
+        samples['ytsubs_job_events_buffered'][''] = db.execute('SELECT COUNT(*) FROM job_events').fetchone()[0]
+        samples['ytsubs_job_records_buffered'][''] = db.execute('SELECT COUNT(*) FROM job_records').fetchone()[0]
+    except sqlite3.Error as e:
+        return jsonify({'error': str(e)}), 500
+    return Response(render_metrics(samples), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def parse_extract_request(data):
+    """Validate an extraction request body; returns (job params, error)."""
+    if not data:
+        return None, 'Invalid request data'
+    playlist_url = (data.get('playlist_url') or '').strip()
+    if not playlist_url:
+        return None, 'Please provide a playlist URL'
+    # Validate YouTube URL
+    if 'youtube.com' not in playlist_url and 'youtu.be' not in playlist_url:
+        return None, 'Invalid YouTube URL'
+    options, error = parse_extract_options(data)
+    if error:
+        return None, error
+    if data.get('sync'):
+        # A manifest is kept per playlist, so there is nothing to sync for a single video
+        if is_single_video_url(playlist_url) or not extract_playlist_id(playlist_url):
+            return None, 'sync needs a playlist URL'
+        options['sync'] = True
+    return dict(options, playlist_url=playlist_url), None
+
+
+def parse_batch_request(data):
+    """Validate a batch extraction request body ({"urls": [...], options}); returns (job params, error)."""
+    if not data:
+        return None, 'Invalid request data'
+    urls = data.get('urls')
+    if isinstance(urls, str):
+        urls = urls.split()
+    if not isinstance(urls, list) or not urls:
+        return None, 'Please provide a list of playlist or video URLs in "urls"'
+    if len(urls) > app.config['BATCH_MAX_INPUTS']:
+        return None, f"Too many URLs ({len(urls)}); at most {app.config['BATCH_MAX_INPUTS']} per batch"
+    urls = [str(url).strip() for url in urls]
+    for url in urls:
+        if 'youtube.com' not in url and 'youtu.be' not in url:
+            return None, f'Invalid YouTube URL: {url[:200]}'
+    options, error = parse_extract_options(data)
+    if error:
+        return None, error
+    return dict(options, urls=urls), None
+
+
+# BCP 47-style caption language codes as YouTube uses them (en, en-GB, zh-Hans, fil)
+LANGUAGE_CODE_RE = re.compile(r'^[A-Za-z]{2,3}(?:-[A-Za-z0-9]{2,8})*$')
+
+
+def parse_extract_options(data):
+    """Options shared by /extract and /extract/batch; returns (params, error)."""
+    formats = data.get('formats') or app.config['EXPORT_FORMATS']
+    compression = data.get('compression', app.config['EXPORT_COMPRESSION'])
+    if isinstance(formats, str):
+        formats = formats.split(',')
+    if isinstance(compression, str):
+        compression = [name for name in compression.split(',') if name]
+    unknown = [name for name in formats if name not in EXPORT_FORMATS]
+    if unknown:
+        return None, f"Unknown export format '{unknown[0]}' (choose from {', '.join(EXPORT_FORMATS)})"
+    unknown = [name for name in compression if name not in EXPORT_COMPRESSION]
+    if unknown:
+        return None, f"Unknown compression '{unknown[0]}' (choose from {', '.join(EXPORT_COMPRESSION)})"
+    languages = data.get('languages') or app.config['TRANSCRIPT_LANGUAGES']
+    if isinstance(languages, str):
+        languages = [code.strip() for code in languages.split(',') if code.strip()]
+    invalid = [code for code in languages if not isinstance(code, str) or not LANGUAGE_CODE_RE.match(code)]
+    if invalid:
+        return None, f"Invalid language code '{invalid[0]}'"
+    params = {
+        'workers': resolve_concurrency(data.get('concurrency')),
+        'max_videos': resolve_max_videos(data.get('max_videos')),
+        'formats': [name for name in EXPORT_FORMATS if name in formats],
+        # zstd is silently left out where the zstandard package is missing
+        'compression': [name for name in EXPORT_COMPRESSION if name in compression
+                        and (name != 'zstd' or zstandard is not None)],
+    }
+    # Only set when asked for, so plain requests keep sharing one job
+    if languages != app.config['TRANSCRIPT_LANGUAGES']:
+        params['languages'] = languages[:10]
+    if data.get('all_languages'):
+        params['all_languages'] = True
+    if data.get('records'):
+        params['records'] = True
+    return params, None
+
 
 @app.route('/extract', methods=['POST'])
 def extract_transcripts():
-    """Extract transcripts from YouTube playlist."""
+    """Extract transcripts from YouTube playlist.
+    
+    Runs as a background job, returned at once (202) with the URLs to follow
+    it (see /jobs for polling and cancelling); the job keeps going if the
+    client disconnects. With "use_sse": true its progress is streamed, and a
+    client that accepts application/x-ndjson gets every video's full
+    transcript record as soon as it is fetched, then a summary line.
+    "wait": true holds the request until the job finishes and returns its result.
+    """
     try:
         data = request.get_json()
-        if not data:
-            return jsonify({'error': 'Invalid request data'}), 400
-            
-        playlist_url = data.get('playlist_url', '').strip()
+        stream_records = 'application/x-ndjson' in request.headers.get('Accept', '')
+        if stream_records and isinstance(data, dict):
+            data = dict(data, records=True)
+        params, error = parse_extract_request(data)
+        if error:
+            return jsonify({'error': error}), 400
         use_sse = data.get('use_sse', False)
-        job_id = data.get('job_id')
-        
-        if not playlist_url:
-            return jsonify({'error': 'Please provide a playlist URL'}), 400
-        
-        # Validate YouTube URL
-        if 'youtube.com' not in playlist_url and 'youtu.be' not in playlist_url:
-            return jsonify({'error': 'Invalid YouTube URL'}), 400
     except Exception as e:
         return jsonify({'error': f'Error parsing request: {str(e)}'}), 400
     
+    try:
+        job_id = job_submit('extract', params)
+    except sqlite3.Error as e:
+        return jsonify({'error': f'Could not queue extraction: {str(e)}'}), 500
+    
+    if stream_records:
+        return Response(stream_with_context(job_record_stream(job_id)),
+                        mimetype='application/x-ndjson',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no', 'X-Job-Id': job_id})
+    
     # If SSE requested, return streaming response
-    if use_sse and job_id:
-        return Response(stream_with_context(extract_transcripts_stream(playlist_url, job_id)),
+    if use_sse:
+        return Response(stream_with_context(job_event_stream(job_id)),
                        mimetype='text/event-stream',
-                       headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+                       headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no', 'X-Job-Id': job_id})
+    if not wait_requested(data):
+        return job_accepted(job_id)
+    
+    try:
+        job = wait_for_job(job_id)
+        if job['status'] == 'complete':
+            return jsonify(job['result'])
+        return jsonify({'error': job['error'] or 'Extraction failed', 'job_id': job_id}), 400
+    
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        print(f"Error in extract_transcripts: {error_trace}", file=sys.stderr)
+        return jsonify({'error': f'Unexpected error: {str(e)}'}), 500
+
+
+@app.route('/extract/batch', methods=['POST'])
+def extract_batch():
+    """Extract transcripts for a list of playlist/video URLs in one job.
     
+    Videos listed by several inputs are fetched once; the result has one
+    entry (with its own files) per input. Like /extract, the job is returned
+    at once (202), a client accepting application/x-ndjson gets each unique
+    video's record as it is fetched, and "wait": true returns the result instead.
+    """
     try:
-        # Get playlist videos
-        videos, error = get_playlist_videos(playlist_url)
+        data = request.get_json(silent=True)
+        stream_records = 'application/x-ndjson' in request.headers.get('Accept', '')
+        if stream_records and isinstance(data, dict):
+            data = dict(data, records=True)
+        params, error = parse_batch_request(data)
         if error:
             return jsonify({'error': error}), 400
+        job_id = job_submit('batch', params)
+    except sqlite3.Error as e:
+        return jsonify({'error': f'Could not queue extraction: {str(e)}'}), 500
+    except Exception as e:
+        return jsonify({'error': f'Error parsing request: {str(e)}'}), 400
+    
+    if stream_records:
+        return Response(stream_with_context(job_record_stream(job_id)),
+                        mimetype='application/x-ndjson',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no', 'X-Job-Id': job_id})
+    if not wait_requested(data):
+        return job_accepted(job_id)
+    
+    try:
+        job = wait_for_job(job_id)
+        if job['status'] == 'complete':
+            return jsonify(job['result'])
+        return jsonify(dict(job['result'] or {}, error=job['error'] or 'Extraction failed', job_id=job_id)), 400
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        print(f"Error in extract_batch: {error_trace}", file=sys.stderr)
+        return jsonify({'error': f'Unexpected error: {str(e)}'}), 500
+
+
+VIDEO_ID_RE = re.compile(r'^[A-Za-z0-9_-]{11}$')
+
+
+def parse_timestamp(value):
+    """Seconds from '90', '90.5', '1:30' or '1:01:30.5'; returns (seconds or None, error)."""
+    if value is None or value == '':
+        return None, None
+    try:
+        seconds = 0.0
+        for part in value.split(':'):
+            seconds = seconds * 60 + float(part)
+    except ValueError:
+        return None, f"Invalid timestamp '{value[:50]}' (use seconds or [hh:]mm:ss)"
+    if seconds < 0 or len(value.split(':')) > 3:
+        return None, f"Invalid timestamp '{value[:50]}' (use seconds or [hh:]mm:ss)"
+    return seconds, None
+
+
+@app.route('/transcript/<video_id>')
+def get_timed_transcript(video_id):
+    """One video's transcript with timing, as ?format=srt|vtt|json|txt, optionally cut to ?start=&end=.
+    
+    Served from the transcript cache when possible (no yt-dlp). Cues keep
+    their times in the full video; only the requested window is decoded and
+    written out.
+    """
+    fmt = request.args.get('format', 'json')
+    if fmt not in TIMED_EXPORTS:
+        return jsonify({'error': f"Unknown format '{fmt[:20]}' (choose from {', '.join(TIMED_EXPORTS)})"}), 400
+    if not VIDEO_ID_RE.match(video_id):
+        return jsonify({'error': 'Invalid video ID'}), 400
+    start, error = parse_timestamp(request.args.get('start'))
+    if not error:
+        end, error = parse_timestamp(request.args.get('end'))
+    if not error and start is not None and end is not None and end <= start:
+        error = 'end must be after start'
+    languages = [code.strip() for code in request.args.get('languages', '').split(',') if code.strip()]
+    if not error and any(not LANGUAGE_CODE_RE.match(code) for code in languages):
+        error = 'Invalid language code'
+    if error:
+        return jsonify({'error': error}), 400
+    
+    try:
+        transcripts, error = get_transcripts_direct(video_id, languages or None, timed=True)
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        print(f"Error in get_timed_transcript: {error_trace}", file=sys.stderr)
+        return jsonify({'error': f'Unexpected error: {str(e)}'}), 500
+    if error:
+        return jsonify({'error': error}), 404
+    language, timed = next(iter(transcripts.items()))
+    indices = timed.window(start, end)
+    
+    export, mimetype, extension = TIMED_EXPORTS[fmt]
+    if fmt == 'txt':
+        body = iter([timed.plain_text(indices)])
+    elif fmt == 'json':
+        body = export(timed, indices, {'video_id': video_id, 'language': language, 'start': start, 'end': end})
+    else:
+        body = export(timed, indices)
+    headers = {'Content-Language': language}
+    if request.args.get('download', 'false') == 'true':
+        window = f'_{start or 0:g}-{end:g}' if end is not None else (f'_{start:g}-' if start else '')
+        headers['Content-Disposition'] = f'attachment; filename="{video_id}{window}.{language}.{extension}"'
+    return Response(body, mimetype=mimetype, headers=headers)
+
+
+try:
+    import zstandard
+except ImportError:  # zstd exports are skipped without it
+    zstandard = None
+
+EXPORT_FORMATS = ('txt', 'ndjson', 'json')
+mimetypes.add_type('application/x-ndjson', '.ndjson')
+# Compression -> suffix of the compressed copy (also its Content-Encoding token)
+EXPORT_COMPRESSION = {'zstd': '.zst', 'gzip': '.gz'}
+
+
+def _open_export(path, compression=None):
+    """Binary file for one export, written through `compression` if given."""
+    if compression == 'gzip':
+        return gzip.open(path, 'wb', compresslevel=6)
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor(level=10).stream_writer(open(path, 'wb'))
+    return open(path, 'wb')
+
+
+def transcript_record(index, video, text, reason=None):
+    """One video's entry in the NDJSON/JSON exports and the NDJSON stream (`index` is 0-based)."""
+    record = {'index': index + 1, 'video_id': video.get('id'), 'title': video['title']}
+    if isinstance(text, dict):
+        record.update(status='ok', texts=text)
+    elif text is not None:
+        record.update(status='ok', text=text)
+    else:
+        record.update(status='skipped', reason=reason)
+    return record
+
+
+def transcript_chars(text):
+    """Length of a transcript, or of all languages of a {language: text} one."""
+    return sum(map(len, text.values())) if isinstance(text, dict) else len(text)
+
+
+class TranscriptWriter:
+    """Streams one job's combined transcript exports to disk in playlist order.
+    
+    Transcripts arrive in completion order; the few that finish ahead of an
+    earlier video wait in a small reorder buffer and everything else goes
+    straight to the files, so memory stays flat however long the playlist is.
+    Every export ('txt', plus 'ndjson' / 'json' if asked for) is written
+    plain and through each compressor given, as '<name>.part' files that are
+    only renamed by finish().
+    """
+    
+    PREVIEW_CHARS = 500
+    
+    def __init__(self, folder, formats=('txt',), compression=(), metadata=None):
+        job = uuid.uuid4().hex
+        self.filename = f'transcripts_{job}.txt'
+        self.path = os.path.join(folder, self.filename)
+        self.exports = {}  # export name ('txt', 'ndjson.gz', ...) -> file name
+        self._files = []   # (format, final path, open file)
+        self._formats = ['txt'] + [name for name in formats if name != 'txt']
+        for fmt in self._formats:
+            for codec in [None] + list(compression):
+                name = fmt + (EXPORT_COMPRESSION[codec] if codec else '')
+                path = os.path.join(folder, f'transcripts_{job}.{name}')
+                self._files.append((fmt, path, _open_export(path + '.part', codec)))
+                self.exports[name] = os.path.basename(path)
+        self._metadata = dict(metadata or {})
+        self._pending = {}  # playlist position -> (video, text or None, skip reason)
+        self._next = 0
+        self._head = ''     # first PREVIEW_CHARS + 1 characters of the text export
+        self.written = 0
+        self._records = 0
+        self._write('json', '{"videos": [')
+    
+    def add(self, index, video, text):
+        self._pending[index] = (video, text, None)
+        with metric_stage('file_write'):
+            self._flush()
+    
+    def skip(self, index, video, reason):
+        self._pending[index] = (video, None, reason)
+        with metric_stage('file_write'):
+            self._flush()
+    
+    def _write(self, fmt, text):
+        if fmt in self._formats:
+            data = text.encode('utf-8')
+            for file_format, _, f in self._files:
+                if file_format == fmt:
+                    f.write(data)
+    
+    def _flush(self):
+        while self._next in self._pending:
+            video, text, reason = self._pending.pop(self._next)
+            self._next += 1
+            if text is not None:
+                body = text
+                if isinstance(text, dict):
+                    body = '\n\n'.join(f'--- {language} ---\n\n{part}' for language, part in text.items())
+                section = f"=== {video['title']} ===\n\n{body}\n\n\n"
+                self._write('txt', section)
+                self.written += 1
+                if len(self._head) <= self.PREVIEW_CHARS:
+                    self._head += section[:self.PREVIEW_CHARS + 1 - len(self._head)]
+            if 'ndjson' in self._formats or 'json' in self._formats:
+                line = json.dumps(transcript_record(self._next - 1, video, text, reason), ensure_ascii=False)
+                self._write('ndjson', line + '\n')
+                self._write('json', (',\n' if self._records else '\n') + line)
+                self._records += 1
+    
+    def preview(self):
+        if len(self._head) > self.PREVIEW_CHARS:
+            return self._head[:self.PREVIEW_CHARS] + "..."
+        return self._head
+    
+    def finish(self, summary=None):
+        """Write out anything still buffered, close and publish the files; returns the text file's name.
         
-        if not videos:
-            return jsonify({'error': 'No videos found in playlist'}), 400
+        `summary` is added to the JSON export's metadata.
+        """
+        for index in sorted(self._pending):
+            self._next = index
+            self._flush()
+        metadata = dict(self._metadata, **(summary or {}), generated_at=time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()))
+        self._write('json', '\n], "metadata": ' + json.dumps(metadata, ensure_ascii=False) + '}\n')
+        for _, path, f in self._files:
+            f.close()
+            os.replace(path + '.part', path)
+        return self.filename
+    
+    def discard(self):
+        """Close and remove the unfinished files (no-op after finish())."""
+        for _, path, f in self._files:
+            if not f.closed:
+                f.close()
+            try:
+                os.remove(path + '.part')
+            except OSError:
+                pass
+
+
+def prune_outputs():
+    """Remove combined transcript files older than OUTPUT_RETENTION."""
+    cutoff = time.time() - app.config['OUTPUT_RETENTION']
+    folder = app.config['OUTPUT_FOLDER']
+    try:
+        for entry in os.scandir(folder):
+            if entry.name.startswith('transcripts_') and entry.is_file() and entry.stat().st_mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+    except OSError as e:
+        print(f"Could not prune {folder}: {e}", file=sys.stderr)
+
+
+def run_extraction(playlist_url, workers=1, max_videos=None, formats=('txt',), compression=(), records=False,
+                   languages=None, all_languages=False, sync=False):
+    """Extraction pipeline run by the job workers.
+
+    Yields event dicts of type 'status', 'progress', 'error' or 'complete'.
+    Playlist pages are enumerated while transcripts are already being
+    fetched `workers` at a time, so 'total' in progress events grows until
+    'listing_complete' is true. A 'progress' event is emitted as each video
+    finishes; the combined file keeps playlist order. With `records`, each
+    finished video is also yielded right away as a 'record' event carrying
+    its transcript_record(). `languages` / `all_languages` choose the
+    caption tracks (see get_transcripts_direct). With `sync` only videos
+    without a stored transcript are fetched (see iter_synced_transcripts).
+    """
+    yield {'type': 'status', 'message': 'Fetching playlist information...', 'percentage': 5}
+    
+    listing, error = open_playlist(playlist_url, max_videos)
+    if error:
+        yield {'type': 'error', 'message': error}
+        return
+    
+    prune_outputs()
+    writer = TranscriptWriter(app.config['OUTPUT_FOLDER'], formats, compression,
+                              metadata={'playlist_url': playlist_url})
+    playlist_id = extract_playlist_id(playlist_url)
+    sync_stats = {} if sync and playlist_id else None
+    if sync_stats is not None:
+        transcripts = iter_synced_transcripts(listing, playlist_id, workers, languages, all_languages, sync_stats)
+    else:
+        transcripts = iter_transcripts_concurrently(listing, workers, languages, all_languages)
+    try:
+        yield from _extract_into(listing, writer, transcripts, records, playlist_url, sync_stats)
+    finally:
+        # Drops the partial file if the client went away or the job failed
+        writer.discard()
+
+
+def _extract_into(listing, writer, transcripts, records=False, playlist_url=None, sync_stats=None):
+    """Write every listed video's transcript from `transcripts` into `writer`, yielding progress events.
+    
+    `transcripts` yields (index, video, text, error) as iter_transcripts_concurrently() does.
+    """
+    skipped = []
+    extracted_ids = []
+    completed = 0
+    
+    yield {'type': 'progress', 'current': 0, 'total': listing.count, 'percentage': 0, 'status': 'Starting...',
+           'video_title': '', 'listing_complete': False}
+    
+    # Process videos on a bounded pool using youtube-transcript-api (no yt-dlp needed)
+    for index, video, transcript_text, error in transcripts:
+        completed += 1
+        video_title = video['title']
+        total_videos = listing.count
+        listing_done = listing.complete or listing.truncated or listing.error is not None
+        # Reserve 10% for final processing; hold at 50% until the listing size is known
+        percentage = int((completed / total_videos) * (90 if listing_done else 50))
         
-        total_videos = len(videos)
-        transcripts = []
-        skipped = []
+        if error or not transcript_text:
+            reason = error or 'No captions available'
+            writer.skip(index, video, reason)
+            if records:
+                yield {'type': 'record', 'record': transcript_record(index, video, None, reason)}
+            skipped.append((index, {'title': video_title, 'reason': reason}))
+            status = f'Skipped: {reason[:50]}'
+            print(f"  [{index + 1}/{total_videos}] Skipped: {reason}", file=sys.stderr)
+        else:
+            writer.add(index, video, transcript_text)
+            extracted_ids.append(video['id'])
+            if records:
+                yield {'type': 'record', 'record': transcript_record(index, video, transcript_text)}
+            status = 'Extracted transcript'
+            print(f"  [{index + 1}/{total_videos}] ✓ Got transcript ({transcript_chars(transcript_text)} chars)",
+                  file=sys.stderr)
         
-        # Process each video using youtube-transcript-api (no yt-dlp needed)
-        for idx, video in enumerate(videos, 1):
-            video_id = video['id']
-            video_title = video['title']
-            
-            print(f"  [{idx}/{total_videos}] Fetching transcript for: {video_title}", file=sys.stderr)
-            
-            # Use youtube-transcript-api directly (works from servers!)
-            transcript_text, error = get_transcript_direct(video_id)
-            
-            if error or not transcript_text:
-                print(f"  [{idx}/{total_videos}] Skipped: {error}", file=sys.stderr)
-                skipped.append({
-                    'title': video_title,
-                    'reason': error or 'No captions available'
-                })
-                time.sleep(0.5)  # Small delay
+        yield {'type': 'progress', 'current': completed, 'total': total_videos, 'percentage': percentage,
+               'status': status, 'video_title': video_title, 'index': index + 1,
+               'listing_complete': listing_done}
+    
+    total_videos = listing.count
+    if not total_videos:
+        yield {'type': 'error', 'message': 'No videos found in playlist'}
+        return
+    if listing.truncated:
+        yield {'type': 'status', 'percentage': 92,
+               'message': f'Playlist has more than {listing.max_videos} videos; only the first {total_videos} were processed'}
+    
+    yield {'type': 'status', 'message': 'Saving transcripts...', 'percentage': 95}
+    if playlist_url and app.config['SEARCH_INDEX']:
+        search_index_playlist(playlist_url, extracted_ids)
+    skipped = [entry for _, entry in sorted(skipped, key=lambda item: item[0])]
+    output_filename = writer.finish({
+        'total_videos': total_videos,
+        'extracted': writer.written,
+        'skipped': len(skipped),
+        'max_videos': listing.max_videos,
+        'truncated': listing.truncated,
+        'listing_error': listing.error,
+    })
+    
+    yield {
+        'type': 'complete',
+        'success': True,
+        'total_videos': total_videos,
+        'extracted': writer.written,
+        'skipped': len(skipped),
+        'preview': writer.preview(),
+        'filename': output_filename,
+        'exports': writer.exports,
+        'skipped_videos': skipped,
+        'max_videos': listing.max_videos,
+        'truncated': listing.truncated,
+        'listing_error': listing.error,
+        **({'sync': sync_stats} if sync_stats is not None else {}),
+    }
+
+
+def run_batch_extraction(urls, workers=1, max_videos=None, formats=('txt',), compression=(), records=False,
+                         languages=None, all_languages=False):
+    """Batch pipeline run by the job workers: many inputs, each unique video fetched once.
+    
+    Every input is resolved first (playlists up to `max_videos` each), then
+    the union of their videos, without duplicate IDs, goes through one
+    iter_transcripts_concurrently() pipeline. Each transcript is handed to
+    the TranscriptWriter of every input listing it, so each input still gets
+    its own files in its own order. Videos are fetched round-robin across
+    the inputs (the first video of each, then the second, ...) so every
+    writer receives its videos roughly in order and its reorder buffer stays
+    small; only a video shared by inputs at far-apart positions waits longer.
+    'record' events are per unique video and name the inputs (1-based) it
+    belongs to.
+    """
+    unique = []      # videos to fetch, round-robin over the inputs, first occurrence wins
+    members = {}     # video id -> [(input number, position in that input)]
+    inputs = []      # per input: {'url', 'listing', 'writer', 'skipped'} or {'url', 'error'}
+    listed_videos = []  # per resolved input: (input number, its videos)
+    writers = []
+    prune_outputs()
+    try:
+        for number, url in enumerate(urls):
+            yield {'type': 'status', 'percentage': int(10 * number / len(urls)),
+                   'message': f'Resolving input {number + 1} of {len(urls)}...'}
+            listing, error = open_playlist(url, max_videos)
+            if error:
+                inputs.append({'url': url, 'error': error})
                 continue
-            
-            transcripts.append({
-                'title': video_title,
-                'text': transcript_text
-            })
-            print(f"  [{idx}/{total_videos}] ✓ Got transcript ({len(transcript_text)} chars)", file=sys.stderr)
-            
-            time.sleep(0.5)  # Rate limiting
+            videos = list(listing)
+            if not videos:
+                inputs.append({'url': url, 'error': 'No videos found in playlist'})
+                continue
+            writer = TranscriptWriter(app.config['OUTPUT_FOLDER'], formats, compression,
+                                      metadata={'playlist_url': url})
+            writers.append(writer)
+            inputs.append({'url': url, 'listing': listing, 'writer': writer, 'skipped': [], 'extracted': []})
+            listed_videos.append((number, videos))
         
-        # Combine all transcripts
-        combined_text = ""
-        for transcript in transcripts:
-            combined_text += f"=== {transcript['title']} ===\n\n{transcript['text']}\n\n\n"
+        for position in range(max((len(videos) for _, videos in listed_videos), default=0)):
+            for number, videos in listed_videos:
+                if position < len(videos):
+                    video = videos[position]
+                    if video['id'] not in members:
+                        members[video['id']] = []
+                        unique.append(video)
+                    members[video['id']].append((number, position))
         
-        # Save to file
-        output_filename = 'playlist_transcripts_clean.txt'
-        output_path = os.path.join(app.config['OUTPUT_FOLDER'], output_filename)
+        listed = sum(entry['listing'].count for entry in inputs if 'listing' in entry)
+        if not unique:
+            yield {'type': 'error', 'message': 'No videos found in any input',
+                   'results': [{'input': entry['url'], 'error': entry['error']} for entry in inputs]}
+            return
+        yield {'type': 'progress', 'current': 0, 'total': len(unique), 'percentage': 10,
+               'status': f'Fetching {len(unique)} unique videos ({listed - len(unique)} duplicates skipped)...',
+               'video_title': '', 'listing_complete': True}
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(combined_text)
+        completed = extracted = 0
+        for index, video, transcript_text, error in iter_transcripts_concurrently(unique, workers, languages,
+                                                                                  all_languages):
+            completed += 1
+            reason = None if transcript_text and not error else error or 'No captions available'
+            for number, position in members[video['id']]:
+                entry = inputs[number]
+                if reason:
+                    entry['writer'].skip(position, video, reason)
+                    entry['skipped'].append((position, {'title': video['title'], 'reason': reason}))
+                else:
+                    entry['writer'].add(position, video, transcript_text)
+                    entry['extracted'].append(video['id'])
+            if records:
+                record = transcript_record(index, video, None if reason else transcript_text, reason)
+                record['inputs'] = sorted({number + 1 for number, _ in members[video['id']]})
+                yield {'type': 'record', 'record': record}
+            if reason:
+                status = f'Skipped: {reason[:50]}'
+                print(f"  [{completed}/{len(unique)}] Skipped: {reason}", file=sys.stderr)
+            else:
+                extracted += 1
+                status = 'Extracted transcript'
+                print(f"  [{completed}/{len(unique)}] ✓ Got transcript ({transcript_chars(transcript_text)} chars)",
+                      file=sys.stderr)
+            yield {'type': 'progress', 'current': completed, 'total': len(unique),
+                   'percentage': 10 + int(completed / len(unique) * 85), 'status': status,
+                   'video_title': video['title'], 'index': index + 1, 'listing_complete': True}
         
-        # Get preview (first 500 chars)
-        preview = combined_text[:500] + "..." if len(combined_text) > 500 else combined_text
+        yield {'type': 'status', 'message': 'Saving transcripts...', 'percentage': 95}
+        results = []
+        for entry in inputs:
+            if 'error' in entry:
+                results.append({'input': entry['url'], 'error': entry['error']})
+                continue
+            listing, writer = entry['listing'], entry['writer']
+            if app.config['SEARCH_INDEX']:
+                search_index_playlist(entry['url'], entry['extracted'])
+            skipped = [item for _, item in sorted(entry['skipped'], key=lambda pair: pair[0])]
+            summary = {
+                'total_videos': listing.count,
+                'extracted': writer.written,
+                'skipped': len(skipped),
+                'max_videos': listing.max_videos,
+                'truncated': listing.truncated,
+                'listing_error': listing.error,
+            }
+            filename = writer.finish(summary)
+            results.append(dict(summary, input=entry['url'], preview=writer.preview(), filename=filename,
+                                exports=writer.exports, skipped_videos=skipped))
         
-        return jsonify({
+        yield {
+            'type': 'complete',
             'success': True,
-            'total_videos': total_videos,
-            'extracted': len(transcripts),
-            'skipped': len(skipped),
-            'preview': preview,
-            'filename': output_filename,
-            'skipped_videos': skipped
+            'total_inputs': len(urls),
+            'total_videos': listed,
+            'unique_videos': len(unique),
+            'duplicates': listed - len(unique),
+            'extracted': extracted,
+            'skipped': len(unique) - extracted,
+            'results': results,
+        }
+    finally:
+        for writer in writers:
+            writer.discard()
+
+
+# ─── Playlist sync ───
+#
+# Extractions with "sync": true keep a manifest per playlist (which videos it
+# listed, where, and whether their transcript was extracted) and store each
+# extracted transcript as a piece. The next sync run only fetches videos
+# without a piece – new ones and those that failed before – and rebuilds the
+# combined files from the pieces, so a nightly re-run costs O(new videos).
+# Pieces expire after TRANSCRIPT_CACHE_TTL like cached transcripts, so a
+# corrected caption track is picked up eventually.
+
+SYNC_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sync_playlists (
+    playlist_id TEXT PRIMARY KEY,
+    video_count INTEGER NOT NULL,
+    synced_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_videos (
+    playlist_id TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    title TEXT,
+    status TEXT NOT NULL,
+    reason TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (playlist_id, video_id)
+);
+CREATE TABLE IF NOT EXISTS sync_pieces (
+    video_id TEXT NOT NULL,
+    options TEXT NOT NULL,
+    piece TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (video_id, options)
+);
+"""
+
+
+def _sync_db():
+    return get_db(app.config['SYNC_DB'], SYNC_SCHEMA)
+
+
+def sync_pieces_get(video_ids, options):
+    """Unexpired stored transcripts (text, or {language: text}) of `video_ids` for these options, by video ID."""
+    pieces = {}
+    cutoff = time.time() - app.config['TRANSCRIPT_CACHE_TTL']
+    db = _sync_db()
+    # Chunked to stay under SQLite's bound-parameter limit
+    for start in range(0, len(video_ids), 500):
+        chunk = video_ids[start:start + 500]
+        rows = db.execute(f"""SELECT video_id, piece FROM sync_pieces
+                              WHERE options = ? AND fetched_at > ?
+                              AND video_id IN ({','.join('?' * len(chunk))})""",
+                          [options, cutoff] + chunk)
+        pieces.update((video_id, json.loads(piece)) for video_id, piece in rows)
+    return pieces
+
+
+def iter_synced_transcripts(listing, playlist_id, workers, languages=None, all_languages=False, stats=None):
+    """Like iter_transcripts_concurrently(), but videos with a stored piece are not fetched again.
+    
+    The whole listing is read first and compared with the playlist's
+    manifest. Stored pieces are yielded at once; the remaining videos go
+    through the fetch pool and successful ones are stored. Once everything
+    has been yielded the manifest is replaced by this run's listing (videos
+    missing from a partial listing are kept). `stats` receives the counts.
+    """
+    videos = list(listing)
+    options = json.dumps([languages or app.config['TRANSCRIPT_LANGUAGES'], bool(all_languages)])
+    db = _sync_db()
+    known = dict(db.execute('SELECT video_id, status FROM sync_videos WHERE playlist_id = ?', (playlist_id,)))
+    pieces = sync_pieces_get([video['id'] for video in videos], options)
+    outcome = {}  # video id -> (status, reason)
+    stats = stats if stats is not None else {}
+    stats.update(new=0, retried=0, reused=0, removed=0)
+    
+    to_fetch = []
+    for index, video in enumerate(videos):
+        if video['id'] in pieces:
+            stats['reused'] += 1
+            outcome[video['id']] = ('ok', None)
+            yield index, video, pieces[video['id']], None
+        else:
+            stats['retried' if video['id'] in known else 'new'] += 1
+            to_fetch.append((index, video))
+    
+    for position, video, text, error in iter_transcripts_concurrently([video for _, video in to_fetch], workers,
+                                                                       languages, all_languages):
+        if text and not error:
+            db.execute('INSERT OR REPLACE INTO sync_pieces VALUES (?, ?, ?, ?)',
+                       (video['id'], options, json.dumps(text, ensure_ascii=False), time.time()))
+            outcome[video['id']] = ('ok', None)
+        else:
+            outcome[video['id']] = ('skipped', error or 'No captions available')
+        yield to_fetch[position][0], video, text, error
+    
+    now = time.time()
+    complete = listing.complete and not listing.truncated and listing.error is None
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        if complete:
+            listed = {video['id'] for video in videos}
+            stats['removed'] = len([video_id for video_id in known if video_id not in listed])
+            db.execute('DELETE FROM sync_videos WHERE playlist_id = ?', (playlist_id,))
+        db.executemany('INSERT OR REPLACE INTO sync_videos VALUES (?, ?, ?, ?, ?, ?, ?)',
+                       [(playlist_id, video['id'], index, video['title'], *outcome[video['id']], now)
+                        for index, video in enumerate(videos) if video['id'] in outcome])
+        db.execute('INSERT OR REPLACE INTO sync_playlists VALUES (?, ?, ?)', (playlist_id, len(videos), now))
+        # Pieces no playlist lists any more, and expired ones
+        db.execute('DELETE FROM sync_pieces WHERE video_id NOT IN (SELECT video_id FROM sync_videos) '
+                   'OR fetched_at <= ?', (now - app.config['TRANSCRIPT_CACHE_TTL'],))
+        db.execute('COMMIT')
+    except BaseException:
+        db.execute('ROLLBACK')
+        raise
+
+
+@app.route('/playlists/<playlist_id>/manifest')
+def playlist_manifest(playlist_id):
+    """The sync manifest of a playlist: when it was last synced and each video's position and status."""
+    try:
+        db = _sync_db()
+        row = db.execute('SELECT video_count, synced_at FROM sync_playlists WHERE playlist_id = ?',
+                         (playlist_id,)).fetchone()
+        if row is None:
+            return jsonify({'error': 'Playlist has not been synced'}), 404
+        videos = [dict(zip(('video_id', 'position', 'title', 'status', 'reason', 'updated_at'), video))
+                  for video in db.execute("""SELECT video_id, position, title, status, reason, updated_at
+                                             FROM sync_videos WHERE playlist_id = ? ORDER BY position""",
+                                          (playlist_id,))]
+        return jsonify({'playlist_id': playlist_id, 'video_count': row[0], 'synced_at': row[1], 'videos': videos})
+    except sqlite3.Error as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# ─── Transcript search ───
+
+SEARCH_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_videos (
+    video_id TEXT NOT NULL,
+    language TEXT NOT NULL,
+    title TEXT NOT NULL,
+    indexed_at REAL NOT NULL,
+    PRIMARY KEY (video_id, language)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS search_segments USING fts5(
+    text, video_id UNINDEXED, language UNINDEXED, start UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS search_playlists (
+    playlist_id TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    PRIMARY KEY (playlist_id, video_id)
+);
+"""
+
+# Words, "quoted phrases" and prefix* terms of a search query
+_SEARCH_TERM_RE = re.compile(r'"([^"]+)"|(\S+)')
+
+
+def _search_db():
+    return get_db(app.config['SEARCH_DB'], SEARCH_SCHEMA)
+
+
+def search_segments(timed, seconds):
+    """Group a TimedTranscript's cues into (start ms, text) segments of about `seconds` each."""
+    limit = seconds * 1000
+    first = 0
+    for index in range(1, len(timed) + 1):
+        if index == len(timed) or timed.starts[index] - timed.starts[first] >= limit:
+            yield timed.starts[first], timed.plain_text(range(first, index))
+            first = index
+
+
+def search_index_transcript(video, language, timed):
+    """Add one video's transcript to the search index (once per video and language)."""
+    try:
+        db = _search_db()
+        if db.execute('SELECT 1 FROM search_videos WHERE video_id = ? AND language = ?',
+                      (video['id'], language)).fetchone():
+            return
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            # Another worker may have indexed it meanwhile
+            if not db.execute('SELECT 1 FROM search_videos WHERE video_id = ? AND language = ?',
+                              (video['id'], language)).fetchone():
+                db.executemany('INSERT INTO search_segments (text, video_id, language, start) VALUES (?, ?, ?, ?)',
+                               [(text, video['id'], language, start)
+                                for start, text in search_segments(timed, app.config['SEARCH_SEGMENT_SECONDS'])])
+                db.execute('INSERT INTO search_videos VALUES (?, ?, ?, ?)',
+                           (video['id'], language, video['title'], time.time()))
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+    except sqlite3.Error as e:
+        print(f"  Search indexing of {video['id']} failed: {e}", file=sys.stderr)
+
+
+def search_index_playlist(playlist_url, video_ids):
+    """Record which indexed videos belong to a playlist, for /search?playlist=."""
+    playlist_id = extract_playlist_id(playlist_url)
+    if not playlist_id or not video_ids:
+        return
+    try:
+        _search_db().executemany('INSERT OR IGNORE INTO search_playlists VALUES (?, ?)',
+                                 [(playlist_id, video_id) for video_id in video_ids])
+    except sqlite3.Error as e:
+        print(f"  Search playlist update failed: {e}", file=sys.stderr)
+
+
+def search_match_expression(query):
+    """FTS5 MATCH expression for a user query: all terms must match; "phrases" and prefix* kept."""
+    terms = []
+    for phrase, word in _SEARCH_TERM_RE.findall(query):
+        term = phrase or word
+        prefix = not phrase and term.endswith('*') and len(term) > 1
+        term = term.rstrip('*') if prefix else term
+        # Quoting makes FTS5 operators and punctuation plain text
+        terms.append('"' + term.replace('"', '""') + '"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+
+def search_transcripts(query, playlist_id=None, video_id=None, limit=20, offset=0):
+    """Best-ranked (bm25) transcript segments matching `query`, as hit dicts."""
+    sql = """SELECT s.video_id, s.language, s.start, snippet(search_segments, 0, '[', ']', '…', 24),
+                    bm25(search_segments), v.title
+             FROM search_segments s
+             JOIN search_videos v ON v.video_id = s.video_id AND v.language = s.language
+             WHERE search_segments MATCH ?"""
+    args = [search_match_expression(query)]
+    if playlist_id:
+        sql += ' AND s.video_id IN (SELECT video_id FROM search_playlists WHERE playlist_id = ?)'
+        args.append(playlist_id)
+    if video_id:
+        sql += ' AND s.video_id = ?'
+        args.append(video_id)
+    sql += ' ORDER BY bm25(search_segments) LIMIT ? OFFSET ?'
+    hits = []
+    for video, language, start, snippet, score, title in _search_db().execute(sql, args + [limit, offset]):
+        hits.append({
+            'video_id': video,
+            'title': title,
+            'language': language,
+            'start': start / 1000,
+            'timestamp': _cue_timestamp(start, '.')[:8],
+            'url': f'https://www.youtube.com/watch?v={video}&t={start // 1000}s',
+            'snippet': snippet,
+            'score': round(-score, 3),
         })
+    return hits
+
+
+@app.route('/search')
+def search():
+    """Search extracted transcripts: ?q=...[&playlist=<URL or ID>][&video_id=][&limit=20][&offset=0]."""
+    query = (request.args.get('q') or '').strip()
+    if not search_match_expression(query):
+        return jsonify({'error': 'Please provide a search query (q)'}), 400
+    playlist = (request.args.get('playlist') or '').strip()
+    playlist_id = (extract_playlist_id(playlist) or playlist) if playlist else None
+    try:
+        limit = max(1, min(int(request.args.get('limit', 20)), 100))
+        offset = max(0, int(request.args.get('offset', 0)))
+    except ValueError:
+        return jsonify({'error': 'limit and offset must be integers'}), 400
+    try:
+        hits = search_transcripts(query, playlist_id, request.args.get('video_id') or None, limit, offset)
+    except sqlite3.Error as e:
+        return jsonify({'error': f'Search failed: {str(e)}'}), 500
+    return jsonify({'query': query, 'hits': hits, 'limit': limit, 'offset': offset})
+
+
+# ─── Background job queue ───
+#
+# Long-running work is queued in SQLite and executed by separate worker
+# processes, so it never ties up a web worker and survives the client going
+# away. Web requests only submit jobs and read their state back.
+
+try:
+    import fcntl
+except ImportError:  # Windows: no host-wide lock, each web process may start workers
+    fcntl = None
+
+JOBS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress TEXT,
+    result TEXT,
+    error TEXT,
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at);
+CREATE TABLE IF NOT EXISTS job_events (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+CREATE TABLE IF NOT EXISTS job_records (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    item INTEGER NOT NULL,
+    record TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq),
+    UNIQUE (job_id, item)
+);
+"""
+
+JOB_FINISHED_STATES = ('complete', 'failed', 'cancelled')
+
+# Job kind -> function(**params) yielding 'status'/'progress'/'error'/'complete' events,
+# plus 'record' events whose records are kept whole in job_records (not trimmed
+# like job_events) for /jobs/<id>/records ('download' is registered next to /download-video)
+JOB_HANDLERS = {
+    'extract': run_extraction,
+    'batch': run_batch_extraction,
+}
+
+_job_workers_started = False
+_job_workers_lock = threading.Lock()
+
+
+def _jobs_db():
+    return get_db(app.config['JOBS_DB'], JOBS_SCHEMA)
+
+
+def _job_from_row(cursor, row):
+    if row is None:
+        return None
+    job = dict(zip([column[0] for column in cursor.description], row))
+    for key in ('params', 'progress', 'result'):
+        if job[key] is not None:
+            job[key] = json.loads(job[key])
+    return job
+
+
+def _job_append_event(db, job_id, event):
+    """Append `event` to the job's event buffer under the next sequence number, trimming old ones."""
+    db.execute("""INSERT INTO job_events (job_id, seq, event)
+                  SELECT ?, COALESCE(MAX(seq), 0) + 1, ? FROM job_events WHERE job_id = ?""",
+               (job_id, json.dumps(event), job_id))
+    db.execute("""DELETE FROM job_events WHERE job_id = ? AND seq <= (
+                      SELECT MAX(seq) FROM job_events WHERE job_id = ?) - ?""",
+               (job_id, job_id, app.config['JOB_EVENT_BUFFER']))
+
+
+def job_submit(kind, params):
+    """Queue a job and make sure this host has workers to run it; returns the job id.
+    
+    If an identical job is already queued or running, its id is returned
+    instead, so concurrent requests for the same playlist share one run.
+    """
+    encoded = json.dumps(params, sort_keys=True)
+    now = time.time()
+    db = _jobs_db()
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        row = db.execute("""SELECT id FROM jobs WHERE kind = ? AND params = ? AND status IN ('queued', 'running')
+                            AND cancel_requested = 0 ORDER BY created_at DESC LIMIT 1""", (kind, encoded)).fetchone()
+        if row:
+            job_id = row[0]
+        else:
+            job_id = uuid.uuid4().hex
+            db.execute(
+                'INSERT INTO jobs (id, kind, params, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (job_id, kind, encoded, 'queued', now, now),
+            )
+            _job_append_event(db, job_id, {'type': 'status', 'message': 'Queued...', 'percentage': 0})
+        db.execute('COMMIT')
+    except BaseException:
+        db.execute('ROLLBACK')
+        raise
+    ensure_job_workers()
+    return job_id
+
+
+def job_get(job_id):
+    """Return the job as a dict (params/progress/result decoded), or None if unknown or evicted."""
+    cursor = _jobs_db().execute('SELECT * FROM jobs WHERE id = ?', (job_id,))
+    return _job_from_row(cursor, cursor.fetchone())
+
+
+def job_claim(worker):
+    """Atomically take the oldest runnable job for `worker`, or return None.
+
+    A running job whose worker stopped reporting is runnable again until it
+    has used up JOB_MAX_ATTEMPTS (or was cancelled meanwhile).
+    """
+    now = time.time()
+    stale = now - app.config['JOB_STALE_AFTER']
+    db = _jobs_db()
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        db.execute("""UPDATE jobs SET status = 'cancelled', finished_at = ?, updated_at = ?
+                      WHERE status = 'running' AND updated_at < ? AND cancel_requested = 1""",
+                   (now, now, stale))
+        db.execute("""UPDATE jobs SET status = 'failed', error = ?, finished_at = ?, updated_at = ?
+                      WHERE status = 'running' AND updated_at < ? AND attempts >= ?""",
+                   ('Worker stopped responding', now, now, stale, app.config['JOB_MAX_ATTEMPTS']))
+        row = db.execute("""SELECT id FROM jobs
+                            WHERE status = 'queued' OR (status = 'running' AND updated_at < ?)
+                            ORDER BY created_at LIMIT 1""", (stale,)).fetchone()
+        if row:
+            db.execute("""UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, updated_at = ?
+                          WHERE id = ?""", (worker, now, row[0]))
+        db.execute('COMMIT')
+    except BaseException:
+        db.execute('ROLLBACK')
+        raise
+    return job_get(row[0]) if row else None
+
+
+def job_report(job_id, worker, event):
+    """Publish a progress/status event from `worker` (also its heartbeat); returns True if it should stop."""
+    db = _jobs_db()
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        owned = db.execute("""UPDATE jobs SET progress = ?, updated_at = ?
+                              WHERE id = ? AND worker = ? AND status = 'running'""",
+                           (json.dumps(event), time.time(), job_id, worker)).rowcount
+        if owned:
+            _job_append_event(db, job_id, event)
+        db.execute('COMMIT')
+    except BaseException:
+        db.execute('ROLLBACK')
+        raise
+    row = db.execute('SELECT cancel_requested, worker, status FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    # Also stop if the job was evicted or handed to another worker after we stalled
+    return row is None or bool(row[0]) or row[1] != worker or row[2] != 'running'
+
+
+def job_touch(job_id, worker):
+    """Refresh the heartbeat of a job `worker` is running, without publishing an event."""
+    _jobs_db().execute("UPDATE jobs SET updated_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                       (time.time(), job_id, worker))
+
+
+def job_add_record(job_id, worker, record):
+    """Store one result record (e.g. a finished video's transcript) for NDJSON followers.
+    
+    Records are numbered in the order they arrive; one already stored for the
+    same item by an earlier attempt of the job is kept as it is.
+    """
+    db = _jobs_db()
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        if db.execute("SELECT 1 FROM jobs WHERE id = ? AND worker = ? AND status = 'running'",
+                      (job_id, worker)).fetchone():
+            db.execute("""INSERT OR IGNORE INTO job_records (job_id, seq, item, record)
+                          SELECT ?, COALESCE(MAX(seq), 0) + 1, ?, ? FROM job_records WHERE job_id = ?""",
+                       (job_id, record['index'], json.dumps(record, ensure_ascii=False), job_id))
+        db.execute('COMMIT')
+    except BaseException:
+        db.execute('ROLLBACK')
+        raise
+
+
+def _job_final_event(job_id, status, result=None, error=None):
+    """The 'complete' / 'error' event that ends a job's event stream."""
+    if status == 'complete':
+        return dict(result, type='complete')
+    message = 'Job was cancelled' if status == 'cancelled' else error or 'Job failed'
+    return dict(result or {}, type='error', message=message, job_id=job_id)
+
+
+def job_finish(job_id, worker, status, result=None, error=None):
+    """Move a running job to a finished state (ignored if another worker has taken it over)."""
+    now = time.time()
+    db = _jobs_db()
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        finished = db.execute(
+            """UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, updated_at = ?
+               WHERE id = ? AND worker = ? AND status = 'running'""",
+            (status, json.dumps(result) if result is not None else None, error, now, now, job_id, worker),
+        ).rowcount
+        if finished:
+            _job_append_event(db, job_id, _job_final_event(job_id, status, result, error))
+        db.execute('COMMIT')
+    except BaseException:
+        db.execute('ROLLBACK')
+        raise
+
+
+def job_cancel(job_id):
+    """Cancel a queued job now, or ask the worker running it to stop; returns the job."""
+    now = time.time()
+    db = _jobs_db()
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        if db.execute("""UPDATE jobs SET status = 'cancelled', cancel_requested = 1, finished_at = ?, updated_at = ?
+                         WHERE id = ? AND status = 'queued'""", (now, now, job_id)).rowcount:
+            _job_append_event(db, job_id, _job_final_event(job_id, 'cancelled'))
+        db.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+        db.execute('COMMIT')
+    except BaseException:
+        db.execute('ROLLBACK')
+        raise
+    return job_get(job_id)
+
+
+def job_evict():
+    """Forget finished jobs older than JOB_TTL."""
+    try:
+        db = _jobs_db()
+        db.execute('DELETE FROM jobs WHERE finished_at < ?', (time.time() - app.config['JOB_TTL'],))
+        db.execute('DELETE FROM job_events WHERE job_id NOT IN (SELECT id FROM jobs)')
+        db.execute('DELETE FROM job_records WHERE job_id NOT IN (SELECT id FROM jobs)')
+    except sqlite3.Error as e:
+        print(f"Job eviction failed: {e}", file=sys.stderr)
+
+
+def job_public(job):
+    """The client-facing view of a job."""
+    view = {
+        'job_id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'progress': job['progress'],
+        'error': job['error'],
+        'attempts': job['attempts'],
+        'created_at': job['created_at'],
+        'updated_at': job['updated_at'],
+        'finished_at': job['finished_at'],
+    }
+    if job['status'] == 'complete':
+        view['result'] = job['result']
+    elif job['result'] is not None:
+        view['details'] = job['result']
+    return view
+
+
+def _job_heartbeat(job_id, worker, stop):
+    """Keep a running job's heartbeat fresh until `stop` is set, however long its handler goes without an event."""
+    while not stop.wait(app.config['JOB_STALE_AFTER'] / 4):
+        try:
+            job_touch(job_id, worker)
+        except sqlite3.Error as e:
+            print(f"[{worker}] Heartbeat for job {job_id} failed: {e}", file=sys.stderr)
+
+
+def run_job(job, worker):
+    """Run one claimed job to completion, recording progress and honouring cancellation.
+    
+    A heartbeat thread refreshes the job while the handler runs, so a long
+    silent stretch (a slow yt-dlp fallback chain, reading a large playlist)
+    is not mistaken for a dead worker and the job handed to another one.
+    """
+    job_id = job['id']
+    print(f"[{worker}] Running {job['kind']} job {job_id}", file=sys.stderr)
+    stop_heartbeat = threading.Event()
+    threading.Thread(target=_job_heartbeat, args=(job_id, worker, stop_heartbeat),
+                     name=f'job-heartbeat-{job_id}', daemon=True).start()
+    events = JOB_HANDLERS[job['kind']](**job['params'])
+    try:
+        for event in events:
+            if event['type'] == 'record':
+                job_add_record(job_id, worker, event['record'])
+                continue
+            if event['type'] == 'complete':
+                result = dict(event)
+                del result['type']
+                job_finish(job_id, worker, 'complete', result=result)
+                return
+            if event['type'] == 'error':
+                # Anything besides the message (e.g. hints) is kept as the failed job's details
+                details = {key: value for key, value in event.items() if key not in ('type', 'message')}
+                job_finish(job_id, worker, 'failed', result=details or None, error=event['message'])
+                return
+            if job_report(job_id, worker, event):
+                print(f"[{worker}] Job {job_id} cancelled", file=sys.stderr)
+                job_finish(job_id, worker, 'cancelled')
+                return
+        job_finish(job_id, worker, 'failed', error='Job ended without a result')
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        print(f"[{worker}] Error in job {job_id}: {error_trace}", file=sys.stderr)
+        job_finish(job_id, worker, 'failed', error=f'Unexpected error: {str(e)}')
+    finally:
+        # Stops the transcript pool and removes partial output on early exit
+        events.close()
+        stop_heartbeat.set()
+
+
+def run_job_worker(follow_parent=False):
+    """Job worker main loop (`python app.py worker`).
+
+    With follow_parent the worker exits once the process that started it is
+    gone, so workers supervised by a web process do not outlive it.
+    """
+    worker = f'{socket.gethostname()}:{os.getpid()}'
+    parent = os.getppid()
+    print(f"[{worker}] Job worker started", file=sys.stderr)
+    warm_capabilities()
+    last_evict = 0
+    while not (follow_parent and os.getppid() != parent):
+        if time.time() - last_evict > 60:
+            job_evict()
+            last_evict = time.time()
+        try:
+            job = job_claim(worker)
+        except sqlite3.Error as e:
+            print(f"[{worker}] Could not claim a job: {e}", file=sys.stderr)
+            job = None
+        if job is None:
+            time.sleep(app.config['JOB_POLL_INTERVAL'])
+            continue
+        run_job(job, worker)
+    print(f"[{worker}] Parent process exited, stopping", file=sys.stderr)
+
+
+def _supervise_job_workers(count):
+    """Keep `count` worker processes alive while this process holds the host-wide lock."""
+    lock_file = open(os.path.join(app.config['CACHE_FOLDER'], 'job-workers.lock'), 'a')
+    while fcntl is not None:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            break
+        except OSError:
+            # Another web process supervises the workers; take over if it exits
+            time.sleep(5)
+    procs = []
+    while True:
+        procs = [proc for proc in procs if proc.poll() is None]
+        while len(procs) < count:
+            procs.append(subprocess.Popen([sys.executable, os.path.abspath(__file__), 'worker', '--follow-parent']))
+            print(f"Started job worker process {procs[-1].pid}", file=sys.stderr)
+        time.sleep(5)
+
+
+def ensure_job_workers():
+    """Start the embedded worker supervisor in this process (once; no-op if JOB_WORKERS is 0)."""
+    global _job_workers_started
+    if _job_workers_started or app.config['JOB_WORKERS'] <= 0:
+        return
+    with _job_workers_lock:
+        if not _job_workers_started:
+            threading.Thread(target=_supervise_job_workers, args=(app.config['JOB_WORKERS'],),
+                             name='job-supervisor', daemon=True).start()
+            _job_workers_started = True
+
+
+def job_accepted(job_id):
+    """The 202 response for a queued job: its current state and where to follow it."""
+    view = dict(job_public(job_get(job_id)), status_url=f'/jobs/{job_id}', events_url=f'/jobs/{job_id}/events',
+                result_url=f'/jobs/{job_id}/result')
+    response = jsonify(view)
+    response.headers['Location'] = view['status_url']
+    return response, 202
+
+
+def wait_requested(data):
+    """Whether a request asked to be held until its job finishes ("wait": true in the body, or ?wait=1)."""
+    value = data.get('wait', request.args.get('wait'))
+    return value in (True, 1, '1', 'true')
+
+
+def wait_for_job(job_id):
+    """Block until the job finishes and return it (only for requests sent with `wait`)."""
+    while True:
+        job = job_get(job_id)
+        if job is None or job['status'] in JOB_FINISHED_STATES:
+            return job
+        time.sleep(app.config['JOB_POLL_INTERVAL'])
+
+
+def job_events_after(job_id, last_seq):
+    """Buffered events of a job with a sequence number above `last_seq`, as (seq, event) pairs."""
+    rows = _jobs_db().execute('SELECT seq, event FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq',
+                              (job_id, last_seq)).fetchall()
+    return [(seq, json.loads(event)) for seq, event in rows]
+
+
+def parse_last_event_id(value):
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def job_event_stream(job_id, last_event_id=0):
+    """Follow a job as SSE, starting after `last_event_id`, until its 'complete' or 'error' event.
     
+    Every event carries its sequence number as the SSE id, so a client that
+    reconnects with Last-Event-ID only receives what it missed (or the
+    oldest still buffered events, if it was away for longer). Any number of
+    clients can follow the same job.
+    """
+    try:
+        last_seq = last_event_id
+        last_sent = time.time()
+        while True:
+            # Read the status first so events written just before the job finished are not missed
+            job = job_get(job_id)
+            events = job_events_after(job_id, last_seq)
+            for seq, event in events:
+                last_seq = seq
+                yield f"id: {seq}\ndata: {json.dumps(dict(event, job_id=job_id))}\n\n"
+                if event['type'] in ('complete', 'error'):
+                    return
+            if events:
+                last_sent = time.time()
+            if job is None:
+                yield f"data: {json.dumps({'type': 'error', 'message': 'Job not found', 'job_id': job_id})}\n\n"
+                return
+            if job['status'] in JOB_FINISHED_STATES:
+                # Finished without a final event (worker lost); report it from the job row
+                final = _job_final_event(job_id, job['status'], job['result'], job['error'])
+                yield f"data: {json.dumps(final)}\n\n"
+                return
+            if time.time() - last_sent > 15:
+                # Comment line keeps proxies from closing an idle stream
+                last_sent = time.time()
+                yield ": keep-alive\n\n"
+            time.sleep(app.config['JOB_POLL_INTERVAL'])
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"Error in extract_transcripts: {error_trace}", file=sys.stderr)
-        return jsonify({'error': f'Unexpected error: {str(e)}'}), 500
+        print(f"Error in job_event_stream: {error_trace}", file=sys.stderr)
+        yield f"data: {json.dumps({'type': 'error', 'message': f'Unexpected error: {str(e)}'})}\n\n"
+
+
+def job_records_after(job_id, last_seq):
+    """Stored records of a job with a sequence number above `last_seq`, as (seq, record JSON) pairs."""
+    return _jobs_db().execute('SELECT seq, record FROM job_records WHERE job_id = ? AND seq > ? ORDER BY seq',
+                              (job_id, last_seq)).fetchall()
+
 
-def extract_transcripts_stream(playlist_url, job_id):
-    """Stream progress updates for transcript extraction."""
+def job_record_stream(job_id, after=0):
+    """Follow a job as NDJSON: each record as soon as it is stored, then a summary or error line.
+    
+    Record lines are the stored records with "type": "transcript" and their
+    "seq" added, so a client can resume with after=<last seq>. While nothing
+    new arrives for 15s the job's current progress is sent as a "progress"
+    line to keep proxies from closing the connection.
+    """
     try:
-        # Get playlist videos
-        yield f"data: {json.dumps({'type': 'status', 'message': 'Fetching playlist information...', 'percentage': 5})}\n\n"
-        
-        videos, error = get_playlist_videos(playlist_url)
-        if error:
-            yield f"data: {json.dumps({'type': 'error', 'message': error})}\n\n"
-            return
-        
-        if not videos:
-            yield f"data: {json.dumps({'type': 'error', 'message': 'No videos found in playlist'})}\n\n"
-            return
-        
-        total_videos = len(videos)
-        transcripts = []
-        skipped = []
-        
-        update_progress(job_id, 0, total_videos, 'Processing videos', '')
-        yield f"data: {json.dumps({'type': 'progress', 'current': 0, 'total': total_videos, 'percentage': 0, 'status': 'Starting...', 'video_title': ''})}\n\n"
-        
-        # Process each video using youtube-transcript-api
-        for idx, video in enumerate(videos, 1):
-            video_id = video['id']
-            video_title = video['title']
-            
-            percentage = int((idx / total_videos) * 90)  # Reserve 10% for final processing
-            update_progress(job_id, idx, total_videos, 'Fetching transcript', video_title)
-            yield f"data: {json.dumps({'type': 'progress', 'current': idx, 'total': total_videos, 'percentage': percentage, 'status': 'Fetching transcript', 'video_title': video_title})}\n\n"
-            
-            # Use youtube-transcript-api directly (works from servers!)
-            transcript_text, error = get_transcript_direct(video_id)
-            
-            if error or not transcript_text:
-                skipped.append({
-                    'title': video_title,
-                    'reason': error or 'No captions available'
-                })
-                update_progress(job_id, idx, total_videos, f'Skipped: {error[:50] if error else "No captions"}', video_title)
-                skip_reason = error[:50] if error else "No captions"
-                yield f"data: {json.dumps({'type': 'progress', 'current': idx, 'total': total_videos, 'percentage': percentage, 'status': f'Skipped: {skip_reason}', 'video_title': video_title})}\n\n"
-                time.sleep(0.5)
-                continue
-            
-            transcripts.append({
-                'title': video_title,
-                'text': transcript_text
-            })
-            update_progress(job_id, idx, total_videos, 'Extracted transcript', video_title)
-            yield f"data: {json.dumps({'type': 'progress', 'current': idx, 'total': total_videos, 'percentage': percentage, 'status': 'Extracted transcript', 'video_title': video_title})}\n\n"
-            
-            time.sleep(0.5)
-        
-        # Combine all transcripts
-        yield f"data: {json.dumps({'type': 'status', 'message': 'Combining transcripts...', 'percentage': 95})}\n\n"
-        combined_text = ""
-        for transcript in transcripts:
-            combined_text += f"=== {transcript['title']} ===\n\n{transcript['text']}\n\n\n"
-        
-        # Save to file
-        output_filename = 'playlist_transcripts_clean.txt'
-        output_path = os.path.join(app.config['OUTPUT_FOLDER'], output_filename)
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(combined_text)
-        
-        # Get preview (first 500 chars)
-        preview = combined_text[:500] + "..." if len(combined_text) > 500 else combined_text
-        
-        # Final result
-        result = {
-            'type': 'complete',
-            'success': True,
-            'total_videos': total_videos,
-            'extracted': len(transcripts),
-            'skipped': len(skipped),
-            'preview': preview,
-            'filename': output_filename,
-            'skipped_videos': skipped
-        }
-        update_progress(job_id, total_videos, total_videos, 'Complete', '')
-        yield f"data: {json.dumps(result)}\n\n"
-        
+        last_seq = after
+        last_sent = time.time()
+        while True:
+            # Read the status first so records stored just before the job finished are not missed
+            job = job_get(job_id)
+            rows = job_records_after(job_id, last_seq)
+            for seq, record in rows:
+                last_seq = seq
+                # Splice the fields in rather than decode and re-encode each (possibly long) transcript
+                yield f'{{"type": "transcript", "seq": {seq}, {record[1:]}\n'
+            if rows:
+                last_sent = time.time()
+            if job is None:
+                yield json.dumps({'type': 'error', 'message': 'Job not found', 'job_id': job_id}) + '\n'
+                return
+            if job['status'] in JOB_FINISHED_STATES:
+                final = _job_final_event(job_id, job['status'], job['result'], job['error'])
+                if final['type'] == 'complete':
+                    final.update(type='summary', job_id=job_id)
+                yield json.dumps(final, ensure_ascii=False) + '\n'
+                return
+            if time.time() - last_sent > 15:
+                last_sent = time.time()
+                yield json.dumps(dict(job['progress'] or {}, type='progress', job_id=job_id)) + '\n'
+            time.sleep(app.config['JOB_POLL_INTERVAL'])
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"Error in extract_transcripts_stream: {error_trace}", file=sys.stderr)
-        yield f"data: {json.dumps({'type': 'error', 'message': f'Unexpected error: {str(e)}'})}\n\n"
+        print(f"Error in job_record_stream: {error_trace}", file=sys.stderr)
+        yield json.dumps({'type': 'error', 'message': f'Unexpected error: {str(e)}'}) + '\n'
+
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """Queue a transcript extraction (or join the identical one already running)."""
+    try:
+        params, error = parse_extract_request(request.get_json(silent=True))
+        if error:
+            return jsonify({'error': error}), 400
+        job_id = job_submit('extract', params)
+        return job_accepted(job_id)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    """Current state of a job."""
+    try:
+        job = job_get(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        if job['status'] == 'queued':
+            ensure_job_workers()
+        return jsonify(job_public(job))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a queued job, or stop a running one (after its current video, or at its next download progress update)."""
+    try:
+        job = job_cancel(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job_public(job))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/jobs/<job_id>/result')
+def get_job_result(job_id):
+    """Result of a completed job (409 while it is still queued/running or if it failed)."""
+    try:
+        job = job_get(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        if job['status'] != 'complete':
+            return jsonify({'error': job['error'] or f"Job is {job['status']}", 'status': job['status']}), 409
+        return jsonify(job['result'])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Follow a job's progress as Server-Sent Events, resuming after Last-Event-ID if given."""
+    last_event_id = parse_last_event_id(request.headers.get('Last-Event-ID', request.args.get('last_event_id')))
+    return Response(stream_with_context(job_event_stream(job_id, last_event_id)),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/jobs/<job_id>/records')
+def job_records(job_id):
+    """Follow an extraction submitted with records=true as NDJSON, resuming after ?after=<seq> if given."""
+    return Response(stream_with_context(job_record_stream(job_id, parse_last_event_id(request.args.get('after')))),
+                    mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+def send_stored_file(folder, relative_path, download_name=None):
+    """Send a file below app.config[folder] as an attachment, or 404.
+    
+    Range/If-Range requests get 206 and If-None-Match/If-Modified-Since get
+    304, from the file's ETag and mtime, so interrupted downloads resume.
+    With FILE_OFFLOAD only headers are returned and the front proxy streams
+    the file with sendfile (and answers ranges itself).
+    """
+    root = os.path.abspath(app.config[folder])
+    file_path = safe_join(root, relative_path)
+    if not file_path or not os.path.isfile(file_path):
+        return jsonify({'error': 'File not found'}), 404
+    download_name = download_name or os.path.basename(file_path)
+    mimetype, compressed = mimetypes.guess_type(download_name)
+    if compressed or not mimetype:
+        # A compressed file asked for by name is sent as the archive it is
+        mimetype = 'application/gzip' if compressed == 'gzip' else 'application/octet-stream'
+    
+    if app.config['FILE_OFFLOAD'] == 'x-accel-redirect':
+        location = os.path.relpath(file_path, os.path.dirname(root)).replace(os.sep, '/')
+        response = Response(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = app.config['FILE_OFFLOAD_PREFIX'].rstrip('/') + '/' + quote(location)
+        ascii_name = unicodedata.normalize('NFKD', download_name).encode('ascii', 'ignore').decode('ascii').replace('"', '')
+        response.headers['Content-Disposition'] = (f'attachment; filename="{ascii_name}"; '
+                                                   f"filename*=UTF-8''{quote(download_name)}")
+        return response
+    
+    # send_file answers conditional and range requests itself (and sets
+    # X-Sendfile instead of a body when FILE_OFFLOAD=x-sendfile)
+    return send_file(file_path, mimetype=mimetype, as_attachment=True, download_name=download_name,
+                     conditional=True, etag=True)
+
+
+def negotiate_stored_encoding(folder, name):
+    """(stored file name, Content-Encoding) of the best precompressed copy of `name` the client accepts.
+    
+    Falls back to (name, None): the file as stored, never compressed again
+    on the fly, which also covers files that are compressed already.
+    """
+    if app.config['FILE_OFFLOAD'] != 'x-accel-redirect':  # nginx's gzip_static does this itself
+        for encoding, suffix in EXPORT_COMPRESSION.items():
+            if request.accept_encodings.quality(encoding) > 0 and \
+                    os.path.isfile(os.path.join(app.config[folder], name + suffix)):
+                return name + suffix, encoding
+    return name, None
 
 
 @app.route('/download/<filename>')
 def download_file(filename):
-    """Download the generated transcript file."""
+    """Download a generated transcript export, precompressed if the client accepts it."""
     try:
-        file_path = os.path.join(app.config['OUTPUT_FOLDER'], secure_filename(filename))
-        if os.path.exists(file_path):
-            return send_file(file_path, as_attachment=True, download_name=filename)
-        else:
-            return jsonify({'error': 'File not found'}), 404
+        stored, encoding = negotiate_stored_encoding('OUTPUT_FOLDER', secure_filename(filename))
+        response = send_stored_file('OUTPUT_FOLDER', stored, download_name=filename)
+        if encoding and isinstance(response, Response):
+            response.headers['Content-Encoding'] = encoding
+        if isinstance(response, Response):
+            response.vary.add('Accept-Encoding')
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -762,6 +3748,8 @@ def cleanup():
             try:
                 if os.path.isfile(file_path):
                     os.remove(file_path)
+                elif os.path.isdir(file_path):
+                    shutil.rmtree(file_path)  # per-download scratch directories
             except:
                 pass
         
@@ -791,7 +3779,100 @@ def validate_cookie_file(cookie_path):
         return False, f"Error reading cookie file: {str(e)}"
 
 
-def get_js_runtime():
+# ─── Capability registry ───
+#
+# Probing for a JS runtime or usable browser cookies means spawning
+# subprocesses (and, for cookies, hitting YouTube), so results are cached:
+# in memory per process and in SQLite so all gunicorn and job workers share
+# one probe. Values older than CAPABILITY_TTL are still served while a
+# background thread re-probes; POST /admin/capabilities/refresh forces it.
+
+CAPABILITIES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS capabilities (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    probed_at REAL NOT NULL,
+    duration REAL NOT NULL
+);
+"""
+
+
+class Capability:
+    """One cached probe result, shared across processes through the capabilities table."""
+    
+    # How often a process re-reads the shared row, to pick up other processes' probes
+    RECHECK_SECONDS = 60
+    
+    def __init__(self, name, probe):
+        self.name = name
+        self.probe = probe
+        self.value = None
+        self.probed_at = None
+        self.duration = None
+        self._checked_at = 0
+        self._probe_lock = threading.Lock()
+    
+    def _load(self):
+        try:
+            row = _capabilities_db().execute('SELECT value, probed_at, duration FROM capabilities WHERE name = ?',
+                                             (self.name,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"  Capability cache read failed: {e}", file=sys.stderr)
+            return
+        if row and (self.probed_at is None or row[1] > self.probed_at):
+            self.value, self.probed_at, self.duration = json.loads(row[0]), row[1], row[2]
+    
+    def get(self):
+        """Return the cached value, probing now if there is none and in the background if it is stale."""
+        now = time.time()
+        if now - self._checked_at > self.RECHECK_SECONDS:
+            self._checked_at = now
+            self._load()
+        if self.probed_at is None:
+            self.refresh(only_if_missing=True)
+        elif now - self.probed_at > app.config['CAPABILITY_TTL']:
+            self.refresh_in_background()
+        return self.value
+    
+    def refresh(self, wait=True, only_if_missing=False):
+        """Run the probe and publish its result; with wait=False, skip if a probe is already running."""
+        if not self._probe_lock.acquire(blocking=wait):
+            return
+        try:
+            if only_if_missing and self.probed_at is not None:
+                return  # another thread finished the first probe while we waited for the lock
+            started = time.time()
+            value = self.probe()
+            self.value, self.probed_at, self.duration = value, time.time(), time.time() - started
+            print(f"  Probed {self.name}: {value!r} ({self.duration:.1f}s)", file=sys.stderr)
+            try:
+                _capabilities_db().execute('INSERT OR REPLACE INTO capabilities VALUES (?, ?, ?, ?)',
+                                           (self.name, json.dumps(value), self.probed_at, self.duration))
+            except sqlite3.Error as e:
+                print(f"  Capability cache write failed: {e}", file=sys.stderr)
+        finally:
+            self._probe_lock.release()
+    
+    def refresh_in_background(self):
+        if not self._probe_lock.locked():
+            threading.Thread(target=self.refresh, kwargs={'wait': False},
+                             name=f'probe-{self.name}', daemon=True).start()
+    
+    def info(self):
+        return {
+            'value': self.value,
+            'probed_at': self.probed_at,
+            'age': time.time() - self.probed_at if self.probed_at is not None else None,
+            'duration': self.duration,
+            'refreshing': self._probe_lock.locked(),
+        }
+
+
+def _capabilities_db():
+    return get_db(app.config['CAPABILITIES_DB'], CAPABILITIES_SCHEMA)
+
+
+def _probe_js_runtime():
     """Detect available JavaScript runtime for yt-dlp."""
     # Check common Node.js locations (for Render deployments)
     node_paths = [
@@ -837,7 +3918,7 @@ def get_js_runtime():
     
     return None
 
-def get_browser_cookies():
+def _probe_browser_cookies():
     """Try to find browser cookies automatically."""
     browsers = ['chrome', 'firefox', 'edge', 'opera', 'brave']
     available = []
@@ -860,245 +3941,588 @@ def get_browser_cookies():
     return available
 
 
+CAPABILITIES = {
+    'js_runtime': Capability('js_runtime', _probe_js_runtime),
+    'browser_cookies': Capability('browser_cookies', _probe_browser_cookies),
+}
+_capabilities_warmed = False
+
+
+def get_js_runtime():
+    """Cached JavaScript runtime for yt-dlp ('node', 'deno' or None)."""
+    return CAPABILITIES['js_runtime'].get()
+
+
+def get_browser_cookies():
+    """Cached list of browsers whose cookies yt-dlp can read."""
+    return list(CAPABILITIES['browser_cookies'].get() or [])
+
+
+def warm_capabilities():
+    """Probe anything not cached yet in the background, once per process."""
+    global _capabilities_warmed
+    if _capabilities_warmed:
+        return
+    _capabilities_warmed = True
+    
+    def warm():
+        for capability in CAPABILITIES.values():
+            capability.get()
+    threading.Thread(target=warm, name='probe-warmup', daemon=True).start()
+
+
+@app.before_request
+def _warm_capabilities_on_first_request():
+    warm_capabilities()
+
+
+def require_admin():
+    """Return an error response unless the request carries ADMIN_TOKEN, else None."""
+    token = app.config['ADMIN_TOKEN']
+    if not token:
+        return jsonify({'error': 'Admin endpoints are disabled (set ADMIN_TOKEN)'}), 403
+    supplied = request.headers.get('X-Admin-Token') or request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8')):
+        return jsonify({'error': 'Invalid admin token'}), 401
+    return None
+
+
+@app.route('/admin/capabilities')
+def list_capabilities():
+    """Show cached capability probe results."""
+    denied = require_admin()
+    if denied:
+        return denied
+    return jsonify({name: capability.info() for name, capability in CAPABILITIES.items()})
+
+
+@app.route('/admin/capabilities/refresh', methods=['POST'])
+def refresh_capabilities():
+    """Re-probe capabilities now (all, or those named in ?name=)."""
+    denied = require_admin()
+    if denied:
+        return denied
+    names = request.args.getlist('name') or list(CAPABILITIES)
+    unknown = [name for name in names if name not in CAPABILITIES]
+    if unknown:
+        return jsonify({'error': f"Unknown capability: {', '.join(unknown)}"}), 400
+    for name in names:
+        CAPABILITIES[name].refresh()
+    return jsonify({name: CAPABILITIES[name].info() for name in names})
+
+
+# ─── Download scheduler ───
+#
+# Every running download attempt (in any worker process on this host) holds
+# a lease in SQLite. Its connection count is fixed when it starts, since
+# yt-dlp cannot change --concurrent-fragments mid-run: a fair share of
+# DOWNLOAD_CONNECTIONS, never more than is left. Its bandwidth share,
+# DOWNLOAD_BANDWIDTH divided by the live leases, is recomputed every few
+# seconds and enforced by pacing yt-dlp's progress callbacks, so a long
+# 'best' download gives up bandwidth as soon as another one starts. That
+# pacing only holds for the in-process backend; a yt-dlp subprocess is
+# capped with --limit-rate at the share it had when its attempt started.
+
+DOWNLOAD_LEASES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS download_leases (
+    id TEXT PRIMARY KEY,
+    connections INTEGER NOT NULL,
+    heartbeat_at REAL NOT NULL
+);
+"""
+
+# Leases refresh their heartbeat this often while downloading; one not
+# refreshed for DOWNLOAD_LEASE_STALE seconds (finished, merging, or its
+# process died) no longer counts
+DOWNLOAD_LEASE_REFRESH = 2
+DOWNLOAD_LEASE_STALE = 10
+
+
+def _download_leases_db():
+    return get_db(app.config['DOWNLOAD_LEASES_DB'], DOWNLOAD_LEASES_SCHEMA)
+
+
+class DownloadLease:
+    """One running download's share of the host's connection and bandwidth budget."""
+    
+    def __init__(self, fragments):
+        """Register a download that would use up to `fragments` connections (1 = a single stream)."""
+        self.id = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._seen = {}  # filename -> downloaded_bytes last reported
+        self._paid_until = 0.0  # pacing clock: when the bytes seen so far fit the share
+        now = time.time()
+        db = _download_leases_db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.execute('DELETE FROM download_leases WHERE heartbeat_at < ?', (now - DOWNLOAD_LEASE_STALE,))
+            active, used = db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(connections), 0) FROM download_leases').fetchone()
+            budget = app.config['DOWNLOAD_CONNECTIONS']
+            self.connections = max(1, min(fragments, budget // (active + 1), budget - used))
+            db.execute('INSERT INTO download_leases (id, connections, heartbeat_at) VALUES (?, ?, ?)',
+                       (self.id, self.connections, now))
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        self._active = active + 1
+        self._refreshed_at = now
+    
+    def rate(self):
+        """Current bandwidth share in bytes/s (None when unlimited); refreshes the heartbeat."""
+        now = time.time()
+        if now - self._refreshed_at >= DOWNLOAD_LEASE_REFRESH:
+            db = _download_leases_db()
+            db.execute('UPDATE download_leases SET heartbeat_at = ? WHERE id = ?', (now, self.id))
+            self._active = max(1, db.execute('SELECT COUNT(*) FROM download_leases WHERE heartbeat_at >= ?',
+                                             (now - DOWNLOAD_LEASE_STALE,)).fetchone()[0])
+            self._refreshed_at = now
+        total = app.config['DOWNLOAD_BANDWIDTH']
+        return total / self._active if total > 0 else None
+    
+    def throttle(self, progress):
+        """Hold up the reporting download thread until its bytes fit this lease's share."""
+        downloaded = progress.get('downloaded_bytes')
+        if progress.get('status') != 'downloading' or downloaded is None:
+            return
+        with self._lock:
+            key = progress.get('filename')
+            received = max(0, downloaded - self._seen.get(key, 0))
+            self._seen[key] = max(downloaded, self._seen.get(key, 0))
+            rate = self.rate()
+            if not rate or not received:
+                return
+            now = time.time()
+            self._paid_until = max(self._paid_until, now) + received / rate
+            delay = self._paid_until - now
+        # Wake up at least every refresh interval so a changed share is picked up
+        time.sleep(min(delay, DOWNLOAD_LEASE_REFRESH))
+    
+    def release(self):
+        try:
+            _download_leases_db().execute('DELETE FROM download_leases WHERE id = ?', (self.id,))
+        except sqlite3.Error as e:
+            print(f"Could not release download lease: {e}", file=sys.stderr)
+
+
+def throughput_options(lease):
+    """yt-dlp options for a download holding `lease`.
+    
+    The subprocess backend cannot be paced reliably through its output pipe,
+    so it also gets --limit-rate: the lease's current bandwidth share split
+    over its connections (yt-dlp applies the limit per fragment download).
+    It is recomputed for every attempt but fixed for the attempt's lifetime.
+    """
+    options = []
+    if lease.connections > 1:
+        options += ['--concurrent-fragments', str(lease.connections)]
+    rate = lease.rate()
+    if rate and not ytdlp_inprocess():
+        options += ['--limit-rate', str(max(1, int(rate / lease.connections)))]
+    return options
+
+
 @app.route('/download-video', methods=['POST'])
 def download_video():
-    """Download YouTube video(s) using yt-dlp - legitimate method."""
-    try:
-        # Get form data
-        video_url = request.form.get('video_url', '').strip()
-        cookie_file = request.files.get('cookie_file')
-        download_type = request.form.get('download_type', 'video')
-        quality = request.form.get('quality', 'best')
-        yes_playlist = request.form.get('yes_playlist', 'false') == 'true'
-        playlist_start = request.form.get('playlist_start', '').strip()
-        playlist_end = request.form.get('playlist_end', '').strip()
-        playlist_items = request.form.get('playlist_items', '').strip()
-        
-        if not video_url:
-            return jsonify({'error': 'Please provide a YouTube URL'}), 400
-        
-        # Validate YouTube URL
-        if 'youtube.com' not in video_url and 'youtu.be' not in video_url:
-            return jsonify({'error': 'Invalid YouTube URL'}), 400
-        
-        # Handle cookie file upload with validation
-        cookie_path = None
-        cookie_valid = False
-        cookie_message = ""
-        if cookie_file and cookie_file.filename:
-            cookie_filename = secure_filename(cookie_file.filename)
-            cookie_path = os.path.join(app.config['COOKIES_FOLDER'], cookie_filename)
-            cookie_file.save(cookie_path)
-            cookie_valid, cookie_message = validate_cookie_file(cookie_path)
-            if not cookie_valid:
-                return jsonify({
-                    'error': f'Invalid cookie file: {cookie_message}',
-                    'hint': 'Please export cookies in Netscape format while logged into YouTube'
-                }), 400
-        
-        # Build download strategies - legitimate methods only
-        # Strategy: Try without cookies first (for public videos), then with cookies if needed
-        strategies = []
-        
-        # Get available browser cookies automatically
-        available_browsers = get_browser_cookies()
-        
-        # Strategy 1: Try without cookies (for public videos) - most common case
-        # Use web client first (most reliable for public videos)
-        player_clients = ['web', 'android', 'ios']
-        
-        for client in player_clients:
+    """Download YouTube video(s) using yt-dlp - legitimate method.
+    
+    Runs as a background job, returned at once (202, follow it via /jobs/<id>
+    or /jobs/<id>/events). A client that accepts text/event-stream gets its
+    progress streamed instead, and `wait=true` holds the request until the
+    download finishes and returns its result.
+    """
+    try:
+        params, error = parse_download_request(request.form, request.files.get('cookie_file'))
+        if error:
+            return jsonify(error), 400
+        job_id = job_submit('download', params)
+    except Exception as e:
+        return jsonify({'error': f'Could not queue download: {str(e)}'}), 500
+    
+    if 'text/event-stream' in request.headers.get('Accept', ''):
+        return Response(stream_with_context(job_event_stream(job_id)),
+                       mimetype='text/event-stream',
+                       headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    if not wait_requested(request.form):
+        return job_accepted(job_id)
+    
+    try:
+        job = wait_for_job(job_id)
+        if job['status'] == 'complete':
+            return jsonify(job['result'])
+        return jsonify(dict(job['result'] or {}, error=job['error'] or 'Download failed', job_id=job_id)), 400
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        print(f"Error in download_video: {error_trace}", file=sys.stderr)
+        return jsonify({'error': f'Unexpected error: {str(e)}'}), 500
+
+
+def parse_download_request(form, cookie_file=None):
+    """Validate a /download-video form and save its cookie file; returns (job params, error body)."""
+    video_url = form.get('video_url', '').strip()
+    if not video_url:
+        return None, {'error': 'Please provide a YouTube URL'}
+    
+    # Validate YouTube URL
+    if 'youtube.com' not in video_url and 'youtu.be' not in video_url:
+        return None, {'error': 'Invalid YouTube URL'}
+    
+    # Handle cookie file upload with validation
+    cookie_path = None
+    if cookie_file and cookie_file.filename:
+        cookie_filename = secure_filename(cookie_file.filename)
+        cookie_path = os.path.join(app.config['COOKIES_FOLDER'], cookie_filename)
+        cookie_file.save(cookie_path)
+        cookie_valid, cookie_message = validate_cookie_file(cookie_path)
+        if not cookie_valid:
+            return None, {
+                'error': f'Invalid cookie file: {cookie_message}',
+                'hint': 'Please export cookies in Netscape format while logged into YouTube'
+            }
+    
+    return {
+        'video_url': video_url,
+        'cookie_path': cookie_path,
+        'download_type': form.get('download_type', 'video'),
+        'quality': form.get('quality', 'best'),
+        'yes_playlist': form.get('yes_playlist', 'false') == 'true',
+        'playlist_start': form.get('playlist_start', '').strip(),
+        'playlist_end': form.get('playlist_end', '').strip(),
+        'playlist_items': form.get('playlist_items', '').strip(),
+        'throughput': form.get('throughput', 'true' if app.config['DOWNLOAD_THROUGHPUT'] else 'false') == 'true',
+    }, None
+
+
+def download_progress_event(kind, progress):
+    """A job 'progress' event from a yt-dlp progress update (see run_ytdlp's on_progress).
+    
+    'phase' is 'download', 'merge' or 'postprocess'. Downloads report bytes,
+    total, speed (bytes/s), ETA (seconds) and, for fragmented formats, the
+    fragment position. 'percentage' covers the whole playlist when yt-dlp
+    knows its size, otherwise the current file.
+    """
+    status = progress.get('status')
+    event = {'type': 'progress', 'status': status}
+    if kind == 'download':
+        total = progress.get('total_bytes') or progress.get('total_bytes_estimate')
+        event.update({
+            'phase': 'download',
+            'filename': os.path.basename(progress.get('filename') or ''),
+            'downloaded_bytes': progress.get('downloaded_bytes'),
+            'total_bytes': total,
+            'speed': progress.get('speed'),
+            'eta': progress.get('eta'),
+            'fragment_index': progress.get('fragment_index'),
+            'fragment_count': progress.get('fragment_count'),
+        })
+        if status == 'finished':
+            fraction = 1.0
+        elif total and progress.get('downloaded_bytes') is not None:
+            fraction = min(progress['downloaded_bytes'] / total, 1.0)
+        elif progress.get('fragment_count') and progress.get('fragment_index'):
+            fraction = progress['fragment_index'] / progress['fragment_count']
+        else:
+            fraction = None
+    else:
+        postprocessor = progress.get('postprocessor')
+        event['phase'] = 'merge' if postprocessor == 'Merger' else 'postprocess'
+        event['postprocessor'] = postprocessor
+        fraction = 1.0  # postprocessing starts once the file is downloaded
+    
+    index, count = progress.get('playlist_index'), progress.get('n_entries')
+    if index and count:
+        event['item'], event['items'] = index, count
+        fraction = (index - 1 + (fraction or 0)) / count
+    if fraction is not None:
+        event['percentage'] = round(fraction * 100, 1)
+    return event
+
+
+def _ytdlp_with_progress(cmd, timeout, lease=None):
+    """Run a download in a background thread; yields progress events, then its YtdlpResult.
+    
+    Updates are coalesced to one event per JOB_POLL_INTERVAL (status and
+    phase changes always get through), and the latest one is repeated while
+    yt-dlp is silent, e.g. during a long merge, so followers can see the
+    download is still going. With a DownloadLease the download is paced to its bandwidth
+    share. Closing the generator aborts the run at its next update.
+    """
+    updates = queue.Queue()
+    cancelled = threading.Event()
+    outcome = {}
+    
+    def on_progress(kind, progress):
+        if cancelled.is_set():
+            raise DownloadCancelled()
+        if lease is not None and kind == 'download':
+            lease.throttle(progress)
+        updates.put(download_progress_event(kind, progress))
+    
+    def run():
+        try:
+            outcome['result'] = run_ytdlp(cmd, timeout, report_files=True, on_progress=on_progress)
+        except BaseException as e:
+            outcome['error'] = e
+        finally:
+            updates.put(None)
+    
+    thread = threading.Thread(target=run, name='yt-dlp-download', daemon=True)
+    thread.start()
+    heartbeat = app.config['JOB_STALE_AFTER'] / 4
+    latest = sent = None
+    sent_at = 0
+    try:
+        while True:
+            try:
+                event = updates.get(timeout=heartbeat)
+            except queue.Empty:
+                if latest is not None:
+                    sent_at = time.time()
+                    yield latest
+                continue
+            if event is None:
+                break
+            latest = event
+            changed = sent is None or (event['phase'], event['status']) != (sent['phase'], sent['status'])
+            if changed or time.time() - sent_at >= app.config['JOB_POLL_INTERVAL']:
+                sent, sent_at = event, time.time()
+                yield event
+    finally:
+        cancelled.set()
+        thread.join(5)  # give an aborted run a moment to stop writing before its directory is removed
+    if 'error' in outcome:
+        raise outcome['error']
+    yield outcome['result']
+
+
+def run_download(video_url, cookie_path=None, download_type='video', quality='best', yes_playlist=False,
+                 playlist_start='', playlist_end='', playlist_items='', throughput=True):
+    """Download pipeline run by the job workers (see download_video for the parameters).
+    
+    Yields 'status' events as strategies are tried, 'progress' events while
+    yt-dlp downloads, then 'complete' with the files or 'error' with hints.
+    """
+    yield {'type': 'status', 'message': 'Preparing download...', 'percentage': 0}
+    
+    # Build download strategies - legitimate methods only
+    # Strategy: Try without cookies first (for public videos), then with cookies if needed
+    strategies = []
+    
+    # Get available browser cookies automatically
+    available_browsers = get_browser_cookies()
+    
+    # Strategy 1: Try without cookies (for public videos) - most common case
+    # Use web client first (most reliable for public videos)
+    player_clients = ['web', 'android', 'ios']
+    
+    for client in player_clients:
+        cmd = ['yt-dlp', '--no-warnings']
+        cmd.extend(['--extractor-args', f'youtube:player_client={client}'])
+        strategies.append({
+            'name': f'Public video ({client} client)',
+            'cmd': cmd,
+            'use_cookies': False,
+            'priority': 1 if client == 'web' else 2
+        })
+    
+    # Strategy 2: If cookies provided, try with file cookies
+    if cookie_path and os.path.exists(cookie_path):
+        for client in ['web', 'android']:
             cmd = ['yt-dlp', '--no-warnings']
             cmd.extend(['--extractor-args', f'youtube:player_client={client}'])
+            cmd.extend(['--cookies', cookie_path])
             strategies.append({
-                'name': f'Public video ({client} client)',
+                'name': f'File cookies ({client} client)',
                 'cmd': cmd,
-                'use_cookies': False,
-                'priority': 1 if client == 'web' else 2
+                'use_cookies': True,
+                'priority': 3
             })
+    
+    # Strategy 3: Try browser cookies automatically (if available)
+    for browser in available_browsers:
+        cmd = ['yt-dlp', '--no-warnings']
+        cmd.extend(['--extractor-args', 'youtube:player_client=web'])
+        cmd.extend(['--cookies-from-browser', browser])
+        strategies.append({
+            'name': f'Auto {browser.capitalize()} cookies',
+            'cmd': cmd,
+            'use_cookies': True,
+            'priority': 4
+        })
+    
+    # Sort strategies by priority (public videos first, then cookies)
+    strategies.sort(key=lambda x: x.get('priority', 99))
+    # Within each tier, try first whatever has been working best lately
+    strategies = order_strategies('download', strategies, group=lambda x: x['use_cookies'])
+    
+    # This download's files go to a directory of its own
+    prune_downloads()
+    scratch_dir = make_scratch_dir(app.config['DOWNLOADS_FOLDER'])
+    
+    # Add common options to all strategies
+    for strategy in strategies:
+        strategy_cmd = strategy['cmd']
         
-        # Strategy 2: If cookies provided, try with file cookies
-        if cookie_path and os.path.exists(cookie_path) and cookie_valid:
-            for client in ['web', 'android']:
-                cmd = ['yt-dlp', '--no-warnings']
-                cmd.extend(['--extractor-args', f'youtube:player_client={client}'])
-                cmd.extend(['--cookies', cookie_path])
-                strategies.append({
-                    'name': f'File cookies ({client} client)',
-                    'cmd': cmd,
-                    'use_cookies': True,
-                    'priority': 3
-                })
+        # Playlist options
+        if yes_playlist:
+            strategy_cmd.append('--yes-playlist')
         
-        # Strategy 3: Try browser cookies automatically (if available)
-        for browser in available_browsers:
-            cmd = ['yt-dlp', '--no-warnings']
-            cmd.extend(['--extractor-args', 'youtube:player_client=web'])
-            cmd.extend(['--cookies-from-browser', browser])
-            strategies.append({
-                'name': f'Auto {browser.capitalize()} cookies',
-                'cmd': cmd,
-                'use_cookies': True,
-                'priority': 4
-            })
+        if playlist_start:
+            strategy_cmd.extend(['--playlist-start', playlist_start])
         
-        # Sort strategies by priority (public videos first, then cookies)
-        strategies.sort(key=lambda x: x.get('priority', 99))
+        if playlist_end:
+            strategy_cmd.extend(['--playlist-end', playlist_end])
         
-        # Add common options to all strategies
-        for strategy in strategies:
-            strategy_cmd = strategy['cmd']
-            
-            # Playlist options
-            if yes_playlist:
-                strategy_cmd.append('--yes-playlist')
-            
-            if playlist_start:
-                strategy_cmd.extend(['--playlist-start', playlist_start])
-            
-            if playlist_end:
-                strategy_cmd.extend(['--playlist-end', playlist_end])
-            
-            if playlist_items:
-                strategy_cmd.extend(['--playlist-items', playlist_items])
-            
-            # Download type options
-            if download_type == 'audio':
-                strategy_cmd.extend(['-x', '--audio-format', 'mp3'])
-            elif download_type == 'subtitle':
-                strategy_cmd.extend(['--write-auto-sub', '--sub-format', 'srt', '--sub-lang', 'en', '--skip-download'])
-            else:
-                # Video download
-                if quality == 'best':
-                    strategy_cmd.extend(['-f', 'bestvideo+bestaudio/best'])
-                elif quality == '720p':
-                    strategy_cmd.extend(['-f', '22'])
-                elif quality == '480p':
-                    strategy_cmd.extend(['-f', '18'])
-                elif quality == '360p':
-                    strategy_cmd.extend(['-f', '18'])
-                elif quality == 'worst':
-                    strategy_cmd.extend(['-f', 'worst'])
-            
-            # Output template
-            output_template = os.path.join(app.config['DOWNLOADS_FOLDER'], '%(title)s.%(ext)s')
-            strategy_cmd.extend(['-o', output_template])
-            
-            # Add URL
-            strategy_cmd.append(video_url)
+        if playlist_items:
+            strategy_cmd.extend(['--playlist-items', playlist_items])
         
-        # Try each strategy
-        last_error = None
-        downloaded_files = []
-        result = None
+        # Download type options
+        if download_type == 'audio':
+            strategy_cmd.extend(['-x', '--audio-format', 'mp3'])
+        elif download_type == 'subtitle':
+            strategy_cmd.extend(['--write-auto-sub', '--sub-format', 'srt', '--sub-lang', 'en', '--skip-download'])
+        else:
+            # Video download
+            if quality == 'best':
+                strategy_cmd.extend(['-f', 'bestvideo+bestaudio/best'])
+            elif quality == '720p':
+                strategy_cmd.extend(['-f', '22'])
+            elif quality == '480p':
+                strategy_cmd.extend(['-f', '18'])
+            elif quality == '360p':
+                strategy_cmd.extend(['-f', '18'])
+            elif quality == 'worst':
+                strategy_cmd.extend(['-f', 'worst'])
+        
+        # Output template
+        output_template = os.path.join(scratch_dir, '%(title)s.%(ext)s')
+        strategy_cmd.extend(['-o', output_template])
         
-        for strategy in strategies:
+        # Add URL
+        strategy_cmd.append(video_url)
+    
+    # Try each strategy
+    last_error = None
+    downloaded_files = []
+    result = None
+    strategy_used = None
+    
+    try:
+        for idx, strategy in enumerate(strategies):
+            started = time.time()
+            yield {'type': 'status', 'message': f"Trying {strategy['name']}...", 'strategy': strategy['name'],
+                   'attempt': idx + 1, 'attempts': len(strategies)}
+            lease = DownloadLease(app.config['DOWNLOAD_FRAGMENTS'] if throughput else 1)
             try:
                 print(f"Trying strategy: {strategy['name']}", file=sys.stderr)
-                result = subprocess.run(
-                    strategy['cmd'],
-                    capture_output=True,
-                    text=True,
-                    timeout=600,  # 10 minute timeout
-                    shell=False,
-                    creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
-                )
+                clear_scratch_dir(scratch_dir)
+                cmd = strategy['cmd'][:1] + throughput_options(lease) + strategy['cmd'][1:]
+                for update in _ytdlp_with_progress(cmd, timeout=600, lease=lease):  # 10 minute timeout
+                    if isinstance(update, YtdlpResult):
+                        result = update
+                    else:
+                        yield dict(update, strategy=strategy['name'], connections=lease.connections)
                 
-                # Check if files were downloaded
-                if os.path.exists(app.config['DOWNLOADS_FOLDER']):
-                    current_time = time.time()
-                    for file in os.listdir(app.config['DOWNLOADS_FOLDER']):
-                        file_path = os.path.join(app.config['DOWNLOADS_FOLDER'], file)
-                        if os.path.isfile(file_path):
-                            file_mtime = os.path.getmtime(file_path)
-                            # Check if file was modified in the last 2 minutes
-                            if current_time - file_mtime < 120:
-                                downloaded_files.append({
-                                    'name': file,
-                                    'size': os.path.getsize(file_path),
-                                    'path': file_path
-                                })
+                # yt-dlp reports the final paths; subtitle-only runs are not
+                # listed, but the scratch directory only holds this attempt's
+                # files. A failed run's files (an unmerged format, the first
+                # items of a playlist) are not a result.
+                written = (result.files or list_scratch_files(scratch_dir)) if result.returncode == 0 else []
+                for file_path in written:
+                    if os.path.isfile(file_path):
+                        downloaded_files.append({
+                            'name': os.path.relpath(file_path, app.config['DOWNLOADS_FOLDER']).replace(os.sep, '/'),
+                            'size': os.path.getsize(file_path),
+                            'path': file_path
+                        })
                 
                 # If files were downloaded, success!
                 if downloaded_files:
+                    strategy_used = strategy['name']
+                    strategy_record('download', strategy['name'], True, time.time() - started)
                     break
                 
                 # If no files but no error, continue to next strategy
                 if result.returncode == 0:
+                    strategy_record('download', strategy['name'], False, time.time() - started, 'No files downloaded')
                     continue
                 
                 # Store error for reporting
                 error_msg = result.stderr or result.stdout or 'Unknown error'
                 if 'member' in error_msg.lower() or 'private' in error_msg.lower() or 'unavailable' in error_msg.lower():
                     last_error = f"{strategy['name']}: {error_msg[:300]}"
-                elif 'ERROR' in error_msg.upper():
-                    last_error = f"{strategy['name']}: {error_msg[:300]}"
-                    
+                else:
+                    strategy_record('download', strategy['name'], False, time.time() - started, error_msg)
+                    if 'ERROR' in error_msg.upper():
+                        last_error = f"{strategy['name']}: {error_msg[:300]}"
+            
             except subprocess.TimeoutExpired:
                 last_error = f"{strategy['name']}: Download timed out"
+                strategy_record('download', strategy['name'], False, time.time() - started, 'Timeout')
                 continue
             except Exception as e:
                 last_error = f"{strategy['name']}: {str(e)}"
+                strategy_record('download', strategy['name'], False, time.time() - started, str(e))
                 continue
+            finally:
+                lease.release()
+    finally:
+        # Drops partial files if the job was cancelled or every strategy failed
+        if not downloaded_files:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+    
+    # If no files downloaded after all strategies, return error with helpful hints
+    if len(downloaded_files) == 0:
+        error_msg = last_error or 'Download failed - no files were downloaded'
         
-        # If no files downloaded after all strategies, return error with helpful hints
-        if len(downloaded_files) == 0:
-            error_msg = last_error or 'Download failed - no files were downloaded'
-            
-            # Provide specific hints based on error
-            hints = []
-            if result:
-                error_output = (result.stderr or result.stdout or '').lower()
-                if 'member' in error_output or 'private' in error_output:
-                    hints.append("This appears to be a member-only or private video")
-                    hints.append("You need to provide valid cookies from a browser where you're logged in as a member")
-                    if available_browsers:
-                        hints.append(f"Auto-detected browsers: {', '.join(available_browsers)} - trying these automatically")
-                elif 'unavailable' in error_output or 'not available' in error_output:
-                    hints.append("Video may be unavailable in your region or removed")
-                    hints.append("Try using cookies from a browser where you can view the video")
-                elif 'age' in error_output or 'restricted' in error_output:
-                    hints.append("Age-restricted content requires cookies")
-                    hints.append("Export cookies while logged into YouTube")
-                else:
-                    hints.append("Try downloading without cookies first (for public videos)")
-                    if cookie_path:
-                        hints.append("If cookies were provided, make sure they're valid and fresh")
-                    if available_browsers:
-                        hints.append(f"Auto-detected browsers: {', '.join(available_browsers)}")
-            
-            return jsonify({
-                'error': error_msg,
-                'hints': hints,
-                'strategies_tried': len(strategies),
-                'available_browsers': available_browsers,
-                'stderr': result.stderr[:1000] if result and result.stderr else '',
-                'stdout': result.stdout[:1000] if result and result.stdout else ''
-            }), 400
-        
-        # Return success with downloaded files (already collected above)
-        strategy_used = None
-        for s in strategies:
-            if downloaded_files:
-                strategy_used = s['name']
-                break
+        # Provide specific hints based on error
+        hints = []
+        if result:
+            error_output = (result.stderr or result.stdout or '').lower()
+            if 'member' in error_output or 'private' in error_output:
+                hints.append("This appears to be a member-only or private video")
+                hints.append("You need to provide valid cookies from a browser where you're logged in as a member")
+                if available_browsers:
+                    hints.append(f"Auto-detected browsers: {', '.join(available_browsers)} - trying these automatically")
+            elif 'unavailable' in error_output or 'not available' in error_output:
+                hints.append("Video may be unavailable in your region or removed")
+                hints.append("Try using cookies from a browser where you can view the video")
+            elif 'age' in error_output or 'restricted' in error_output:
+                hints.append("Age-restricted content requires cookies")
+                hints.append("Export cookies while logged into YouTube")
+            else:
+                hints.append("Try downloading without cookies first (for public videos)")
+                if cookie_path:
+                    hints.append("If cookies were provided, make sure they're valid and fresh")
+                if available_browsers:
+                    hints.append(f"Auto-detected browsers: {', '.join(available_browsers)}")
         
-        return jsonify({
-            'success': True,
-            'message': f'Successfully downloaded {len(downloaded_files)} file(s)',
-            'files': downloaded_files,
-            'strategy_used': strategy_used,
-            'method': 'No cookies' if not strategy_used or 'cookie' not in strategy_used.lower() else 'With cookies',
-            'output': result.stdout[:2000] if result and result.stdout else '',
-            'warnings': result.stderr[:500] if result and result.stderr and 'WARNING' in result.stderr else ''
-        })
+        yield {
+            'type': 'error',
+            'message': error_msg,
+            'hints': hints,
+            'strategies_tried': len(strategies),
+            'available_browsers': available_browsers,
+            'stderr': result.stderr[:1000] if result and result.stderr else '',
+            'stdout': result.stdout[:1000] if result and result.stdout else ''
+        }
+        return
     
-    except subprocess.TimeoutExpired:
-        return jsonify({'error': 'Download timed out (10 minutes)'}), 408
-    except Exception as e:
-        error_trace = traceback.format_exc()
-        print(f"Error in download_video: {error_trace}", file=sys.stderr)
-        return jsonify({'error': f'Unexpected error: {str(e)}'}), 500
+    # Return success with downloaded files (already collected above)
+    yield {
+        'type': 'complete',
+        'success': True,
+        'message': f'Successfully downloaded {len(downloaded_files)} file(s)',
+        'files': downloaded_files,
+        'strategy_used': strategy_used,
+        'method': 'No cookies' if not strategy_used or 'cookie' not in strategy_used.lower() else 'With cookies',
+        'output': result.stdout[:2000] if result and result.stdout else '',
+        'warnings': result.stderr[:500] if result and result.stderr and 'WARNING' in result.stderr else ''
+    }
+
+
+JOB_HANDLERS['download'] = run_download
 
 
 @app.route('/check-video', methods=['POST'])
@@ -1123,18 +4547,11 @@ def check_video():
         
         cmd.append(video_url)
         
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=30,
-            shell=False,
-            creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
-        )
+        result = run_ytdlp(cmd, timeout=30)
         
         if result.returncode == 0:
             try:
-                video_info = json.loads(result.stdout)
+                video_info = result.info if result.info is not None else json.loads(result.stdout)
                 return jsonify({
                     'success': True,
                     'accessible': True,
@@ -1184,14 +4601,7 @@ def list_formats():
         
         cmd.append(video_url)
         
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=30,
-            shell=False,
-            creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
-        )
+        result = run_ytdlp(cmd, timeout=30)
         
         if result.returncode != 0:
             return jsonify({'error': result.stderr[:500]}), 400
@@ -1207,18 +4617,18 @@ def list_formats():
 
 @app.route('/download-file/<path:filename>')
 def download_downloaded_file(filename):
-    """Download a file from the downloads folder."""
+    """Download a file from the downloads folder (names include the request's directory)."""
     try:
-        file_path = os.path.join(app.config['DOWNLOADS_FOLDER'], secure_filename(filename))
-        if os.path.exists(file_path):
-            return send_file(file_path, as_attachment=True, download_name=filename)
-        else:
-            return jsonify({'error': 'File not found'}), 404
+        return send_stored_file('DOWNLOADS_FOLDER', filename)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 if __name__ == '__main__':
+    if sys.argv[1:2] == ['worker']:
+        # Job worker process: python app.py worker
+        run_job_worker(follow_parent='--follow-parent' in sys.argv[2:])
+        sys.exit(0)
     # use_reloader=False prevents Flask from restarting when yt-dlp
     # modifies files in site-packages, which kills in-flight requests.
     app.run(debug=True, host='0.0.0.0', port=5000, use_reloader=False)
@@ -0,0 +1,76 @@
+"""Benchmark snippet cleaning: the legacy per-snippet re.sub loop vs join_snippet_texts().
+
+Treats each text line of the caption fixtures as one youtube-transcript-api
+snippet, reports best-of-N time and tracemalloc peak memory, and checks the
+outputs are identical.
+
+    python benchmarks/bench_cleaning.py [saved_captions.vtt[.gz] ...]
+"""
+import glob
+import gzip
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import join_snippet_texts
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def legacy_join_snippets(snippets):
+    """The pre-existing get_transcript_direct snippet loop."""
+    texts = []
+    for text in snippets:
+        text = re.sub(r'\[.*?\]', '', text)
+        text = re.sub(r'<[^>]+>', '', text)
+        text = re.sub(r'^captions?\s*\w*\s*', '', text, flags=re.IGNORECASE)
+        text = text.strip()
+        if text and text not in texts[-1:]:
+            texts.append(text)
+    return re.sub(r' +', ' ', ' '.join(texts)).strip()
+
+
+def load(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        return f.read()
+
+
+def measure(func, arg, repeat=10):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    result = func(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, best, peak
+
+
+def report(name, count, label, best, peak):
+    print(f'{name:32} {count:>9} {label:>9} {best * 1000:>9.2f} {peak / 2 ** 20:>9.2f}')
+
+
+def main(paths):
+    paths = paths or sorted(glob.glob(os.path.join(FIXTURES_DIR, 'captions_*')))
+    print(f"{'file':32} {'snippets':>9} {'cleaner':>9} {'best ms':>9} {'peak MiB':>9}")
+    for path in paths:
+        content = load(path)
+        name = os.path.basename(path)
+        snippets = [line for line in content.splitlines() if line.strip() and '-->' not in line]
+        legacy, legacy_time, legacy_peak = measure(legacy_join_snippets, snippets)
+        fast, fast_time, fast_peak = measure(join_snippet_texts, snippets)
+        assert legacy == fast, f'{path}: snippet joiners disagree'
+        report(name, len(snippets), 'legacy', legacy_time, legacy_peak)
+        report(name, len(snippets), 'joined', fast_time, fast_peak)
+        print(f'{"":32} {"":>9} {legacy_time / fast_time:.1f}x faster')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
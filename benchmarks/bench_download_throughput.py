@@ -0,0 +1,131 @@
+"""Benchmark fragmented (HLS) download throughput and the download scheduler.
+
+Serves an HLS stream from a local HTTP server that, like YouTube, caps each
+connection's speed and answers every request after a short latency. It then
+downloads it through the same path as /download-video jobs:
+
+1. one download as before (single stream) vs. throughput mode
+   (DOWNLOAD_FRAGMENTS concurrent fragments);
+2. two downloads at once under a DOWNLOAD_BANDWIDTH budget, the second
+   starting while the first is running, to show how the budget is split.
+
+    python benchmarks/bench_download_throughput.py [segments]
+"""
+import http.server
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, DownloadLease, YtdlpResult, _ytdlp_with_progress, throughput_options
+
+SEGMENT_BYTES = 512 * 1024
+CONNECTION_RATE = 4 * 1024 * 1024  # bytes/s per connection
+LATENCY = 0.05  # seconds before each response starts
+MB = 1024 * 1024
+
+
+def make_handler(segments):
+    payload = os.urandom(SEGMENT_BYTES)
+    playlist = '#EXTM3U\n#EXT-X-VERSION:3\n#EXT-X-TARGETDURATION:2\n#EXT-X-MEDIA-SEQUENCE:0\n'
+    playlist += ''.join(f'#EXTINF:2.0,\nseg{i}.ts\n' for i in range(segments)) + '#EXT-X-ENDLIST\n'
+
+    class HLSHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            time.sleep(LATENCY)
+            if self.path.endswith('.m3u8'):
+                body, content_type = playlist.encode(), 'application/vnd.apple.mpegurl'
+            elif self.path.endswith('.ts'):
+                body, content_type = payload, 'video/mp2t'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            # Stream at CONNECTION_RATE
+            chunk = 64 * 1024
+            started = time.perf_counter()
+            for offset in range(0, len(body), chunk):
+                self.wfile.write(body[offset:offset + chunk])
+                ahead = (offset + chunk) / CONNECTION_RATE - (time.perf_counter() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+        def log_message(self, *args):
+            pass
+
+    return HLSHandler
+
+
+class QuietServer(http.server.ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass  # yt-dlp dropping idle keep-alive connections
+
+
+def download(url, output, throughput, results, name, start_delay=0):
+    """Download `url` like a /download-video attempt; records (seconds, bytes, connections) in results[name]."""
+    time.sleep(start_delay)
+    lease = DownloadLease(app.config['DOWNLOAD_FRAGMENTS'] if throughput else 1)
+    cmd = ['yt-dlp', '--no-warnings', '--fixup', 'never'] + throughput_options(lease) + ['-o', output, url]
+    started = time.perf_counter()
+    try:
+        for update in _ytdlp_with_progress(cmd, timeout=300, lease=lease):
+            if isinstance(update, YtdlpResult):
+                assert update.returncode == 0 and update.files, update.stderr
+                size = sum(os.path.getsize(path) for path in update.files)
+    finally:
+        lease.release()
+    results[name] = (time.perf_counter() - started, size, lease.connections)
+
+
+def report(label, seconds, size, connections):
+    print(f'{label:>28} {connections:>5} {size / MB:>8.1f} {seconds:>8.2f} {size / MB / seconds:>8.2f}')
+
+
+def main(segments):
+    workdir = tempfile.mkdtemp(prefix='bench_download_')
+    app.config.update(DOWNLOAD_LEASES_DB=os.path.join(workdir, 'downloads.sqlite3'), JOB_POLL_INTERVAL=0.5)
+    server = QuietServer(('127.0.0.1', 0), make_handler(segments))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}/stream.m3u8'
+    try:
+        print(f'{segments} x {SEGMENT_BYTES // 1024}KiB segments, {CONNECTION_RATE / MB:.0f}MiB/s per connection, '
+              f'{LATENCY * 1000:.0f}ms latency; DOWNLOAD_FRAGMENTS={app.config["DOWNLOAD_FRAGMENTS"]}')
+        print(f'{"run":>28} {"conns":>5} {"MiB":>8} {"seconds":>8} {"MiB/s":>8}')
+
+        results = {}
+        for throughput in (False, True):
+            name = 'throughput mode' if throughput else 'single stream (before)'
+            download(url, os.path.join(workdir, f'{throughput}.%(ext)s'), throughput, results, name)
+            report(name, *results[name])
+
+        # Two downloads sharing a bandwidth budget of half the single-download throughput
+        budget = int(results['throughput mode'][1] / results['throughput mode'][0] / 2)
+        app.config['DOWNLOAD_BANDWIDTH'] = budget
+        print(f'\nDOWNLOAD_BANDWIDTH={budget / MB:.1f}MiB/s, second download starts 1s after the first:')
+        results = {}
+        threads = [
+            threading.Thread(target=download, args=(url, os.path.join(workdir, 'first.%(ext)s'), True, results, 'first')),
+            threading.Thread(target=download, args=(url, os.path.join(workdir, 'second.%(ext)s'), True, results, 'second', 1)),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for name in ('first', 'second'):
+            report(name, *results[name])
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 40)
@@ -0,0 +1,94 @@
+"""Benchmark per-video HTTP overhead: a fresh session per video vs. the shared pooled session.
+
+A local server stands in for YouTube: every new connection first costs
+HANDSHAKE seconds (TCP + TLS setup over a real network) and every request
+RTT seconds. Each "video" makes the REQUESTS_PER_VIDEO requests a transcript
+fetch does (watch page, innertube player, timed text), `workers` videos at
+a time like iter_transcripts_concurrently():
+
+- before: a new requests.Session per video (what a bare YouTubeTranscriptApi()
+  or http_requests.get does), so every video reconnects;
+- after: http_session(), shared by all threads.
+
+    python benchmarks/bench_http_session.py [videos] [workers]
+"""
+import http.server
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import http_session
+
+HANDSHAKE = 0.06  # seconds per new connection (~3 round trips at 20ms)
+RTT = 0.02  # seconds per request
+REQUESTS_PER_VIDEO = 3
+BODY = b'x' * 20000
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+    connections = 0
+    lock = threading.Lock()
+
+    def handle(self):
+        with Handler.lock:
+            Handler.connections += 1
+        time.sleep(HANDSHAKE)
+        super().handle()
+
+    def do_GET(self):
+        time.sleep(RTT)
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def fetch_video(base, video, session=None):
+    own = session is None
+    if own:
+        session = requests.Session()
+    try:
+        for step in range(REQUESTS_PER_VIDEO):
+            session.get(f'{base}/{video}/{step}').raise_for_status()
+    finally:
+        if own:
+            session.close()
+
+
+def run(base, videos, workers, shared):
+    Handler.connections = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda video: fetch_video(base, video, http_session() if shared else None), range(videos)))
+    return time.perf_counter() - started, Handler.connections
+
+
+def main(videos, workers):
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_port}'
+    try:
+        print(f'{videos} videos x {REQUESTS_PER_VIDEO} requests, {workers} workers, '
+              f'{HANDSHAKE * 1000:.0f}ms per new connection, {RTT * 1000:.0f}ms per request')
+        print(f'{"session":>24} {"conns":>6} {"seconds":>8} {"ms/video":>9}')
+        for label, shared in (('per video (before)', False), ('shared pool', True)):
+            seconds, connections = run(base, videos, workers, shared)
+            print(f'{label:>24} {connections:>6} {seconds:>8.2f} {seconds / videos * 1000:>9.1f}')
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 4)
@@ -0,0 +1,94 @@
+"""Benchmark playlist page parsing: legacy DOTALL regex + full json.loads vs parse_playlist_page().
+
+Reports best-of-N parse time and tracemalloc peak memory per fixture page and
+checks both parsers return the same videos.
+
+    python benchmarks/bench_playlist_parse.py [saved_page.html[.gz] ...]
+"""
+import glob
+import gzip
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import parse_playlist_page
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def legacy_parse(html):
+    """The pre-existing get_playlist_videos_api parsing, minus the network and the 50-video cap."""
+    match = re.search(r'var\s+ytInitialData\s*=\s*(\{.*?\});\s*</script>', html, re.DOTALL)
+    if not match:
+        match = re.search(r'window\["ytInitialData"\]\s*=\s*(\{.*?\});\s*</script>', html, re.DOTALL)
+    if not match:
+        return None
+    data = json.loads(match.group(1))
+    videos = []
+    tabs = data['contents']['twoColumnBrowseResultsRenderer']['tabs']
+    for tab in tabs:
+        tab_content = tab.get('tabRenderer', {}).get('content', {})
+        section_list = tab_content.get('sectionListRenderer', {}).get('contents', [])
+        for section in section_list:
+            item_section = section.get('itemSectionRenderer', {}).get('contents', [])
+            for item in item_section:
+                playlist_renderer = item.get('playlistVideoListRenderer', {})
+                for vc in playlist_renderer.get('contents', []):
+                    vr = vc.get('playlistVideoRenderer', {})
+                    if vr:
+                        vid_id = vr.get('videoId', '')
+                        title_runs = vr.get('title', {}).get('runs', [])
+                        title = title_runs[0].get('text', 'Unknown') if title_runs else 'Unknown'
+                        if vid_id:
+                            videos.append({'id': vid_id, 'title': title,
+                                           'url': f'https://www.youtube.com/watch?v={vid_id}'})
+    return videos
+
+
+def fast_parse(html):
+    videos, _, _ = parse_playlist_page(html)
+    return videos
+
+
+def load(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        return f.read()
+
+
+def measure(func, html, repeat=15):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(html)
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    result = func(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, best, peak
+
+
+def main(paths):
+    paths = paths or sorted(glob.glob(os.path.join(FIXTURES_DIR, 'playlist_*.html*')))
+    print(f"{'page':32} {'size':>9} {'parser':>7} {'videos':>7} {'best ms':>9} {'peak MiB':>9}")
+    for path in paths:
+        html = load(path)
+        legacy, legacy_time, legacy_peak = measure(legacy_parse, html)
+        fast, fast_time, fast_peak = measure(fast_parse, html)
+        assert legacy == fast, f'{path}: parsers disagree'
+        name = os.path.basename(path)
+        for label, videos, best, peak in (('legacy', legacy, legacy_time, legacy_peak),
+                                          ('fast', fast, fast_time, fast_peak)):
+            print(f'{name:32} {len(html) // 1024:>7}KB {label:>7} {len(videos):>7} '
+                  f'{best * 1000:>9.2f} {peak / 2 ** 20:>9.2f}')
+        print(f'{"":32} {"":>9} speedup {legacy_time / fast_time:.1f}x, peak memory {legacy_peak / max(fast_peak, 1):.1f}x lower')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
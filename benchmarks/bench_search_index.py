@@ -0,0 +1,96 @@
+"""Benchmark transcript search indexing and queries on a synthetic corpus.
+
+Generates `videos` transcripts of `minutes` each (a caption snippet every
+~2s, words drawn from a Zipf-like vocabulary so there are common and rare
+terms), indexes them one by one the way the extraction workers do
+(search_index_transcript, one transaction per video) into a scratch
+database, then times /search queries.
+
+    python benchmarks/bench_search_index.py [videos] [minutes]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from youtube_transcript_api import FetchedTranscriptSnippet
+
+from app import app, TimedTranscript, search_index_playlist, search_index_transcript, search_transcripts
+
+VOCABULARY = 20000
+
+
+def make_vocabulary(rng):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    words = {'fourier', 'transform', 'gradient', 'descent', 'entropy', 'eigenvalue'}
+    while len(words) < VOCABULARY:
+        words.add(''.join(rng.choice(letters) for _ in range(rng.randint(2, 9))))
+    return sorted(words, key=lambda word: rng.random())
+
+
+def make_transcript(rng, vocabulary, weights, minutes):
+    snippets, start = [], 0.0
+    while start < minutes * 60:
+        text = ' '.join(rng.choices(vocabulary, weights, k=rng.randint(5, 10)))
+        snippets.append(FetchedTranscriptSnippet(text=text, start=round(start, 3), duration=2.5))
+        start += rng.uniform(1.5, 2.5)
+    return TimedTranscript.from_snippets(snippets)
+
+
+def best_of(func, repeat=5):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - started)
+    return min(times), result
+
+
+def main(videos, minutes):
+    rng = random.Random(1)
+    vocabulary = make_vocabulary(rng)
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    # Each video gets the same pool of distinct transcripts, so generation stays fast
+    pool = [make_transcript(rng, vocabulary, weights, minutes) for _ in range(min(videos, 50))]
+    text_bytes = sum(len(pool[number % len(pool)].text) for number in range(videos))
+
+    workdir = tempfile.mkdtemp(prefix='bench_search_')
+    app.config['SEARCH_DB'] = os.path.join(workdir, 'search.sqlite3')
+    try:
+        started = time.perf_counter()
+        for number in range(videos):
+            video = {'id': f'v{number:010d}', 'title': f'Lecture {number}'}
+            search_index_transcript(video, 'en', pool[number % len(pool)])
+        seconds = time.perf_counter() - started
+        search_index_playlist('https://www.youtube.com/playlist?list=PLbench',
+                              [f'v{number:010d}' for number in range(0, videos, 10)])
+        size = sum(os.path.getsize(os.path.join(workdir, name)) for name in os.listdir(workdir))
+        print(f'{videos} transcripts x {minutes} min ({text_bytes / 1024 / 1024:.1f} MiB of text)')
+        print(f'indexed in {seconds:.2f}s: {videos / seconds:.0f} transcripts/s, '
+              f'{text_bytes / 1024 / 1024 / seconds:.1f} MiB/s; index {size / 1024 / 1024:.1f} MiB on disk')
+
+        print(f'\n{"query":>36} {"hits":>5} {"ms":>8}')
+        # vocabulary[0] is in nearly every segment (like "the"): every match has to be ranked
+        typical, rare = vocabulary[300], vocabulary[5000]
+        for label, query, playlist in (
+            (f'stop word ({vocabulary[0]})', vocabulary[0], None),
+            (f'typical word ({typical})', typical, None),
+            (f'rare word ({rare})', rare, None),
+            ('two words', f'{vocabulary[200]} {vocabulary[800]}', None),
+            ('phrase', f'"{vocabulary[1]} {vocabulary[2]}"', None),
+            ('prefix', vocabulary[1000][:4] + '*', None),
+            ('typical word, one playlist', typical, 'PLbench'),
+        ):
+            elapsed, hits = best_of(lambda query=query, playlist=playlist: search_transcripts(query, playlist))
+            print(f'{label:>36} {len(hits):>5} {elapsed * 1000:>8.2f}')
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 30)
@@ -0,0 +1,79 @@
+"""Benchmark the columnar timed transcript against per-snippet objects.
+
+Builds a synthetic lecture (one caption snippet every ~2s, like YouTube's
+auto-generated tracks) and compares:
+
+1. memory: the snippet objects youtube-transcript-api returns (what keeping
+   timing as a list of objects costs) vs. a TimedTranscript;
+2. serving a 10-minute SRT window from the cached blob vs. the whole track.
+
+    python benchmarks/bench_timed_transcript.py [hours]
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from youtube_transcript_api import FetchedTranscriptSnippet
+
+from app import TimedTranscript, export_srt
+
+WORDS = ('the so we can see that this is a function of time and then what happens when you take '
+         'derivative integral energy system model value point here right okay').split()
+
+
+def make_snippets(hours):
+    rng = random.Random(1)
+    snippets, start = [], 0.0
+    while start < hours * 3600:
+        text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 10)))
+        duration = round(rng.uniform(1.5, 4.0), 3)
+        snippets.append(FetchedTranscriptSnippet(text=text, start=round(start, 3), duration=duration))
+        start += rng.uniform(1.5, 2.5)
+    return snippets
+
+
+def measure(build):
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def best_of(func, repeat=5):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main(hours):
+    snippets, objects_size = measure(lambda: make_snippets(hours))
+    timed, timed_size = measure(lambda: TimedTranscript.from_snippets(snippets))
+    blob = timed.to_bytes()
+    print(f'{hours:g}h lecture, {len(snippets)} snippets')
+    print(f'{"representation":>28} {"KiB":>8} {"bytes/snippet":>14}')
+    for label, size in (('snippet objects', objects_size), ('TimedTranscript', timed_size),
+                        ('cached blob', len(blob))):
+        print(f'{label:>28} {size / 1024:>8.1f} {size / len(snippets):>14.1f}')
+
+    def serve(start=None, end=None):
+        cached = TimedTranscript.from_bytes(blob)
+        return ''.join(export_srt(cached, cached.window(start, end)))
+
+    middle = hours * 1800
+    full = best_of(serve)
+    window = best_of(lambda: serve(middle, middle + 600))
+    print(f'\n{"SRT from cache":>28} {"ms":>8}')
+    print(f'{"whole track":>28} {full * 1000:>8.2f}')
+    print(f'{"10-minute window":>28} {window * 1000:>8.2f}')
+
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 3)
@@ -0,0 +1,56 @@
+"""Benchmark yt-dlp per-attempt overhead: subprocess CLI vs pooled in-process YoutubeDL.
+
+Serves a small media file from a local HTTP server and downloads it
+repeatedly through run_ytdlp() on each backend, so the numbers are the
+per-attempt cost (startup, imports, option handling) rather than YouTube.
+
+    python benchmarks/bench_ytdlp_backends.py [attempts]
+"""
+import functools
+import http.server
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, run_ytdlp
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def main(attempts):
+    workdir = tempfile.mkdtemp(prefix='bench_ytdlp_')
+    try:
+        with open(os.path.join(workdir, 'clip.mp4'), 'wb') as f:
+            f.write(os.urandom(64 * 1024))
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(QuietHandler, directory=workdir))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{server.server_port}/clip.mp4'
+
+        print(f"{'backend':>11} {'first ms':>9} {'median ms':>10} {'best ms':>8}")
+        for backend in ('subprocess', 'inprocess'):
+            app.config['YTDLP_BACKEND'] = backend
+            timings = []
+            for attempt in range(attempts):
+                output = os.path.join(workdir, 'out', f'{backend}_{attempt}.%(ext)s')
+                started = time.perf_counter()
+                result = run_ytdlp(['yt-dlp', '--no-warnings', '-o', output, url], timeout=60)
+                timings.append(time.perf_counter() - started)
+                assert result.returncode == 0, result.stderr
+            ordered = sorted(timings)
+            print(f'{backend:>11} {timings[0] * 1000:>9.1f} {ordered[len(ordered) // 2] * 1000:>10.1f} '
+                  f'{ordered[0] * 1000:>8.1f}')
+        server.shutdown()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,161 @@
+"""Generate the saved fixture files used by the benchmarks.
+
+The pages mimic the structure and size of real YouTube playlist pages
+(ytcfg block, a large ytInitialData object with full playlistVideoRenderer
+entries, surrounding player/config scripts). The caption files mimic
+yt-dlp's auto-generated VTT output (rolling cues with per-word <c> timing
+tags) and plain SRT. They are synthetic so they can be committed; pass real
+saved files to the benchmarks as extra arguments.
+
+    python benchmarks/make_fixtures.py
+"""
+import gzip
+import json
+import os
+import random
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def _text(rng, words):
+    vocab = ['lecture', 'intro', 'part', 'python', 'data', 'model', 'review', 'lab',
+             'week', 'notes', 'deep', 'dive', 'q&a', 'session', 'basics', '"quoted"', '{braces}']
+    return ' '.join(rng.choice(vocab) for _ in range(words))
+
+
+def _video_renderer(rng, index, playlist_id):
+    video_id = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-')
+                       for _ in range(11))
+    thumbs = [{'url': f'https://i.ytimg.com/vi/{video_id}/hqdefault.jpg?sqp=-oaymwE{w}&rs=AOn4CL{rng.getrandbits(64):x}',
+               'width': w, 'height': w * 9 // 16} for w in (168, 196, 246, 336)]
+    endpoint = {
+        'clickTrackingParams': f'{rng.getrandbits(128):x}',
+        'commandMetadata': {'webCommandMetadata': {'url': f'/watch?v={video_id}&list={playlist_id}&index={index + 1}',
+                                                   'webPageType': 'WEB_PAGE_TYPE_WATCH', 'rootVe': 3832}},
+        'watchEndpoint': {'videoId': video_id, 'playlistId': playlist_id, 'index': index,
+                          'params': f'{rng.getrandbits(96):x}', 'playerParams': f'{rng.getrandbits(96):x}',
+                          'loggingContext': {'vssLoggingContext': {'serializedContextData': f'{rng.getrandbits(128):x}'}},
+                          'watchEndpointSupportedOnesieConfig': {'html5PlaybackOnesieConfig': {
+                              'commonConfig': {'url': f'https://rr{index % 5}---sn-abc.googlevideo.com/initplayback?source=youtube'}}}},
+    }
+    menu_items = [{'menuServiceItemRenderer': {'text': {'runs': [{'text': label}]},
+                                               'icon': {'iconType': label.upper().replace(' ', '_')},
+                                               'serviceEndpoint': {'clickTrackingParams': f'{rng.getrandbits(128):x}',
+                                                                   'commandMetadata': {'webCommandMetadata': {'sendPost': True}},
+                                                                   'signalServiceEndpoint': {'signal': 'CLIENT_SIGNAL'}},
+                                               'trackingParams': f'{rng.getrandbits(128):x}'}}
+                  for label in ('Add to queue', 'Save to Watch later', 'Save to playlist', 'Share')]
+    return {'playlistVideoRenderer': {
+        'videoId': video_id,
+        'thumbnail': {'thumbnails': thumbs},
+        'title': {'runs': [{'text': f'{index + 1}. {_text(rng, 6).title()}'}],
+                  'accessibility': {'accessibilityData': {'label': _text(rng, 14)}}},
+        'index': {'simpleText': str(index + 1)},
+        'shortBylineText': {'runs': [{'text': 'Example Channel', 'navigationEndpoint': {
+            'browseEndpoint': {'browseId': 'UC' + 'x' * 22, 'canonicalBaseUrl': '/@example'}}}]},
+        'lengthText': {'accessibility': {'accessibilityData': {'label': '12 minutes, 3 seconds'}}, 'simpleText': '12:03'},
+        'navigationEndpoint': endpoint,
+        'lengthSeconds': str(rng.randint(60, 5400)),
+        'trackingParams': f'{rng.getrandbits(128):x}',
+        'isPlayable': True,
+        'menu': {'menuRenderer': {'items': menu_items, 'trackingParams': f'{rng.getrandbits(128):x}',
+                                  'accessibility': {'accessibilityData': {'label': 'Action menu'}}}},
+        'thumbnailOverlays': [{'thumbnailOverlayTimeStatusRenderer': {'text': {'simpleText': '12:03'}, 'style': 'DEFAULT'}},
+                              {'thumbnailOverlayNowPlayingRenderer': {'text': {'runs': [{'text': 'Now playing'}]}}}],
+        'videoInfo': {'runs': [{'text': f'{rng.randint(1, 999)}K views'}, {'text': ' • '}, {'text': '2 years ago'}]},
+    }}
+
+
+def playlist_page(videos=100, form='var', seed=0):
+    """Build one playlist page with `videos` entries plus a continuation item."""
+    rng = random.Random(seed)
+    playlist_id = 'PL' + ''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789') for _ in range(32))
+    items = [_video_renderer(rng, i, playlist_id) for i in range(videos)]
+    items.append({'continuationItemRenderer': {'trigger': 'CONTINUATION_TRIGGER_ON_ITEM_SHOWN', 'continuationEndpoint': {
+        'clickTrackingParams': f'{rng.getrandbits(128):x}',
+        'commandExecutorCommand': {'commands': [
+            {'playlistVotingRefreshPopupCommand': {}},
+            {'continuationCommand': {'token': f'4qmFsgK{rng.getrandbits(256):x}', 'request': 'CONTINUATION_REQUEST_TYPE_BROWSE'}},
+        ]}}}})
+    data = {
+        'responseContext': {'serviceTrackingParams': [{'service': 'GFEEDBACK', 'params': [
+            {'key': f'k{i}', 'value': f'{rng.getrandbits(64):x}'} for i in range(40)]}]},
+        'contents': {'twoColumnBrowseResultsRenderer': {'tabs': [{'tabRenderer': {'selected': True, 'content': {
+            'sectionListRenderer': {'contents': [{'itemSectionRenderer': {'contents': [
+                {'playlistVideoListRenderer': {'contents': items, 'playlistId': playlist_id, 'isEditable': False}}]}}]}}}}]}},
+        'header': {'playlistHeaderRenderer': {'playlistId': playlist_id, 'title': {'simpleText': _text(rng, 5)},
+                                              'descriptionText': {'simpleText': _text(rng, 120)},
+                                              'numVideosText': {'runs': [{'text': str(videos + 137)}, {'text': ' videos'}]}}},
+        'sidebar': {'playlistSidebarRenderer': {'items': [{'note': 'text with } and { and "escaped \\" quotes"'}]}},
+        'frameworkUpdates': {'entityBatchUpdate': {'mutations': [
+            {'entityKey': f'{rng.getrandbits(128):x}', 'payload': {'blob': 'x' * 2000}} for _ in range(60)]}},
+    }
+    blob = json.dumps(data, separators=(',', ':')).replace('</', '<\\/')
+    assign = f'var ytInitialData = {blob};' if form == 'var' else f'window["ytInitialData"] = {blob};'
+    player_js = 'var ytInitialPlayerResponse = ' + json.dumps({'streamingData': {'formats': [
+        {'itag': i, 'url': 'https://example.invalid/' + 'y' * 400} for i in range(200)]}}) + ';'
+    return (
+        '<!DOCTYPE html><html lang="en"><head><title>Playlist - YouTube</title>'
+        '<script nonce="abc">ytcfg.set({"INNERTUBE_API_KEY":"AIzaSyFixtureKey","INNERTUBE_CLIENT_VERSION":"2.20240101.00.00",'
+        '"VISITOR_DATA":"Cgtfixture","PAD":"' + 'z' * 150000 + '"});</script>'
+        '<script>' + 'function f(){return 1}' * 20000 + '</script></head><body>'
+        '<script nonce="abc">' + player_js + '</script>'
+        '<script nonce="abc">' + assign + '</script>'
+        '<script>var trailing = {"a": "b"};</script></body></html>'
+    )
+
+
+def _timestamp(ms, sep='.'):
+    return f'{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d}{sep}{ms % 1000:03d}'
+
+
+def captions_vtt(minutes=60, seed=0):
+    """Build an auto-caption style WebVTT file covering `minutes` of speech."""
+    rng = random.Random(seed)
+    out = ['WEBVTT\nKind: captions\nLanguage: en\n\n']
+    previous = ''
+    for cue in range(minutes * 60 // 3):
+        start = cue * 3000
+        words = _text(rng, rng.randint(5, 9)).split()
+        timed = words[0] + ''.join(f'<{_timestamp(start + 300 * (i + 1))}><c> {w}</c>'
+                                   for i, w in enumerate(words[1:]))
+        out.append(f'{_timestamp(start)} --> {_timestamp(start + 2990)} align:start position:0%\n'
+                   f'{previous}\n{timed}\n\n')
+        if rng.random() < 0.05:
+            out.append(f'{_timestamp(start + 2990)} --> {_timestamp(start + 3000)} align:start position:0%\n'
+                       f'[Music]\n\n')
+        previous = ' '.join(words)
+    return ''.join(out)
+
+
+def captions_srt(minutes=60, seed=0):
+    """Build a manually-authored style SRT file covering `minutes` of speech."""
+    rng = random.Random(seed)
+    out = []
+    for cue in range(minutes * 60 // 3):
+        start = cue * 3000
+        speaker = '>> ' if rng.random() < 0.1 else ''
+        out.append(f'{cue + 1}\n{_timestamp(start, ",")} --> {_timestamp(start + 2990, ",")}\n'
+                   f'{speaker}<i>{_text(rng, rng.randint(4, 8))}</i> &amp; more\n\n')
+    return ''.join(out)
+
+
+def _write_gz(name, text):
+    path = os.path.join(FIXTURES_DIR, name)
+    # mtime=0 keeps the committed fixtures byte-identical across regenerations
+    with open(path, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=9, mtime=0) as f:
+        f.write(text.encode('utf-8'))
+    print(f'wrote {path} ({os.path.getsize(path)} bytes compressed)')
+
+
+def main():
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    for name, kwargs in (('playlist_100_var.html.gz', {'videos': 100, 'form': 'var', 'seed': 1}),
+                         ('playlist_100_window.html.gz', {'videos': 100, 'form': 'window', 'seed': 2})):
+        _write_gz(name, playlist_page(**kwargs))
+    _write_gz('captions_60min.vtt.gz', captions_vtt(minutes=60, seed=3))
+    _write_gz('captions_60min.srt.gz', captions_srt(minutes=60, seed=4))
+
+
+if __name__ == '__main__':
+    main()
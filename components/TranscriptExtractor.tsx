@@ -196,7 +196,7 @@ export default function TranscriptExtractor() {
 
           {/* Download Button */}
           <a
-            href={getDownloadUrl(results.filename || 'playlist_transcripts_clean.txt')}
+            href={getDownloadUrl(results.filename)}
             className="btn-success-custom"
             download
             style={{ marginBottom: 20 }}
@@ -1,7 +1,7 @@
 'use client'
 
 import { useState } from 'react'
-import { downloadVideo, checkVideo, getFileDownloadUrl, DownloadResponse, VideoCheckResponse } from '@/lib/api'
+import { downloadVideo, checkVideo, getFileDownloadUrl, DownloadProgress, DownloadResponse, VideoCheckResponse } from '@/lib/api'
 
 export default function VideoDownloader() {
   const [videoUrl, setVideoUrl] = useState('')
@@ -17,6 +17,7 @@ export default function VideoDownloader() {
   const [checkResult, setCheckResult] = useState<VideoCheckResponse | null>(null)
   const [downloadResults, setDownloadResults] = useState<DownloadResponse | null>(null)
   const [downloadError, setDownloadError] = useState('')
+  const [progress, setProgress] = useState<DownloadProgress | null>(null)
 
   const showPlaylistOptions = videoUrl.toLowerCase().includes('playlist') || videoUrl.toLowerCase().includes('list=')
 
@@ -46,6 +47,7 @@ export default function VideoDownloader() {
 
     setDownloadError('')
     setDownloadResults(null)
+    setProgress(null)
     setLoading(true)
 
     try {
@@ -59,7 +61,7 @@ export default function VideoDownloader() {
       if (playlistEnd) formData.append('playlist_end', playlistEnd)
       if (playlistItems) formData.append('playlist_items', playlistItems)
 
-      const data = await downloadVideo(videoUrl, formData)
+      const data = await downloadVideo(videoUrl, formData, setProgress)
       setDownloadResults(data)
     } catch (err: any) {
       setDownloadError(err.message || 'Download failed. Check the URL and try again.')
@@ -68,6 +70,27 @@ export default function VideoDownloader() {
     }
   }
 
+  const formatBytes = (bytes: number) => {
+    if (bytes >= 1024 * 1024 * 1024) return `${(bytes / (1024 * 1024 * 1024)).toFixed(2)} GB`
+    if (bytes >= 1024 * 1024) return `${(bytes / (1024 * 1024)).toFixed(1)} MB`
+    return `${Math.round(bytes / 1024)} KB`
+  }
+
+  const progressStatus = (p: DownloadProgress | null) => {
+    if (!p) return 'Starting download…'
+    if (p.type === 'status') return p.message || 'Preparing…'
+    if (p.phase === 'merge') return 'Merging video and audio…'
+    if (p.phase === 'postprocess') return `Processing (${p.postprocessor || 'post-processing'})…`
+    const parts: string[] = []
+    if (p.items) parts.push(`Item ${p.item}/${p.items}`)
+    if (p.total_bytes) parts.push(`${formatBytes(p.downloaded_bytes || 0)} of ${formatBytes(p.total_bytes)}`)
+    else if (p.downloaded_bytes) parts.push(formatBytes(p.downloaded_bytes))
+    if (p.fragment_count) parts.push(`fragment ${p.fragment_index || 0}/${p.fragment_count}`)
+    if (p.speed) parts.push(`${formatBytes(p.speed)}/s`)
+    if (typeof p.eta === 'number') parts.push(`ETA ${formatDuration(Math.round(p.eta))}`)
+    return parts.join(' · ') || 'Downloading…'
+  }
+
   const formatDuration = (secs: number) => {
     const m = Math.floor(secs / 60)
     const s = (secs % 60).toString().padStart(2, '0')
@@ -256,13 +279,14 @@ export default function VideoDownloader() {
         <div className="progress-container fade-in" style={{ marginTop: 20 }}>
           <div className="progress-header">
             <span className="progress-label">Downloading…</span>
+            {typeof progress?.percentage === 'number' && (
+              <span className="progress-pct">{Math.round(progress.percentage)}%</span>
+            )}
           </div>
           <div className="progress-track">
-            <div className="progress-fill" style={{ width: '45%' }} />
+            <div className="progress-fill" style={{ width: `${progress?.percentage ?? 0}%` }} />
           </div>
-          <p className="progress-status">
-            This may take a while depending on video length and quality.
-          </p>
+          <p className="progress-status">{progressStatus(progress)}</p>
         </div>
       )}
 
@@ -10,6 +10,10 @@ export interface ExtractResponse {
   preview: string;
   filename: string;
   skipped_videos?: Array<{ title: string; reason: string }>;
+  max_videos?: number;
+  truncated?: boolean; // playlist had more than max_videos entries
+  listing_error?: string | null;
+  exports?: Record<string, string>; // export name (e.g. "ndjson.gz") -> file name
   error?: string;
 }
 
@@ -38,6 +42,24 @@ export interface VideoCheckResponse {
   hint?: string;
 }
 
+// Polls a queued job (the 202 body of /extract or /download-video) until it finishes; returns its result
+async function waitForJob(job: { job_id: string }, failure: string): Promise<any> {
+  while (true) {
+    const response = await fetch(`${API_BASE}/jobs/${job.job_id}`);
+    const state = await safeJson(response);
+    if (!response.ok) {
+      throw new Error(state.error || failure);
+    }
+    if (state.status === 'complete') {
+      return state.result;
+    }
+    if (state.status === 'failed' || state.status === 'cancelled') {
+      throw new Error(state.error || failure);
+    }
+    await new Promise(r => setTimeout(r, 1000));
+  }
+}
+
 // Safe JSON parser that handles non-JSON server errors
 async function safeJson(response: Response): Promise<any> {
   const text = await response.text();
@@ -59,6 +81,8 @@ export interface ProgressUpdate {
   percentage?: number;
   status?: string;
   video_title?: string;
+  index?: number; // 1-based playlist position of the video that just finished
+  listing_complete?: boolean; // false while further playlist pages are still being read
   message?: string;
   success?: boolean;
   extracted?: number;
@@ -67,6 +91,7 @@ export interface ProgressUpdate {
   filename?: string;
   skipped_videos?: Array<{ title: string; reason: string }>;
   error?: string;
+  job_id?: string; // server-side job, for GET /jobs/<id>/events
 }
 
 export async function extractTranscripts(
@@ -75,122 +100,203 @@ export async function extractTranscripts(
 ): Promise<ExtractResponse> {
   // If onProgress callback provided, use SSE for real-time updates
   if (onProgress) {
-    const jobId = `job_${Date.now()}_${Math.random().toString(36).substr(2, 9)}`;
+    // Server job id (X-Job-Id header, also on every event) and last SSE event id, used to resume after a dropped connection
+    let jobId = '';
+    let lastEventId = '';
+    let reconnects = 0;
 
-    return new Promise((resolve, reject) => {
-      // Use POST with SSE streaming
-      fetch(`${API_BASE}/extract`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-          playlist_url: playlistUrl,
-          use_sse: true,
-          job_id: jobId
-        }),
-      }).then(response => {
-        if (!response.ok) {
-          return response.json().then(data => {
-            reject(new Error(data.error || 'Failed to start extraction'));
-          });
-        }
+    // Reads one SSE response; resolves true if the job finished, false if the stream dropped first
+    const readStream = async (
+      response: Response,
+      resolve: (value: ExtractResponse) => void,
+      reject: (reason: Error) => void
+    ): Promise<boolean> => {
+      const reader = response.body?.getReader();
+      const decoder = new TextDecoder();
 
-        // Read SSE stream
-        const reader = response.body?.getReader();
-        const decoder = new TextDecoder();
+      if (!reader) {
+        reject(new Error('Stream not available'));
+        return true;
+      }
 
-        if (!reader) {
-          reject(new Error('Stream not available'));
-          return;
-        }
+      let buffer = '';
+
+      try {
+        while (true) {
+          const { done, value } = await reader.read();
+
+          if (done) break;
+
+          buffer += decoder.decode(value, { stream: true });
+          const lines = buffer.split('\n');
+          buffer = lines.pop() || '';
 
-        let buffer = '';
-
-        const processStream = async () => {
-          try {
-            while (true) {
-              const { done, value } = await reader.read();
-
-              if (done) break;
-
-              buffer += decoder.decode(value, { stream: true });
-              const lines = buffer.split('\n');
-              buffer = lines.pop() || '';
-
-              for (const line of lines) {
-                if (line.trim() && line.startsWith('data: ')) {
-                  try {
-                    const jsonStr = line.slice(6).trim();
-                    if (jsonStr) {
-                      const data = JSON.parse(jsonStr);
-                      onProgress(data);
-
-                      if (data.type === 'complete') {
-                        reader.cancel();
-                        resolve({
-                          success: data.success || false,
-                          total_videos: data.total_videos || 0,
-                          extracted: data.extracted || 0,
-                          skipped: data.skipped || 0,
-                          preview: data.preview || '',
-                          filename: data.filename || 'playlist_transcripts_clean.txt',
-                          skipped_videos: data.skipped_videos || []
-                        });
-                        return;
-                      } else if (data.type === 'error') {
-                        reader.cancel();
-                        reject(new Error(data.message || data.error || 'Extraction failed'));
-                        return;
-                      }
-                    }
-                  } catch (e) {
-                    // Skip invalid JSON lines
-                    console.warn('Failed to parse SSE data:', line);
+          for (const line of lines) {
+            if (line.startsWith('id: ')) {
+              lastEventId = line.slice(4).trim();
+            } else if (line.trim() && line.startsWith('data: ')) {
+              try {
+                const jsonStr = line.slice(6).trim();
+                if (jsonStr) {
+                  const data = JSON.parse(jsonStr);
+                  if (data.job_id) jobId = data.job_id;
+                  onProgress(data);
+
+                  if (data.type === 'complete') {
+                    reader.cancel();
+                    resolve({
+                      success: data.success || false,
+                      total_videos: data.total_videos || 0,
+                      extracted: data.extracted || 0,
+                      skipped: data.skipped || 0,
+                      preview: data.preview || '',
+                      filename: data.filename,
+                      skipped_videos: data.skipped_videos || [],
+                      max_videos: data.max_videos,
+                      truncated: data.truncated || false,
+                      listing_error: data.listing_error
+                    });
+                    return true;
+                  } else if (data.type === 'error') {
+                    reader.cancel();
+                    reject(new Error(data.message || data.error || 'Extraction failed'));
+                    return true;
                   }
                 }
+              } catch (e) {
+                // Skip invalid JSON lines
+                console.warn('Failed to parse SSE data:', line);
               }
             }
-            // Stream ended without completion
-            reject(new Error('Stream ended unexpectedly'));
-          } catch (error: any) {
-            reject(error);
           }
-        };
+        }
+      } catch (error) {
+        // Network drop: fall through and let the caller resume
+      }
+      return false;
+    };
+
+    return new Promise((resolve, reject) => {
+      const follow = async (response: Response): Promise<void> => {
+        if (!response.ok) {
+          const data = await safeJson(response);
+          reject(new Error(data.error || 'Failed to start extraction'));
+          return;
+        }
+        jobId = response.headers.get('X-Job-Id') || jobId;
+        if (await readStream(response, resolve, reject)) return;
+
+        // The job keeps running on the server: reconnect and replay only the missed events
+        if (!jobId || reconnects >= 5) {
+          reject(new Error('Stream ended unexpectedly'));
+          return;
+        }
+        reconnects += 1;
+        await new Promise(r => setTimeout(r, 1000 * reconnects));
+        follow(await fetch(`${API_BASE}/jobs/${jobId}/events`, {
+          headers: lastEventId ? { 'Last-Event-ID': lastEventId } : {},
+        })).catch(error => reject(error));
+      };
 
-        processStream();
-      }).catch(error => {
+      // Use POST with SSE streaming
+      fetch(`${API_BASE}/extract`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          playlist_url: playlistUrl,
+          use_sse: true
+        }),
+      }).then(follow).catch(error => {
         reject(error);
       });
     });
   }
 
-  // Fallback to regular request if no progress callback
+  // Without a progress callback the queued job (202) is polled until it finishes
   const response = await fetch(`${API_BASE}/extract`, {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
     body: JSON.stringify({ playlist_url: playlistUrl }),
   });
 
-  const data = await safeJson(response);
+  const job = await safeJson(response);
   if (!response.ok) {
-    throw new Error(data.error || 'Failed to extract transcripts');
+    throw new Error(job.error || 'Failed to extract transcripts');
   }
-  return data;
+  return waitForJob(job, 'Failed to extract transcripts');
+}
+
+// Live state of a download job (the 'status' and 'progress' events of /jobs/<id>/events)
+export interface DownloadProgress {
+  type: 'status' | 'progress';
+  message?: string;
+  strategy?: string;
+  connections?: number; // concurrent fragment connections granted to this download
+  phase?: 'download' | 'merge' | 'postprocess';
+  status?: string; // yt-dlp's: downloading/finished for downloads, started/processing/finished for postprocessors
+  filename?: string;
+  downloaded_bytes?: number | null;
+  total_bytes?: number | null;
+  speed?: number | null; // bytes per second
+  eta?: number | null; // seconds
+  fragment_index?: number | null;
+  fragment_count?: number | null;
+  item?: number; // playlist position, when yt-dlp knows the playlist size
+  items?: number;
+  postprocessor?: string;
+  percentage?: number;
 }
 
 export async function downloadVideo(
   videoUrl: string,
-  formData: FormData
+  formData: FormData,
+  onProgress?: (progress: DownloadProgress) => void
 ): Promise<DownloadResponse> {
+  // With a progress callback the download runs as a job and its events are followed
+  if (onProgress) {
+    const response = await fetch(`${API_BASE}/download-video`, {
+      method: 'POST',
+      body: formData,
+    });
+    const job = await safeJson(response);
+    if (!response.ok) {
+      throw new Error(job.error || 'Download failed');
+    }
+
+    const data = await new Promise<any>((resolve, reject) => {
+      // EventSource reconnects by itself, resuming after the last event it received
+      const events = new EventSource(`${API_BASE}/jobs/${job.job_id}/events`);
+      events.onmessage = (message) => {
+        const event = JSON.parse(message.data);
+        if (event.type === 'complete' || event.type === 'error') {
+          events.close();
+          resolve(event);
+        } else {
+          onProgress(event);
+        }
+      };
+      events.onerror = () => {
+        if (events.readyState === EventSource.CLOSED) {
+          reject(new Error('Lost connection to the download job'));
+        }
+      };
+    });
+    if (data.type === 'error') {
+      throw new Error(data.message || 'Download failed');
+    }
+    return data;
+  }
+
   const response = await fetch(`${API_BASE}/download-video`, {
     method: 'POST',
     body: formData,
   });
 
-  const data = await safeJson(response);
+  const job = await safeJson(response);
   if (!response.ok) {
-    throw new Error(data.error || 'Download failed');
+    throw new Error(job.error || 'Download failed');
   }
-  return data;
+  return waitForJob(job, 'Download failed');
 }
 
 export async function checkVideo(videoUrl: string, useCookies = false): Promise<VideoCheckResponse> {
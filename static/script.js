@@ -51,10 +51,23 @@ document.addEventListener('DOMContentLoaded', function() {
                 body: JSON.stringify({ playlist_url: playlistUrl })
             });
 
-            const data = await response.json();
+            const job = await response.json();
 
             if (!response.ok) {
-                throw new Error(data.error || 'An error occurred');
+                throw new Error(job.error || 'An error occurred');
+            }
+
+            // The extraction runs as a background job; follow its progress events
+            const data = await followJob(job.job_id, function(event) {
+                if (event.type === 'progress' && event.total) {
+                    progressBar.style.width = `${event.percentage || 0}%`;
+                    progressText.textContent = `Processing ${event.current} of ${event.total}: ${event.video_title || ''}`;
+                } else if (event.message) {
+                    progressText.textContent = event.message;
+                }
+            });
+            if (data.type === 'error') {
+                throw new Error(data.message || 'An error occurred');
             }
 
             // Show results
@@ -87,8 +100,8 @@ document.addEventListener('DOMContentLoaded', function() {
         previewText.textContent = data.preview || 'No preview available';
 
         // Set download link
-        downloadFilename.textContent = data.filename || 'playlist_transcripts_clean.txt';
-        transcriptDownloadBtn.href = `${API_BASE}/download/${data.filename || 'playlist_transcripts_clean.txt'}`;
+        downloadFilename.textContent = data.filename;
+        transcriptDownloadBtn.href = `${API_BASE}/download/${data.filename}`;
 
         // Show skipped videos if any
         if (data.skipped_videos && data.skipped_videos.length > 0) {
@@ -117,6 +130,28 @@ document.addEventListener('DOMContentLoaded', function() {
         skippedSection.classList.add('d-none');
     }
 
+    // Resolves with a job's final 'complete' or 'error' event, passing the others to onEvent.
+    // EventSource reconnects by itself and resumes after the last event it received.
+    function followJob(jobId, onEvent) {
+        return new Promise((resolve, reject) => {
+            const events = new EventSource(`${API_BASE}/jobs/${jobId}/events`);
+            events.onmessage = (message) => {
+                const data = JSON.parse(message.data);
+                if (data.type === 'complete' || data.type === 'error') {
+                    events.close();
+                    resolve(data);
+                } else {
+                    onEvent(data);
+                }
+            };
+            events.onerror = () => {
+                if (events.readyState === EventSource.CLOSED) {
+                    reject(new Error('Lost connection to the job'));
+                }
+            };
+        });
+    }
+
     function escapeHtml(text) {
         const div = document.createElement('div');
         div.textContent = text;
@@ -245,7 +280,7 @@ document.addEventListener('DOMContentLoaded', function() {
             downloadSpinner.classList.remove('d-none');
             downloadBtnText.textContent = 'Downloading...';
             downloadProgressSection.classList.remove('d-none');
-            downloadProgressBar.style.width = '10%';
+            downloadProgressBar.style.width = '0%';
             downloadProgressText.textContent = 'Starting download...';
             downloadLog.textContent = '';
 
@@ -269,26 +304,24 @@ document.addEventListener('DOMContentLoaded', function() {
             }
 
             try {
-                // Simulate progress
-                let progress = 10;
-                const progressInterval = setInterval(() => {
-                    progress = Math.min(progress + 2, 90);
-                    downloadProgressBar.style.width = progress + '%';
-                    downloadProgressText.textContent = `Downloading... ${progress}%`;
-                }, 1000);
-
+                // The download runs as a background job; follow its progress events
                 const response = await fetch(API_BASE + '/download-video', {
                     method: 'POST',
                     body: formData
                 });
 
-                clearInterval(progressInterval);
-                downloadProgressBar.style.width = '100%';
-
-                const data = await response.json();
+                const job = await response.json();
 
                 if (!response.ok) {
-                    showDownloadError(data.error || 'Download failed', data);
+                    showDownloadError(job.error || 'Download failed', job);
+                    return;
+                }
+
+                const data = await followDownloadJob(job.job_id);
+                downloadProgressBar.style.width = '100%';
+
+                if (data.type === 'error') {
+                    showDownloadError(data.message || 'Download failed', data);
                     return;
                 }
 
@@ -305,6 +338,47 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    function followDownloadJob(jobId) {
+        return followJob(jobId, function(data) {
+            if (data.type === 'progress') {
+                showDownloadProgress(data);
+            } else if (data.message) {
+                downloadProgressText.textContent = data.message;
+            }
+        });
+    }
+
+    function showDownloadProgress(data) {
+        if (typeof data.percentage === 'number') {
+            downloadProgressBar.style.width = data.percentage + '%';
+        }
+        if (data.phase === 'merge') {
+            downloadProgressText.textContent = 'Merging video and audio...';
+            return;
+        }
+        if (data.phase === 'postprocess') {
+            downloadProgressText.textContent = `Processing (${data.postprocessor || 'post-processing'})...`;
+            return;
+        }
+        const parts = [];
+        if (data.items) parts.push(`Item ${data.item}/${data.items}`);
+        if (data.total_bytes) {
+            parts.push(`${formatBytes(data.downloaded_bytes || 0)} of ${formatBytes(data.total_bytes)}`);
+        } else if (data.downloaded_bytes) {
+            parts.push(formatBytes(data.downloaded_bytes));
+        }
+        if (data.fragment_count) parts.push(`fragment ${data.fragment_index || 0}/${data.fragment_count}`);
+        if (data.speed) parts.push(`${formatBytes(data.speed)}/s`);
+        if (typeof data.eta === 'number') parts.push(`ETA ${Math.floor(data.eta / 60)}:${String(Math.round(data.eta % 60)).padStart(2, '0')}`);
+        downloadProgressText.textContent = `Downloading... ${parts.join(' · ')}`;
+    }
+
+    function formatBytes(bytes) {
+        if (bytes >= 1024 * 1024 * 1024) return (bytes / (1024 * 1024 * 1024)).toFixed(2) + ' GB';
+        if (bytes >= 1024 * 1024) return (bytes / (1024 * 1024)).toFixed(1) + ' MB';
+        return Math.round(bytes / 1024) + ' KB';
+    }
+
     function showDownloadError(message, data) {
         downloadErrorSection.classList.remove('d-none');
         
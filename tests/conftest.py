@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app as flask_app
+
+
+@pytest.fixture
+def config(tmp_path):
+    """app.config with every SQLite database and output folder moved into a scratch directory."""
+    saved = dict(flask_app.config)
+    flask_app.config.update(
+        CACHE_FOLDER=str(tmp_path),
+        OUTPUT_FOLDER=str(tmp_path),
+        UPLOAD_FOLDER=str(tmp_path / 'temp'),
+        DOWNLOADS_FOLDER=str(tmp_path / 'downloads'),
+        TRANSCRIPT_CACHE_DB=str(tmp_path / 'transcripts.sqlite3'),
+        JOBS_DB=str(tmp_path / 'jobs.sqlite3'),
+        SEARCH_DB=str(tmp_path / 'search.sqlite3'),
+        SYNC_DB=str(tmp_path / 'sync.sqlite3'),
+        METRICS_DB=str(tmp_path / 'metrics.sqlite3'),
+        DOWNLOAD_LEASES_DB=str(tmp_path / 'downloads.sqlite3'),
+        STRATEGY_STATS_DB=str(tmp_path / 'strategies.sqlite3'),
+        CAPABILITIES_DB=str(tmp_path / 'capabilities.sqlite3'),
+        SEARCH_INDEX=False,
+        TRANSCRIPT_REQUEST_DELAY=0,
+    )
+    yield flask_app.config
+    flask_app.config.clear()
+    flask_app.config.update(saved)
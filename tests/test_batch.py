@@ -0,0 +1,37 @@
+import os
+
+import app as app_module
+from app import PlaylistListing, run_batch_extraction
+
+
+def videos(*ids):
+    return [{'id': video_id, 'title': f'Title {video_id}', 'url': f'https://www.youtube.com/watch?v={video_id}'}
+            for video_id in ids]
+
+
+PLAYLISTS = {
+    'https://www.youtube.com/playlist?list=PLa': videos('a1', 'a2', 'a3', 'shared'),
+    'https://www.youtube.com/playlist?list=PLb': videos('b1', 'shared', 'b2'),
+}
+
+
+def test_batch_fetches_round_robin_and_keeps_input_order(config, monkeypatch):
+    fetched = []
+    
+    def fake_pool(unique, workers, languages=None, all_languages=False):
+        for index, video in enumerate(unique):
+            fetched.append(video['id'])
+            yield index, video, f"transcript of {video['id']} " * 5, None
+    
+    monkeypatch.setattr(app_module, 'open_playlist',
+                        lambda url, max_videos=None: (PlaylistListing(PLAYLISTS[url]), None))
+    monkeypatch.setattr(app_module, 'iter_transcripts_concurrently', fake_pool)
+    events = list(run_batch_extraction(list(PLAYLISTS)))
+    
+    assert fetched == ['a1', 'b1', 'a2', 'shared', 'a3', 'b2']
+    complete = events[-1]
+    assert (complete['unique_videos'], complete['duplicates']) == (6, 1)
+    for result, expected in zip(complete['results'], PLAYLISTS.values()):
+        with open(os.path.join(config['OUTPUT_FOLDER'], result['filename']), encoding='utf-8') as f:
+            titles = [line for line in f if line.startswith('=== ')]
+        assert titles == [f"=== {video['title']} ===\n" for video in expected]
@@ -0,0 +1,47 @@
+import gzip
+import os
+import re
+
+import pytest
+
+from app import clean_snippet_text, join_snippet_texts
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'fixtures')
+
+
+def legacy_join_snippets(snippets):
+    """The original get_transcript_direct snippet loop join_snippet_texts() replaced."""
+    texts = []
+    for text in snippets:
+        text = re.sub(r'\[.*?\]', '', text)
+        text = re.sub(r'<[^>]+>', '', text)
+        text = re.sub(r'^captions?\s*\w*\s*', '', text, flags=re.IGNORECASE)
+        text = text.strip()
+        if text and text not in texts[-1:]:
+            texts.append(text)
+    return re.sub(r' +', ' ', ' '.join(texts)).strip()
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('[Music]', ''),
+    ('[Applause] thank you [laughter]', 'thank you'),
+    ('<c>so</c><00:00:00.500><c> today</c>', 'so today'),
+    ('<i>rock</i> &amp; roll', 'rock &amp; roll'),  # entities are left to the client, as before
+    ('>> new speaker', '>> new speaker'),
+    ('captions en hello', 'hello'),
+    ('  padded  ', 'padded'),
+])
+def test_clean_snippet_text(text, expected):
+    assert clean_snippet_text(text) == expected
+
+
+def test_join_snippet_texts():
+    texts = ['[Music]', 'captions en hello', 'hello', '<i>world</i>  again', '', 'world  again']
+    assert join_snippet_texts(texts) == 'hello world again'
+
+
+@pytest.mark.parametrize('name', sorted(name for name in os.listdir(FIXTURES_DIR) if name.startswith('captions_')))
+def test_join_snippet_texts_matches_legacy_loop_on_fixtures(name):
+    with gzip.open(os.path.join(FIXTURES_DIR, name), 'rt', encoding='utf-8') as f:
+        snippets = [line for line in f.read().splitlines() if line.strip() and '-->' not in line]
+    assert join_snippet_texts(snippets) == legacy_join_snippets(snippets)
@@ -0,0 +1,45 @@
+from app import DownloadLease, throughput_options
+
+
+def test_leases_share_connections(config):
+    config.update(DOWNLOAD_CONNECTIONS=8, DOWNLOAD_BANDWIDTH=0)
+    first = DownloadLease(8)
+    second = DownloadLease(8)
+    try:
+        assert first.connections == 8
+        assert second.connections == 1  # nothing left until the first releases
+    finally:
+        first.release()
+        second.release()
+    third = DownloadLease(8)
+    try:
+        assert third.connections == 8
+    finally:
+        third.release()
+
+
+def test_subprocess_backend_gets_rate_limit(config):
+    config.update(DOWNLOAD_CONNECTIONS=16, DOWNLOAD_BANDWIDTH=8_000_000, YTDLP_BACKEND='subprocess')
+    lease = DownloadLease(4)
+    try:
+        assert throughput_options(lease) == ['--concurrent-fragments', '4', '--limit-rate', '2000000']
+    finally:
+        lease.release()
+
+
+def test_inprocess_backend_is_paced_without_rate_limit(config):
+    config.update(DOWNLOAD_CONNECTIONS=16, DOWNLOAD_BANDWIDTH=8_000_000, YTDLP_BACKEND='inprocess')
+    lease = DownloadLease(4)
+    try:
+        assert throughput_options(lease) == ['--concurrent-fragments', '4']
+    finally:
+        lease.release()
+
+
+def test_unlimited_bandwidth_has_no_rate_limit(config):
+    config.update(DOWNLOAD_CONNECTIONS=16, DOWNLOAD_BANDWIDTH=0, YTDLP_BACKEND='subprocess')
+    lease = DownloadLease(1)
+    try:
+        assert throughput_options(lease) == []
+    finally:
+        lease.release()
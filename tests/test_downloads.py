@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+import app as app_module
+from app import YtdlpResult, run_download
+
+
+def output_dir(cmd):
+    return os.path.dirname(cmd[cmd.index('-o') + 1])
+
+
+@pytest.fixture
+def attempts(config, monkeypatch):
+    """Scripted yt-dlp attempts: each is (returncode, names of files left in the scratch dir)."""
+    script = []
+    
+    def fake_run(cmd, timeout, lease=None):
+        returncode, names = script.pop(0)
+        for name in names:
+            with open(os.path.join(output_dir(cmd), name), 'wb') as f:
+                f.write(b'x' * 1024)
+        yield YtdlpResult(returncode, stderr='' if returncode == 0 else 'ERROR: merge failed')
+    
+    monkeypatch.setattr(app_module, '_ytdlp_with_progress', fake_run)
+    monkeypatch.setattr(app_module, 'get_browser_cookies', lambda: [])
+    return script
+
+
+def test_failed_attempt_files_are_not_a_result(attempts):
+    attempts.extend([(1, ['clip.f137.mp4']), (0, ['clip.mp4'])])
+    events = list(run_download('https://www.youtube.com/watch?v=dQw4w9WgXcQ'))
+    complete = events[-1]
+    assert complete['type'] == 'complete'
+    assert [os.path.basename(f['path']) for f in complete['files']] == ['clip.mp4']
+    assert os.listdir(os.path.dirname(complete['files'][0]['path'])) == ['clip.mp4']
+
+
+def test_every_attempt_failing_reports_an_error(attempts):
+    attempts.extend([(1, ['clip.f137.mp4'])] * 3)
+    events = list(run_download('https://www.youtube.com/watch?v=dQw4w9WgXcQ'))
+    assert events[-1]['type'] == 'error'
+    assert not attempts
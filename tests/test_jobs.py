@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+
+import app as app_module
+from app import (_jobs_db, job_add_record, job_claim, job_finish, job_get, job_records_after, job_report,
+                 job_submit, run_job)
+
+
+@pytest.fixture
+def jobs(config, monkeypatch):
+    # No embedded worker processes: the tests claim and run jobs themselves
+    monkeypatch.setattr(app_module, 'ensure_job_workers', lambda: None)
+    config.update(JOB_STALE_AFTER=120, JOB_MAX_ATTEMPTS=3)
+    return config
+
+
+def age(job_id, seconds):
+    """Pretend the job's last heartbeat was `seconds` ago."""
+    _jobs_db().execute('UPDATE jobs SET updated_at = ? WHERE id = ?', (time.time() - seconds, job_id))
+
+
+def test_claim_takes_oldest_queued_job(jobs):
+    first = job_submit('extract', {'playlist_url': 'https://www.youtube.com/playlist?list=PLa'})
+    job_submit('extract', {'playlist_url': 'https://www.youtube.com/playlist?list=PLb'})
+    job = job_claim('w1')
+    assert job['id'] == first
+    assert (job['status'], job['worker'], job['attempts']) == ('running', 'w1', 1)
+
+
+def test_identical_submissions_share_a_job(jobs):
+    params = {'playlist_url': 'https://www.youtube.com/playlist?list=PLa'}
+    assert job_submit('extract', params) == job_submit('extract', params)
+
+
+def test_running_job_is_not_claimed_again_while_fresh(jobs):
+    job_submit('extract', {'playlist_url': 'x'})
+    job_claim('w1')
+    assert job_claim('w2') is None
+
+
+def test_stale_job_is_retried_by_another_worker(jobs):
+    job_id = job_submit('extract', {'playlist_url': 'x'})
+    job_claim('w1')
+    age(job_id, 121)
+    job = job_claim('w2')
+    assert (job['id'], job['worker'], job['attempts']) == (job_id, 'w2', 2)
+
+
+def test_stale_job_fails_after_max_attempts(jobs):
+    job_id = job_submit('extract', {'playlist_url': 'x'})
+    for attempt in range(3):
+        assert job_claim(f'w{attempt}')['id'] == job_id
+        age(job_id, 121)
+    assert job_claim('w9') is None
+    job = job_get(job_id)
+    assert (job['status'], job['error']) == ('failed', 'Worker stopped responding')
+
+
+def test_stale_job_with_cancel_request_is_cancelled(jobs):
+    job_id = job_submit('extract', {'playlist_url': 'x'})
+    job_claim('w1')
+    _jobs_db().execute('UPDATE jobs SET cancel_requested = 1 WHERE id = ?', (job_id,))
+    age(job_id, 121)
+    assert job_claim('w2') is None
+    assert job_get(job_id)['status'] == 'cancelled'
+
+
+def test_report_is_ignored_once_another_worker_owns_the_job(jobs):
+    job_id = job_submit('extract', {'playlist_url': 'x'})
+    job_claim('w1')
+    assert job_report(job_id, 'w1', {'type': 'status', 'message': 'one'}) is False
+    age(job_id, 121)
+    job_claim('w2')
+    # The stalled worker is told to stop, and neither its events nor its result land
+    assert job_report(job_id, 'w1', {'type': 'status', 'message': 'late'}) is True
+    job_add_record(job_id, 'w1', {'index': 1, 'text': 'late'})
+    job_finish(job_id, 'w1', 'complete', result={'late': True})
+    job = job_get(job_id)
+    assert (job['status'], job['worker'], job['progress']['message']) == ('running', 'w2', 'one')
+    assert job_records_after(job_id, 0) == []
+
+
+def test_report_asks_worker_to_stop_on_cancel(jobs):
+    job_id = job_submit('extract', {'playlist_url': 'x'})
+    job_claim('w1')
+    _jobs_db().execute('UPDATE jobs SET cancel_requested = 1 WHERE id = ?', (job_id,))
+    assert job_report(job_id, 'w1', {'type': 'status', 'message': 'working'}) is True
+
+
+def test_heartbeat_keeps_a_silent_job_claimed(jobs, monkeypatch):
+    jobs.update(JOB_STALE_AFTER=0.4)
+    release = threading.Event()
+    
+    def silent(**params):
+        release.wait(5)  # e.g. reading a large playlist before the first event
+        yield {'type': 'complete', 'success': True}
+    
+    monkeypatch.setitem(app_module.JOB_HANDLERS, 'silent', silent)
+    job_id = job_submit('silent', {})
+    worker = threading.Thread(target=run_job, args=(job_claim('w1'), 'w1'))
+    worker.start()
+    try:
+        time.sleep(1)
+        assert job_claim('w2') is None
+    finally:
+        release.set()
+        worker.join()
+    job = job_get(job_id)
+    assert (job['status'], job['worker'], job['attempts']) == ('complete', 'w1', 1)
+
+
+def test_extract_returns_the_queued_job(jobs):
+    with app_module.app.test_client() as client:
+        response = client.post('/extract', json={'playlist_url': 'https://www.youtube.com/playlist?list=PLa'})
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body['status'] == 'queued'
+    assert body['events_url'] == f"/jobs/{body['job_id']}/events"
+    assert response.headers['Location'] == body['status_url'] == f"/jobs/{body['job_id']}"
+
+
+def test_extract_sse_names_the_server_job(jobs):
+    with app_module.app.test_client() as client:
+        response = client.post('/extract', json={'playlist_url': 'https://www.youtube.com/playlist?list=PLa',
+                                                 'use_sse': True})
+        assert response.mimetype == 'text/event-stream'
+        assert job_get(response.headers['X-Job-Id'])['kind'] == 'extract'
+        assert 'X-Job-Id' in response.headers['Access-Control-Expose-Headers']
+        response.close()
@@ -0,0 +1,58 @@
+import glob
+import gzip
+import json
+import os
+
+import pytest
+
+from app import find_yt_initial_data, parse_playlist_page
+
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                         'benchmarks', 'fixtures', 'playlist_*.html.gz')))
+
+
+def load(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return f.read()
+
+
+def full_parse(data):
+    """Videos and continuation token by walking the whole decoded ytInitialData."""
+    tab = data['contents']['twoColumnBrowseResultsRenderer']['tabs'][0]['tabRenderer']
+    section = tab['content']['sectionListRenderer']['contents'][0]['itemSectionRenderer']
+    items = section['contents'][0]['playlistVideoListRenderer']['contents']
+    videos = [(item['playlistVideoRenderer']['videoId'], item['playlistVideoRenderer']['title']['runs'][0]['text'])
+              for item in items if 'playlistVideoRenderer' in item]
+    commands = items[-1]['continuationItemRenderer']['continuationEndpoint']['commandExecutorCommand']['commands']
+    token = next(command['continuationCommand']['token'] for command in commands if 'continuationCommand' in command)
+    return videos, token
+
+
+@pytest.mark.parametrize('path', FIXTURES, ids=os.path.basename)
+def test_parse_playlist_page_matches_full_decode(path):
+    html = load(path)
+    start, end = find_yt_initial_data(html)
+    expected_videos, expected_token = full_parse(json.loads(html[start:end]))
+    
+    videos, token, error = parse_playlist_page(html)
+    assert error is None
+    assert len(videos) == 100
+    assert [(video['id'], video['title']) for video in videos] == expected_videos
+    assert videos[0]['url'] == f"https://www.youtube.com/watch?v={videos[0]['id']}"
+    assert token == expected_token
+
+
+def test_fixtures_present():
+    assert len(FIXTURES) == 2
+
+
+def test_find_yt_initial_data_without_closing_tag():
+    html = 'var ytInitialData = {"a": {"b": "} in a string"}, "c": [1]}; var other = {"d": 1}'
+    start, end = find_yt_initial_data(html)
+    assert json.loads(html[start:end]) == {'a': {'b': '} in a string'}, 'c': [1]}
+
+
+def test_find_yt_initial_data_missing():
+    assert find_yt_initial_data('<html><script>var somethingElse = {};</script></html>') is None
+    videos, token, error = parse_playlist_page('<html></html>')
+    assert (videos, token, error) == (None, None, 'Could not parse playlist page')
@@ -0,0 +1,55 @@
+import gzip
+
+import pytest
+
+import app as app_module
+from app import negotiate_stored_encoding
+
+BODY = b'transcript line\n' * 64
+
+
+@pytest.fixture
+def exports(config, tmp_path):
+    config['FILE_OFFLOAD'] = ''
+    (tmp_path / 'export.txt').write_bytes(BODY)
+    (tmp_path / 'export.txt.gz').write_bytes(gzip.compress(BODY))
+    (tmp_path / 'export.txt.zst').write_bytes(b'zstd bytes')
+    (tmp_path / 'plain.txt').write_bytes(BODY)
+    return tmp_path
+
+
+@pytest.mark.parametrize('accept, expected', [
+    ('gzip, deflate, br, zstd', ('export.txt.zst', 'zstd')),
+    ('gzip', ('export.txt.gz', 'gzip')),
+    ('zstd;q=0, gzip', ('export.txt.gz', 'gzip')),
+    ('br', ('export.txt', None)),
+    ('', ('export.txt', None)),
+])
+def test_negotiate_stored_encoding(exports, accept, expected):
+    with app_module.app.test_request_context(headers={'Accept-Encoding': accept}):
+        assert negotiate_stored_encoding('OUTPUT_FOLDER', 'export.txt') == expected
+
+
+def test_no_precompressed_copy(exports):
+    with app_module.app.test_request_context(headers={'Accept-Encoding': 'gzip, zstd'}):
+        assert negotiate_stored_encoding('OUTPUT_FOLDER', 'plain.txt') == ('plain.txt', None)
+
+
+def test_x_accel_redirect_leaves_negotiation_to_nginx(exports, config):
+    config['FILE_OFFLOAD'] = 'x-accel-redirect'
+    with app_module.app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+        assert negotiate_stored_encoding('OUTPUT_FOLDER', 'export.txt') == ('export.txt', None)
+
+
+def test_download_sends_precompressed_copy(exports):
+    with app_module.app.test_client() as client:
+        response = client.get('/download/export.txt', headers={'Accept-Encoding': 'gzip'})
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert gzip.decompress(response.data) == BODY
+        assert 'filename=export.txt' in response.headers['Content-Disposition']
+        
+        response = client.get('/download/export.txt', headers={'Range': 'bytes=0-14'})
+        assert response.status_code == 206
+        assert response.data == BODY[:15]
@@ -0,0 +1,97 @@
+import time
+
+import pytest
+
+import app as app_module
+from app import PlaylistListing, iter_synced_transcripts
+
+
+def videos(*ids):
+    return [{'id': video_id, 'title': f'Title {video_id}', 'url': f'https://www.youtube.com/watch?v={video_id}'}
+            for video_id in ids]
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    """Replaces the fetch pool; videos whose ID starts with 'bad' fail. Returns the IDs fetched."""
+    fetched = []
+    
+    def fake_pool(videos, workers, languages=None, all_languages=False):
+        for index, video in enumerate(videos):
+            fetched.append(video['id'])
+            if video['id'].startswith('bad'):
+                yield index, video, None, 'No transcript available'
+            else:
+                yield index, video, f"transcript of {video['id']}", None
+    
+    monkeypatch.setattr(app_module, 'iter_transcripts_concurrently', fake_pool)
+    return fetched
+
+
+def sync(ids, playlist_id='PLtest'):
+    stats = {}
+    results = list(iter_synced_transcripts(PlaylistListing(videos(*ids)), playlist_id, 2, stats=stats))
+    return results, stats
+
+
+def manifest(playlist_id='PLtest'):
+    with app_module.app.test_client() as client:
+        return client.get(f'/playlists/{playlist_id}/manifest')
+
+
+def test_first_sync_fetches_everything(config, fetches):
+    results, stats = sync(['a', 'b', 'bad1'])
+    assert fetches == ['a', 'b', 'bad1']
+    assert stats == {'new': 3, 'retried': 0, 'reused': 0, 'removed': 0}
+    assert sorted(index for index, _, _, _ in results) == [0, 1, 2]
+
+
+def test_resync_fetches_only_new_and_failed_videos(config, fetches):
+    sync(['a', 'b', 'bad1'])
+    fetches.clear()
+    results, stats = sync(['c', 'a', 'bad1'])
+    assert sorted(fetches) == ['bad1', 'c']
+    assert stats == {'new': 1, 'retried': 1, 'reused': 1, 'removed': 1}
+    reused = {video['id']: (index, text) for index, video, text, _ in results}
+    assert reused['a'] == (1, 'transcript of a')
+
+
+def test_manifest_reflects_latest_listing(config, fetches):
+    sync(['a', 'b', 'bad1'])
+    sync(['c', 'a', 'bad1'])
+    response = manifest()
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['video_count'] == 3
+    assert [(video['video_id'], video['position'], video['status']) for video in body['videos']] == [
+        ('c', 0, 'ok'), ('a', 1, 'ok'), ('bad1', 2, 'skipped')]
+    assert body['videos'][2]['reason'] == 'No transcript available'
+
+
+def test_unsynced_playlist_has_no_manifest(config):
+    assert manifest('PLnever').status_code == 404
+
+
+def test_pieces_removed_with_their_last_playlist(config, fetches):
+    sync(['a', 'b'])
+    sync(['a'])
+    rows = app_module._sync_db().execute('SELECT video_id FROM sync_pieces ORDER BY video_id').fetchall()
+    assert rows == [('a',)]
+
+
+def test_expired_pieces_are_fetched_again(config, fetches):
+    sync(['a', 'b'])
+    app_module._sync_db().execute("UPDATE sync_pieces SET fetched_at = ? WHERE video_id = 'a'",
+                                  (time.time() - config['TRANSCRIPT_CACHE_TTL'] - 1,))
+    fetches.clear()
+    _, stats = sync(['a', 'b'])
+    assert fetches == ['a']
+    assert stats['reused'] == 1
+
+
+def test_sync_rejects_single_video_url(config):
+    with app_module.app.test_client() as client:
+        response = client.post('/extract', json={'playlist_url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+                                                 'sync': True})
+    assert response.status_code == 400
+    assert 'playlist' in response.get_json()['error']
@@ -0,0 +1,77 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app import TimedTranscript, export_srt, export_timed_json, export_vtt, join_snippet_texts
+
+
+def snippet(text, start, duration):
+    return SimpleNamespace(text=text, start=start, duration=duration)
+
+
+SNIPPETS = [
+    snippet('[Music]', 0.0, 1.0),
+    snippet('hello there', 1.0, 2.5),   # overlaps the next cue, like auto-generated tracks
+    snippet('hello there', 3.0, 1.0),   # repeat: extends the cue above
+    snippet('<c>héllo</c>  world', 3.5, 2.0),
+    snippet('a --> b', 7.0, 1.0),
+]
+
+
+@pytest.fixture
+def timed():
+    return TimedTranscript.from_snippets(SNIPPETS)
+
+
+def test_from_snippets_cleans_and_merges(timed):
+    assert len(timed) == 3
+    assert [timed.cue_text(i) for i in range(3)] == ['hello there', 'héllo world', 'a --> b']
+    assert list(timed.starts) == [1000, 3500, 7000]
+    assert list(timed.durations) == [3000, 2000, 1000]
+
+
+def test_plain_text_matches_join_snippet_texts(timed):
+    assert timed.plain_text(range(len(timed))) == join_snippet_texts(s.text for s in SNIPPETS)
+
+
+def test_bytes_round_trip(timed):
+    restored = TimedTranscript.from_bytes(timed.to_bytes())
+    assert list(restored.cues(range(len(restored)))) == list(timed.cues(range(len(timed))))
+    with pytest.raises(ValueError):
+        TimedTranscript.from_bytes(b'XXXX' + timed.to_bytes()[4:])
+
+
+def test_window(timed):
+    assert timed.window() == range(0, 3)
+    assert timed.window(start=3.4) == range(0, 3)  # the first cue is still on screen
+    assert timed.window(start=4.5) == range(1, 3)
+    assert timed.window(end=7) == range(0, 2)
+    assert timed.window(start=6, end=6.5) == range(2, 2)
+
+
+def test_cues_clip_overlaps(timed):
+    assert list(timed.cues(range(3))) == [(1000, 3500, 'hello there'), (3500, 5500, 'héllo world'),
+                                          (7000, 8000, 'a --> b')]
+
+
+def test_export_srt(timed):
+    assert ''.join(export_srt(timed, timed.window(start=4.5))) == (
+        '1\n00:00:03,500 --> 00:00:05,500\nhéllo world\n\n'
+        '2\n00:00:07,000 --> 00:00:08,000\na --> b\n\n'
+    )
+
+
+def test_export_vtt(timed):
+    assert ''.join(export_vtt(timed, range(1, 3))) == (
+        'WEBVTT\n\n'
+        '00:00:03.500 --> 00:00:05.500\nhéllo world\n\n'
+        '00:00:07.000 --> 00:00:08.000\na -> b\n\n'
+    )
+
+
+def test_export_timed_json(timed):
+    document = json.loads(''.join(export_timed_json(timed, range(2), {'video_id': 'vid'})))
+    assert document == {'video_id': 'vid', 'cues': [{'start': 1.0, 'end': 3.5, 'text': 'hello there'},
+                                                     {'start': 3.5, 'end': 5.5, 'text': 'héllo world'}]}
+    assert json.loads(''.join(export_timed_json(timed, range(0), {'video_id': 'vid'}))) == {'video_id': 'vid', 'cues': []}
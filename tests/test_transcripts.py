@@ -0,0 +1,177 @@
+from types import SimpleNamespace
+
+import pytest
+
+import app as app_module
+from app import _fetch_track, _track_listing, get_transcripts_direct, select_tracks
+
+LONG_TEXT = 'a caption line that is comfortably longer than the fifty character minimum'
+
+
+def track(code, generated=False, translatable=True):
+    return {'language_code': code, 'language': code.upper(), 'generated': generated,
+            'translatable': translatable, 'url': f'https://example.invalid/timedtext?lang={code}'}
+
+
+def listing(*tracks, targets=('en', 'de', 'fr')):
+    return {'tracks': list(tracks), 'translation_languages': list(targets),
+            'translation_names': {code: f'{code} name' for code in targets}}
+
+
+def test_select_tracks_prefers_manual_original():
+    manual, generated = track('en'), track('en', generated=True)
+    assert select_tracks(listing(manual, generated), ['en']) == [(manual, None)]
+
+
+def test_select_tracks_follows_language_preference():
+    en, de = track('en'), track('de')
+    assert select_tracks(listing(en, de), ['de', 'en']) == [(de, None)]
+
+
+def test_select_tracks_translates_when_no_original():
+    es = track('es')
+    assert select_tracks(listing(es), ['fr', 'de']) == [(es, 'fr')]
+
+
+def test_select_tracks_falls_back_to_first_track():
+    es = track('es', translatable=False)
+    assert select_tracks(listing(es), ['en']) == [(es, None)]
+    assert select_tracks(listing(), ['en']) == []
+
+
+def test_select_tracks_all_languages():
+    en, es = track('en'), track('es')
+    picks = select_tracks(listing(en, es), ['en', 'de', 'it'], all_languages=True)
+    assert picks == [(en, None), (en, 'de')]
+
+
+def english_transcript():
+    from youtube_transcript_api._transcripts import Transcript, _TranslationLanguage
+    
+    return Transcript(None, 'vid', 'https://example.invalid/timedtext', 'English', 'en', False,
+                      [_TranslationLanguage('German', 'de')])
+
+
+def test_transcript_internals_detected():
+    """The installed youtube-transcript-api supports the cached-URL fast path."""
+    assert app_module.TRANSCRIPT_URLS is True
+
+
+def test_track_listing_keeps_translation_names():
+    result = _track_listing([english_transcript()])
+    assert result['tracks'][0]['url'] == 'https://example.invalid/timedtext'
+    assert result['translation_languages'] == ['de']
+    assert result['translation_names'] == {'de': 'German'}
+
+
+def test_track_listing_without_internals_has_no_urls(monkeypatch):
+    monkeypatch.setattr(app_module, 'TRANSCRIPT_URLS', False)
+    result = _track_listing([english_transcript()])
+    assert result['tracks'][0]['url'] is None
+    assert app_module._track_urls_expiry(result, 1000.0) == 1000.0 + app_module.app.config['TRACK_CACHE_TTL']
+
+
+class RecordingTranscript:
+    created = []
+    
+    def __init__(self, http_client, video_id, url, language, language_code, is_generated, translation_languages):
+        self.args = SimpleNamespace(url=url, language=language, language_code=language_code,
+                                    is_generated=is_generated)
+        RecordingTranscript.created.append(self.args)
+    
+    def fetch(self):
+        return SimpleNamespace(snippets=[SimpleNamespace(text=LONG_TEXT, start=0.0, duration=2.0)])
+
+
+@pytest.fixture
+def recording_transcript(monkeypatch):
+    RecordingTranscript.created = []
+    monkeypatch.setattr(app_module, 'Transcript', RecordingTranscript)
+    return RecordingTranscript.created
+
+
+def test_fetch_translated_track_uses_target_language(config, recording_transcript):
+    text, timed = _fetch_track('vid', track('en'), 'de', 'German')
+    assert text == LONG_TEXT
+    assert len(timed) == 1
+    (created,) = recording_transcript
+    assert created.url.endswith('&tlang=de')
+    assert (created.language, created.language_code, created.is_generated) == ('German', 'de', True)
+
+
+def test_fetch_original_track_keeps_its_own_language(config, recording_transcript):
+    _fetch_track('vid', track('en', generated=True))
+    (created,) = recording_transcript
+    assert (created.language, created.language_code, created.is_generated) == ('EN', 'en', True)
+
+
+def test_failing_language_is_skipped(config, monkeypatch):
+    en = track('en')
+    monkeypatch.setattr(app_module, 'get_track_listing', lambda video_id, need_urls=False: (listing(en), None))
+    
+    def fetch(video_id, track, target=None, target_name=None):
+        if target == 'de':
+            raise RuntimeError('HTTP Error 429: Too Many Requests')
+        return LONG_TEXT, None
+    
+    monkeypatch.setattr(app_module, '_fetch_track', fetch)
+    monkeypatch.setattr(app_module, 'transcript_cache_put', lambda *args: None)
+    texts, error = get_transcripts_direct('vid', ['en', 'de'], all_languages=True)
+    assert error is None
+    assert texts == {'en': LONG_TEXT}
+
+
+def test_error_when_no_language_succeeds(config, monkeypatch):
+    en = track('en')
+    monkeypatch.setattr(app_module, 'get_track_listing', lambda video_id, need_urls=False: (listing(en), None))
+    
+    def fetch(video_id, track, target=None, target_name=None):
+        raise RuntimeError('HTTP Error 429: Too Many Requests')
+    
+    monkeypatch.setattr(app_module, '_fetch_track', fetch)
+    texts, error = get_transcripts_direct('vid', ['en', 'de'], all_languages=True)
+    assert texts is None
+    assert error.startswith('Rate limited')
+
+
+def test_fetch_falls_back_to_public_api(config, monkeypatch):
+    calls = []
+    
+    class FakeTranscript:
+        def __init__(self, code):
+            self.code = code
+        
+        def translate(self, code):
+            calls.append(('translate', code))
+            return FakeTranscript(code)
+        
+        def fetch(self):
+            calls.append(('fetch', self.code))
+            return SimpleNamespace(snippets=[SimpleNamespace(text=LONG_TEXT, start=0.0, duration=2.0)])
+    
+    class FakeList:
+        def find_generated_transcript(self, codes):
+            calls.append(('generated', codes))
+            return FakeTranscript(codes[0])
+        
+        def find_manually_created_transcript(self, codes):
+            calls.append(('manual', codes))
+            return FakeTranscript(codes[0])
+    
+    class FakeApi:
+        def __init__(self, http_client=None):
+            pass
+        
+        def list(self, video_id):
+            calls.append(('list', video_id))
+            return FakeList()
+    
+    monkeypatch.setattr(app_module, 'TRANSCRIPT_URLS', False)
+    monkeypatch.setattr(app_module, 'YouTubeTranscriptApi', FakeApi)
+    text, _ = _fetch_track('vid', dict(track('en'), url=None), 'de', 'German')
+    assert text == LONG_TEXT
+    assert calls == [('list', 'vid'), ('manual', ['en']), ('translate', 'de'), ('fetch', 'de')]
+    
+    calls.clear()
+    _fetch_track('vid', dict(track('en', generated=True), url=None))
+    assert calls == [('list', 'vid'), ('generated', ['en']), ('fetch', 'en')]
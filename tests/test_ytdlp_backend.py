@@ -0,0 +1,103 @@
+import os
+
+import pytest
+
+import app as app_module
+from app import YtdlpResult, _ytdlp_pool_key, run_ytdlp, ytdlp_pool
+
+yt_dlp = pytest.importorskip('yt_dlp')
+
+
+@pytest.fixture
+def inprocess(config, monkeypatch):
+    config['YTDLP_BACKEND'] = 'inprocess'
+    
+    def no_subprocess(*args, **kwargs):
+        raise AssertionError('ran as a subprocess')
+    
+    monkeypatch.setattr(app_module, '_run_ytdlp_subprocess', no_subprocess)
+    return config
+
+
+@pytest.fixture
+def media(tmp_path):
+    path = tmp_path / 'clip.mp4'
+    path.write_bytes(os.urandom(4096))
+    return path.as_uri()
+
+
+def download_argv(url, folder):
+    return ['yt-dlp', '--enable-file-urls', '--no-progress', '-o', os.path.join(folder, '%(id)s.%(ext)s'), url]
+
+
+def test_youtubedl_internals_reset_between_runs_exist():
+    """WarmYoutubeDL.run() relies on these; a yt-dlp release that moves them must fail here."""
+    assert app_module._check_ytdlp_internals()
+    assert app_module.YTDLP_INPROCESS
+
+
+def test_missing_internals_are_detected(monkeypatch):
+    class MovedInternals(yt_dlp.YoutubeDL):
+        def __init__(self, params):
+            super().__init__(params)
+            del self._download_retcode
+    
+    monkeypatch.setattr(yt_dlp, 'YoutubeDL', MovedInternals)
+    assert not app_module._check_ytdlp_internals()
+
+
+def test_without_internals_every_attempt_is_a_subprocess(config, monkeypatch, media, tmp_path):
+    config['YTDLP_BACKEND'] = 'inprocess'
+    monkeypatch.setattr(app_module, 'YTDLP_INPROCESS', False)
+    monkeypatch.setattr(app_module, '_run_ytdlp_subprocess',
+                        lambda argv, timeout, report_files=False, on_progress=None: YtdlpResult(0))
+    assert run_ytdlp(download_argv(media, str(tmp_path)), timeout=60).backend == 'subprocess'
+
+
+def test_warm_instance_is_reused_with_each_runs_output_template(inprocess, media, tmp_path):
+    first, second = str(tmp_path / 'first'), str(tmp_path / 'second')
+    result = run_ytdlp(download_argv(media, first), timeout=60, report_files=True)
+    assert (result.backend, result.returncode) == ('inprocess', 0)
+    assert result.files == [os.path.join(first, 'clip.mp4')]
+    argv = download_argv(media, second)
+    key = _ytdlp_pool_key(argv[1:], [media])
+    warm = ytdlp_pool._idle[key][-1]
+    
+    result = run_ytdlp(argv, timeout=60, report_files=True)
+    assert (result.backend, result.returncode) == ('inprocess', 0)
+    assert result.files == [os.path.join(second, 'clip.mp4')]
+    assert os.path.isfile(result.files[0])
+    assert ytdlp_pool._idle[key][-1] is warm
+
+
+def test_failed_download_is_reported_not_retried(inprocess, tmp_path):
+    missing = (tmp_path / 'missing.mp4').as_uri()
+    result = run_ytdlp(download_argv(missing, str(tmp_path)), timeout=60)
+    assert (result.backend, result.returncode) == ('inprocess', 1)
+    assert 'ERROR' in result.stderr
+
+
+def test_error_during_run_is_a_failed_attempt(inprocess, media, tmp_path):
+    def on_progress(kind, fields):
+        raise RuntimeError('disk full')
+    
+    result = run_ytdlp(download_argv(media, str(tmp_path)), timeout=60, on_progress=on_progress)
+    assert (result.backend, result.returncode) == ('inprocess', 1)
+    assert 'disk full' in result.stderr
+
+
+def test_setup_error_falls_back_to_subprocess(config, monkeypatch, media, tmp_path):
+    config['YTDLP_BACKEND'] = 'inprocess'
+    
+    def broken_acquire(key, params):
+        raise ValueError('bad cookies')
+    
+    monkeypatch.setattr(ytdlp_pool, 'acquire', broken_acquire)
+    monkeypatch.setattr(app_module, '_run_ytdlp_subprocess',
+                        lambda argv, timeout, report_files=False, on_progress=None: YtdlpResult(0))
+    assert run_ytdlp(download_argv(media, str(tmp_path)), timeout=60).backend == 'subprocess'
+
+
+def test_rejected_arguments_exit_like_the_cli(inprocess):
+    result = run_ytdlp(['yt-dlp', '--no-such-option', 'https://example.com'], timeout=60)
+    assert (result.backend, result.returncode) == ('inprocess', 2)